@@ -0,0 +1,54 @@
+"""Add indexes for hot lookup paths
+
+Revision ID: 33b445b00a5a
+Revises: fbcce7116289
+Create Date: 2026-10-18 09:12:41.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '33b445b00a5a'
+down_revision: Union[str, Sequence[str], None] = 'fbcce7116289'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_AD_ACCOUNT_user_id', 'AD_ACCOUNT', ['user_id']),
+    ('ix_CAMPAIGN_account_id', 'CAMPAIGN', ['account_id']),
+    ('ix_CHAT_SESSION_user_id', 'CHAT_SESSION', ['user_id']),
+    ('ix_CHAT_MESSAGE_session_id_timestamp', 'CHAT_MESSAGE', ['session_id', 'timestamp']),
+    ('ix_OPTIMIZATION_SUGGESTION_campaign_id_applied', 'OPTIMIZATION_SUGGESTION', ['campaign_id', 'applied']),
+    ('ix_OAUTH_CREDENTIAL_verification_code', 'OAUTH_CREDENTIAL', ['verification_code']),
+    ('ix_CAMPAIGN_METRIC_metric_date', 'CAMPAIGN_METRIC', ['metric_date']),
+    ('ix_NOTIFICATION_PREFERENCE_user_id', 'NOTIFICATION_PREFERENCE', ['user_id']),
+    ('ix_PASSWORD_RESET_TOKEN_user_id', 'PASSWORD_RESET_TOKEN', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, so the
+    # indexes are built in an autocommit block. On PostgreSQL this keeps
+    # the tables writable while each index is built.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True, if_exists=True
+            )
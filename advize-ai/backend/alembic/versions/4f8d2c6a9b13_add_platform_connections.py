@@ -0,0 +1,54 @@
+"""Add PLATFORM_CONNECTION and external campaign ids for platform sync
+
+Revision ID: 4f8d2c6a9b13
+Revises: e3a61f0b7d94
+Create Date: 2026-10-18 18:05:51.602918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8d2c6a9b13'
+down_revision: Union[str, Sequence[str], None] = 'e3a61f0b7d94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'PLATFORM_CONNECTION',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('platform', sa.String(length=32), nullable=False),
+        sa.Column('access_token', sa.String(), nullable=False),
+        sa.Column('connected_at', sa.DateTime(), nullable=False),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['USER.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_PLATFORM_CONNECTION_id', 'PLATFORM_CONNECTION', ['id'])
+    op.create_index(
+        'ix_PLATFORM_CONNECTION_user_id_platform', 'PLATFORM_CONNECTION', ['user_id', 'platform'], unique=True
+    )
+    op.add_column('CAMPAIGN', sa.Column('external_id', sa.String(), nullable=True))
+    # Existing campaigns have no external id; NULLs never collide in a unique index
+    op.create_index('ix_CAMPAIGN_account_id_external_id', 'CAMPAIGN', ['account_id', 'external_id'], unique=True)
+    op.create_index(
+        'ix_AD_ACCOUNT_user_id_platform_external_id', 'AD_ACCOUNT', ['user_id', 'platform', 'external_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_AD_ACCOUNT_user_id_platform_external_id', table_name='AD_ACCOUNT')
+    op.drop_index('ix_CAMPAIGN_account_id_external_id', table_name='CAMPAIGN')
+    op.drop_column('CAMPAIGN', 'external_id')
+    op.drop_index('ix_PLATFORM_CONNECTION_user_id_platform', table_name='PLATFORM_CONNECTION')
+    op.drop_index('ix_PLATFORM_CONNECTION_id', table_name='PLATFORM_CONNECTION')
+    op.drop_table('PLATFORM_CONNECTION')
@@ -0,0 +1,40 @@
+"""Add REVOKED_TOKEN table for access-token revocation
+
+Revision ID: 5c0e7d92a4b1
+Revises: 73e5ffda827e
+Create Date: 2026-10-18 14:05:27.640192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e7d92a4b1'
+down_revision: Union[str, Sequence[str], None] = '73e5ffda827e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'REVOKED_TOKEN',
+        sa.Column('jti', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['USER.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('jti'),
+    )
+    op.create_index('ix_REVOKED_TOKEN_user_id', 'REVOKED_TOKEN', ['user_id'])
+    op.create_index('ix_REVOKED_TOKEN_expires_at', 'REVOKED_TOKEN', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_REVOKED_TOKEN_expires_at', table_name='REVOKED_TOKEN')
+    op.drop_index('ix_REVOKED_TOKEN_user_id', table_name='REVOKED_TOKEN')
+    op.drop_table('REVOKED_TOKEN')
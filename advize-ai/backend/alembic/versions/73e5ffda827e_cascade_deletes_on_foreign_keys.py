@@ -0,0 +1,85 @@
+"""Add ON DELETE CASCADE to child foreign keys
+
+Revision ID: 73e5ffda827e
+Revises: 33b445b00a5a
+Create Date: 2026-10-18 11:40:03.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73e5ffda827e'
+down_revision: Union[str, Sequence[str], None] = '33b445b00a5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (child table, column, parent table)
+FOREIGN_KEYS = [
+    ('AD_ACCOUNT', 'user_id', 'USER'),
+    ('CAMPAIGN', 'account_id', 'AD_ACCOUNT'),
+    ('CAMPAIGN_METRIC', 'campaign_id', 'CAMPAIGN'),
+    ('OPTIMIZATION_SUGGESTION', 'campaign_id', 'CAMPAIGN'),
+    ('CHAT_SESSION', 'user_id', 'USER'),
+    ('CHAT_MESSAGE', 'session_id', 'CHAT_SESSION'),
+    ('NOTIFICATION_PREFERENCE', 'user_id', 'USER'),
+    ('PASSWORD_RESET_TOKEN', 'user_id', 'USER'),
+]
+
+
+def _existing_fk_name(inspector, table, column):
+    for fk in inspector.get_foreign_keys(table):
+        if fk['constrained_columns'] == [column]:
+            return fk['name']
+    return None
+
+
+def _is_partitioned(bind, table):
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {'table': table}).first() is not None
+
+
+def _replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    postgresql = bind.dialect.name == 'postgresql'
+
+    for table, column, parent in FOREIGN_KEYS:
+        old_name = _existing_fk_name(inspector, table, column)
+        new_name = old_name or f'{table}_{column}_fkey'
+        if not postgresql:
+            with op.batch_alter_table(table) as batch_op:
+                if old_name:
+                    batch_op.drop_constraint(old_name, type_='foreignkey')
+                batch_op.create_foreign_key(new_name, parent, [column], ['id'], ondelete=ondelete)
+            continue
+
+        if old_name:
+            op.drop_constraint(old_name, table, type_='foreignkey')
+        action = f' ON DELETE {ondelete}' if ondelete else ''
+        # NOT VALID skips the full-table check while holding the write lock;
+        # VALIDATE then scans under a lock that still allows reads and writes.
+        # Partitioned tables do not support NOT VALID foreign keys.
+        not_valid = '' if _is_partitioned(bind, table) else ' NOT VALID'
+        op.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{new_name}" FOREIGN KEY ({column}) '
+            f'REFERENCES "{parent}" (id){action}{not_valid}'
+        )
+        if not_valid:
+            op.execute(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{new_name}"')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(None)
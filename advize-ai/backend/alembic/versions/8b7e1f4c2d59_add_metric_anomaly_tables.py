@@ -0,0 +1,58 @@
+"""Add METRIC_BASELINE and METRIC_ALERT for streaming anomaly detection
+
+Revision ID: 8b7e1f4c2d59
+Revises: 4f8d2c6a9b13
+Create Date: 2026-10-18 19:41:07.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b7e1f4c2d59'
+down_revision: Union[str, Sequence[str], None] = '4f8d2c6a9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'METRIC_BASELINE',
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(length=16), nullable=False),
+        sa.Column('mean', sa.REAL(), nullable=False),
+        sa.Column('variance', sa.REAL(), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('last_date', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['campaign_id'], ['CAMPAIGN.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('campaign_id', 'metric'),
+    )
+    op.create_table(
+        'METRIC_ALERT',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(length=16), nullable=False),
+        sa.Column('metric_date', sa.Date(), nullable=False),
+        sa.Column('value', sa.REAL(), nullable=False),
+        sa.Column('expected', sa.REAL(), nullable=False),
+        sa.Column('zscore', sa.REAL(), nullable=False),
+        sa.Column('direction', sa.String(length=8), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('acknowledged', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['campaign_id'], ['CAMPAIGN.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_METRIC_ALERT_id', 'METRIC_ALERT', ['id'])
+    op.create_index('ix_METRIC_ALERT_campaign_id_metric_date', 'METRIC_ALERT', ['campaign_id', 'metric_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_METRIC_ALERT_campaign_id_metric_date', table_name='METRIC_ALERT')
+    op.drop_index('ix_METRIC_ALERT_id', table_name='METRIC_ALERT')
+    op.drop_table('METRIC_ALERT')
+    op.drop_table('METRIC_BASELINE')
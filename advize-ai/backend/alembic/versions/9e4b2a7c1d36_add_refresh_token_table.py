@@ -0,0 +1,49 @@
+"""Add REFRESH_TOKEN table for rotating refresh tokens
+
+Revision ID: 9e4b2a7c1d36
+Revises: 5c0e7d92a4b1
+Create Date: 2026-10-18 15:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b2a7c1d36'
+down_revision: Union[str, Sequence[str], None] = '5c0e7d92a4b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'REFRESH_TOKEN',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('family_id', sa.String(length=32), nullable=False),
+        sa.Column('token_hash', sa.String(length=64), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('used_at', sa.DateTime(), nullable=True),
+        sa.Column('revoked', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['USER.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token_hash'),
+    )
+    op.create_index('ix_REFRESH_TOKEN_id', 'REFRESH_TOKEN', ['id'])
+    op.create_index('ix_REFRESH_TOKEN_user_id', 'REFRESH_TOKEN', ['user_id'])
+    op.create_index('ix_REFRESH_TOKEN_family_id', 'REFRESH_TOKEN', ['family_id'])
+    op.create_index('ix_REFRESH_TOKEN_expires_at', 'REFRESH_TOKEN', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_REFRESH_TOKEN_expires_at', table_name='REFRESH_TOKEN')
+    op.drop_index('ix_REFRESH_TOKEN_family_id', table_name='REFRESH_TOKEN')
+    op.drop_index('ix_REFRESH_TOKEN_user_id', table_name='REFRESH_TOKEN')
+    op.drop_index('ix_REFRESH_TOKEN_id', table_name='REFRESH_TOKEN')
+    op.drop_table('REFRESH_TOKEN')
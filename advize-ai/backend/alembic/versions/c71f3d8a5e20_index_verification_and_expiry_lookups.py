@@ -0,0 +1,58 @@
+"""Index verification by (email, code) and expiry columns for the sweeper
+
+Revision ID: c71f3d8a5e20
+Revises: 9e4b2a7c1d36
+Create Date: 2026-10-18 16:03:19.772514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71f3d8a5e20'
+down_revision: Union[str, Sequence[str], None] = '9e4b2a7c1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_OAUTH_CREDENTIAL_email_verification_code', 'OAUTH_CREDENTIAL', ['email', 'verification_code']),
+    ('ix_OAUTH_CREDENTIAL_code_expires_at', 'OAUTH_CREDENTIAL', ['code_expires_at']),
+    ('ix_PASSWORD_RESET_TOKEN_expires_at', 'PASSWORD_RESET_TOKEN', ['expires_at']),
+]
+
+# Verification is no longer looked up by code alone
+REPLACED = ('ix_OAUTH_CREDENTIAL_verification_code', 'OAUTH_CREDENTIAL', ['verification_code'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+        name, table, _ = REPLACED
+        op.drop_index(
+            name, table_name=table,
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        name, table, columns = REPLACED
+        op.create_index(
+            name, table, columns, unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True, if_exists=True
+            )
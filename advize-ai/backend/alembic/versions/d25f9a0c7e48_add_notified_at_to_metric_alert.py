@@ -0,0 +1,30 @@
+"""Add METRIC_ALERT.notified_at for alert digest emails
+
+Revision ID: d25f9a0c7e48
+Revises: 8b7e1f4c2d59
+Create Date: 2026-10-18 20:26:53.118940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd25f9a0c7e48'
+down_revision: Union[str, Sequence[str], None] = '8b7e1f4c2d59'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('METRIC_ALERT', sa.Column('notified_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_METRIC_ALERT_notified_at', 'METRIC_ALERT', ['notified_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_METRIC_ALERT_notified_at', table_name='METRIC_ALERT')
+    op.drop_column('METRIC_ALERT', 'notified_at')
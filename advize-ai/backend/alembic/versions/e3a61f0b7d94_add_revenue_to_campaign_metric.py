@@ -0,0 +1,52 @@
+"""Store revenue on CAMPAIGN_METRIC so ratios can be derived from sums
+
+Revision ID: e3a61f0b7d94
+Revises: c71f3d8a5e20
+Create Date: 2026-10-18 17:12:40.318205
+
+"""
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a61f0b7d94'
+down_revision: Union[str, Sequence[str], None] = 'c71f3d8a5e20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Backfill one date window per transaction so no single UPDATE locks or
+# rewrites the whole (possibly partitioned) table at once
+BACKFILL_DAYS = 31
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'CAMPAIGN_METRIC',
+        sa.Column('revenue', sa.REAL(), server_default='0', nullable=False)
+    )
+    conn = op.get_bind()
+    first, last = conn.execute(sa.text(
+        'SELECT MIN(metric_date), MAX(metric_date) FROM "CAMPAIGN_METRIC"'
+    )).one()
+    if first is None:
+        return
+    with op.get_context().autocommit_block():
+        start = first
+        while start <= last:
+            end = start + timedelta(days=BACKFILL_DAYS)
+            conn.execute(sa.text(
+                'UPDATE "CAMPAIGN_METRIC" SET revenue = COALESCE(roas, 0) * spend '
+                'WHERE metric_date >= :start AND metric_date < :end'
+            ), {"start": start, "end": end})
+            start = end
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('CAMPAIGN_METRIC', 'revenue')
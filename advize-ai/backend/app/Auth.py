@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
 import logging
-import os
 import random
 import secrets
+import uuid
 from typing import Any, Dict, List, Optional, Union
 
 from fastapi import (
@@ -16,26 +16,27 @@ from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 
-from app.database import get_db
+from app.config import settings
+from app.database import ReadSessionLocal, get_db
 from app import models, schemas
 from app.models import OAuthCredential, User, PasswordResetToken
-from app.schemas import Token, UserCreate, OAuthCredentialCreate, OAuthCredentialVerify, VerificationRequest
+from app.schemas import Token, UserCreate, OAuthCredentialCreate, OAuthCredentialVerify, VerificationRequest, RefreshRequest
 from app.cruds import (
     create_oauth_credential, verify_oauth_credential,
     update_oauth_credential_after_verification, create_user,
     get_user_by_email
 )
 from app.services import EmailService, PasswordResetService
+from app.revocation import revocation_list
+from app import refresh_tokens
 from app.utils.password import hash_password, verify_password
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -52,6 +53,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         str: Encoded JWT token
     """
     to_encode = data.copy()
+    # Unique token id so a single token can be revoked on logout
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -114,10 +117,16 @@ def get_current_user(security_scopes: SecurityScopes, token: str = Depends(oauth
         token_data = {"sub": user_id, "scopes": token_scopes}
     except (JWTError):  #validateur
         raise credentials_exception
+
+    # Bloom filter first; the DB is only asked when the filter says "maybe"
+    if revocation_list.is_revoked(db, payload.get("jti")):
+        raise credentials_exception
     
     user = db.query(models.User).filter(models.User.id == int(user_id)).first()
     if user is None:
         raise credentials_exception
+    # Lets commits on this request's session open the user's read-your-writes window
+    db.info["user_id"] = user.id
     
     # Verify scopes if any are required
     if security_scopes.scopes:
@@ -139,6 +148,18 @@ def get_current_active_user(current_user: models.User = Security(get_current_use
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def get_read_db(request: Request, current_user: models.User = Depends(get_current_user)):
+    """
+    Session for read-only analytics requests: on the read replica when one
+    is configured, fresh enough and the user has not just written, and on
+    the primary otherwise.
+    """
+    db = ReadSessionLocal(request.method, current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
 def get_current_user_payload(token: str = Depends(oauth2_scheme)):
     """
     Get the current user's payload from the token.
@@ -166,7 +187,7 @@ async def signup(user_data: UserCreate):
     """Create a new user with email verification"""
     db = next(get_db())
     try:
-        print(f"=== New signup: {user_data.email} ===")
+        logger.debug("New signup: %s", user_data.email)
 
         # Check if email already exists
         if db.query(User).filter(User.email == user_data.email).first():
@@ -180,9 +201,7 @@ async def signup(user_data: UserCreate):
             raise HTTPException(status_code=400, detail="Email already registered")
 
         # Hash the password
-        print("Hashing password...")
         hashed_password = hash_password(user_data.password)
-        print(f"Hashed password: {hashed_password}")
 
         # Generate verification code
         verification_code = ''.join(secrets.choice('0123456789') for _ in range(6))
@@ -224,7 +243,7 @@ async def signup(user_data: UserCreate):
         
         db.commit()
 
-        print(f"Verification code generated for {user_data.email}: {verification_code}")
+        logger.debug("Verification code generated for %s", user_data.email)
 
         # Send verification email
         email_service = EmailService.get_instance()
@@ -246,9 +265,9 @@ Best regards,
 Support Team
 """
                 )
-                print("Verification email sent")
+                logger.debug("Verification email sent")
             except Exception as email_error:
-                print(f"Error sending verification email: {str(email_error)}")
+                logger.error(f"Error sending verification email: {str(email_error)}")
 
         return {
             "detail": "Verification email sent",
@@ -264,7 +283,7 @@ Support Team
     except Exception as e:
         if 'db' in locals():
             db.rollback()
-        print(f"Erreur lors de l'inscription: {str(e)}")
+        logger.error(f"Erreur lors de l'inscription: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Une erreur est survenue lors de l'inscription: {str(e)}"
@@ -286,6 +305,7 @@ Support Team
                         "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
                         "token_type": "bearer",
                         "expires_in": 1800,
+                        "refresh_token": "kQ2b7rZ1x9...",
                         "user": {
                             "id": 1,
                             "email": "user@example.com",
@@ -315,7 +335,9 @@ async def verify(verification: VerificationRequest = Body(...)):
     try:
         # Find the OAuth credential with the matching email and verification code
         oauth_cred = db.query(OAuthCredential).filter(
-            OAuthCredential.verification_code == int(verification.verification_code)
+            OAuthCredential.email == verification.email,
+            OAuthCredential.verification_code == verification.verification_code.strip(),
+            OAuthCredential.is_verified == False
         ).first()
         
         if not oauth_cred:
@@ -363,10 +385,11 @@ async def verify(verification: VerificationRequest = Body(...)):
         oauth_cred.verification_code = None
         oauth_cred.code_expires_at = None
         
-        # Generate access token
+        # Issue the same token pair as login; this also commits the new user
+        refresh_token, refresh_row = refresh_tokens.issue(db, user.id)
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user.id)},
+            data={"sub": str(user.id), "fid": refresh_row.family_id},
             expires_delta=access_token_expires
         )
         
@@ -380,6 +403,7 @@ async def verify(verification: VerificationRequest = Body(...)):
             "access_token": access_token,
             "token_type": "bearer",
             "expires_in": int(access_token_expires.total_seconds()),
+            "refresh_token": refresh_token,
             "user": {
                 "id": user.id,
                 "email": user.email,
@@ -395,7 +419,7 @@ async def verify(verification: VerificationRequest = Body(...)):
         raise he
     except Exception as e:
         db.rollback()
-        print(f"Erreur lors de la vérification: {str(e)}")
+        logger.error(f"Erreur lors de la vérification: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Une erreur est survenue lors de la vérification: {str(e)}"
@@ -413,8 +437,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     db = next(get_db())
     try:
-        print("=== Login Attempt ===")
-        print(f"Email: {form_data.username}")
+        logger.debug("Login attempt for %s", form_data.username)
         
         # First check if there's an unverified OAuth credential
         oauth_cred = db.query(OAuthCredential).filter(
@@ -425,7 +448,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         if oauth_cred:
             # If there's an unverified credential, check if the password matches
             if not verify_password(form_data.password, oauth_cred.password_hash):
-                print("❌ Invalid email or password")
+                logger.info("Login failed: invalid email or password")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Incorrect email or password",
@@ -433,7 +456,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
                 )
             
             # If password matches but email not verified
-            print("❌ Email not verified")
+            logger.info("Login refused: email not verified")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=(
@@ -448,7 +471,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         
         # Verify user exists and password is correct
         if not user or not verify_password(form_data.password, user.password_hash):
-            print("❌ Invalid email or password")
+            logger.info("Login failed: invalid email or password")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -457,22 +480,24 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         
         # Check if user is active
         if not user.is_active:
-            print("❌ Inactive user")
+            logger.info("Login refused: inactive user")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="This account has been deactivated. Please contact support."
             )
         
         # Update last login timestamp
-        print("✅ User authenticated, updating last login")
+        logger.debug("User authenticated, updating last login")
         user.last_login = datetime.utcnow()
         db.commit()
         db.refresh(user)
         
-        # Create access token
+        # Create access token; the refresh token family id ties them together
+        # so logging out also ends the refresh chain
+        refresh_token, refresh_row = refresh_tokens.issue(db, user.id)
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
-            data={"sub": str(user.id)},
+            data={"sub": str(user.id), "fid": refresh_row.family_id},
             expires_delta=access_token_expires
         )
         
@@ -485,12 +510,13 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             oauth_cred.access_token = access_token
             db.commit()
         
-        print("✅ Access token created")
+        logger.debug("Access token created")
         
         return {
             "access_token": access_token,
             "token_type": "bearer",
             "expires_in": int(access_token_expires.total_seconds()),
+            "refresh_token": refresh_token,
             "user": {
                 "id": user.id,
                 "email": user.email,
@@ -502,7 +528,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"❌ Error in login: {str(e)}")
+        logger.error(f"Error in login: {str(e)}")
         if 'db' in locals():
             db.rollback()
         raise HTTPException(
@@ -515,28 +541,73 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    current_user: User = Depends(get_current_user),
+    payload: dict = Depends(get_current_user_payload),
+    db: Session = Depends(get_db)
+):
     """
     Logout endpoint.
     
-    In a production environment, you might want to implement token blacklisting here.
-    For now, it's up to the client to delete the token.
+    Revokes the access token used for this request, so it is rejected
+    from now on even though it has not expired yet, and the refresh
+    tokens issued with it.
     """
     try:
-        print(f"✅ User {current_user.email} logged out successfully")
-        # Here you could add token blacklisting logic if needed
-        # For now, we'll just log the logout and let the client handle token deletion
+        revocation_list.revoke(db, payload)
+        if payload.get("fid"):
+            refresh_tokens.revoke_family(db, payload["fid"])
+        logger.debug("User %s logged out successfully", current_user.email)
         return {
             "message": "Successfully logged out. Please delete your access token on the client side.",
             "success": True
         }
     except Exception as e:
-        print(f"❌ Error during logout: {str(e)}")
+        logger.error(f"Error during logout: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during logout"
         )
 
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and refresh token.
+
+    The presented refresh token is consumed. Presenting it a second time
+    revokes every token issued from the same login.
+    """
+    try:
+        new_refresh_token, row = refresh_tokens.rotate(db, request.refresh_token)
+    except refresh_tokens.RefreshTokenError as e:
+        logger.info(f"Refresh refused: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user = db.get(User, row.user_id)
+    if user is None or not user.is_active:
+        refresh_tokens.revoke_family(db, row.family_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="This account is no longer active",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": str(user.id), "fid": row.family_id},
+        expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+        "refresh_token": new_refresh_token,
+    }
+
 # Password Reset Endpoints
 @router.post("/request-password-reset")
 async def request_password_reset(request: ResetPasswordRequest, db: Session = Depends(get_db)):
@@ -546,7 +617,7 @@ async def request_password_reset(request: ResetPasswordRequest, db: Session = De
     - **email**: The email address to send the reset code to
     """
     try:
-        print(f"=== Password reset request for email: {request.email} ===")
+        logger.debug("Password reset request for email: %s", request.email)
         # Use the service to handle the password reset request
         verification_code = PasswordResetService.send_reset_email(request.email, db)
         
@@ -715,14 +786,14 @@ async def reset_password_submit(request: Request, db: Session = Depends(get_db))
             )
             
         # Get the user
-        user = db.query(User).filter(User.user_id == reset_token.user_id).first()
+        user = db.query(User).filter(User.id == reset_token.user_id).first()
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User not found"
             )
 
-        logger.info(f"Password reset attempt for user ID: {user.user_id}")
+        logger.info(f"Password reset attempt for user ID: {user.id}")
 
         # Reset the password
         success = PasswordResetService.verify_reset_code_and_change_password(
@@ -733,17 +804,13 @@ async def reset_password_submit(request: Request, db: Session = Depends(get_db))
         )
         
         if not success:
-            logger.error(f"Password reset failed for user ID: {user.user_id}")
+            logger.error(f"Password reset failed for user ID: {user.id}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Password reset failed"
             )
         
-        # Delete the used token
-        db.delete(reset_token)
-        db.commit()
-        
-        logger.info(f"Password successfully reset for user ID: {user.user_id}")
+        logger.info(f"Password successfully reset for user ID: {user.id}")
         return HTMLResponse(
             content="""
             <html>
@@ -0,0 +1,73 @@
+# app/alerts.py
+"""
+Metric anomaly alerts raised by app.anomaly while metrics are ingested.
+
+GET /api/alerts lists the current user's alerts in id order, one keyset
+page at a time (see app.pagination); POST /api/alerts/{id}/acknowledge
+marks one as seen.
+"""
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.Auth import get_current_active_user, get_read_db
+from app.database import get_db
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, page_response
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/alerts", tags=["Alerts"])
+
+ALERT_KEYS = list(schemas.MetricAlertRead.__fields__)
+
+
+def _owned_campaigns(user_id: int):
+    return select(models.Campaign.id).join(
+        models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+    ).where(models.AdAccount.user_id == user_id)
+
+
+@router.get("", response_model=List[schemas.MetricAlertRead])
+def list_alerts(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Return alerts with an id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    campaign_id: Optional[int] = None,
+    acknowledged: Optional[bool] = None,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Anomaly alerts on the current user's campaigns, one page at a time"""
+    a = models.MetricAlert
+    query = db.query(*[getattr(a, key) for key in ALERT_KEYS]).filter(
+        a.campaign_id.in_(_owned_campaigns(current_user.id))
+    )
+    if campaign_id is not None:
+        query = query.filter(a.campaign_id == campaign_id)
+    if acknowledged is not None:
+        query = query.filter(a.acknowledged == acknowledged)
+    return page_response(request, ALERT_KEYS, keyset_page(query, a.id, after_id, limit).all(), limit)
+
+
+@router.post("/{alert_id}/acknowledge", response_model=schemas.MetricAlertRead)
+def acknowledge_alert(
+    alert_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Mark an alert as seen"""
+    alert = db.query(models.MetricAlert).filter(
+        models.MetricAlert.id == alert_id,
+        models.MetricAlert.campaign_id.in_(_owned_campaigns(current_user.id))
+    ).first()
+    if alert is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Alert not found")
+    alert.acknowledged = True
+    db.commit()
+    db.refresh(alert)
+    logger.info(f"Alert {alert_id} acknowledged by user {current_user.id}")
+    return alert
@@ -0,0 +1,151 @@
+# app/anomaly.py
+"""
+Streaming anomaly detection on ingested campaign metrics.
+
+Every campaign keeps, per watched ratio, an exponentially weighted mean
+and variance (METRIC_BASELINE, one row per campaign and ratio). Each new
+day of metrics is scored against that baseline and then folded into it,
+so detection costs O(1) per row and never rescans history. A day whose
+z-score passes ANOMALY_THRESHOLD in the harmful direction (CPC or cost per
+purchase spiking, ROAS or CTR dropping) is written to METRIC_ALERT.
+
+The baseline is kept robust: an outlier is folded in clipped to the
+threshold, so one bad day raises one alert without dragging the mean or
+inflating the variance for the following weeks. The standard deviation is
+floored at a fraction of the mean, so a campaign with very steady numbers
+does not alert on noise. Only days after the last one scored are folded
+in; the restated recent days every sync fetches again are not counted
+twice. Only completed days are scored: syncs fetch through today, and a
+partial day would read as a spend or ROAS collapse and, once folded in,
+keep its complete restatement from ever being counted. Days under
+ANOMALY_MIN_IMPRESSIONS are ignored.
+
+observe() runs inside the ingesting transaction, one batch at a time:
+one query for the baselines of the batch's campaigns, then bulk writes.
+"""
+import logging
+import math
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import kpis, models
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SPIKE = "spike"
+DROP = "drop"
+# Ratio -> the direction that hurts
+WATCHED = {"cpc": SPIKE, "cpp": SPIKE, "roas": DROP, "ctr": DROP}
+MIN_RELATIVE_STD = 0.05
+
+
+class Baseline:
+    __slots__ = ("mean", "variance", "samples", "last_date", "stored")
+
+    def __init__(self, mean: float, variance: float, samples: int, last_date: Optional[date], stored: bool = False):
+        self.mean = mean
+        self.variance = variance
+        self.samples = samples
+        self.last_date = last_date
+        self.stored = stored  # row exists in METRIC_BASELINE
+
+    def std(self) -> float:
+        return max(math.sqrt(self.variance), abs(self.mean) * MIN_RELATIVE_STD, 1e-9)
+
+    def update(self, value: float, alpha: float, threshold: float, min_samples: int) -> Optional[float]:
+        """Score `value` against the baseline, then fold it in; the z-score is None while warming up."""
+        if self.samples == 0:
+            self.mean, self.variance, self.samples = value, 0.0, 1
+            return None
+        std = self.std()
+        zscore = (value - self.mean) / std if self.samples >= min_samples else None
+        if zscore is not None and abs(zscore) > threshold:
+            value = self.mean + math.copysign(threshold * std, zscore)
+        diff = value - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.samples += 1
+        return zscore
+
+
+def _load(db: Session, campaign_ids) -> Dict[Tuple[int, str], Baseline]:
+    b = models.MetricBaseline
+    return {
+        (campaign_id, metric): Baseline(mean, variance, samples, last_date, stored=True)
+        for campaign_id, metric, mean, variance, samples, last_date in db.query(
+            b.campaign_id, b.metric, b.mean, b.variance, b.samples, b.last_date
+        ).filter(b.campaign_id.in_(list(campaign_ids)))
+    }
+
+
+def detect(
+    rows: Iterable[dict], baselines: Dict[Tuple[int, str], Baseline], today: Optional[date] = None
+) -> Tuple[List[dict], set]:
+    """
+    Score and fold in metric rows (dicts with campaign_id, metric_date and
+    the base measures of app.kpis); updates `baselines` in place. Rows of
+    `today` (default: the current date) or later are incomplete and skipped.
+
+    Returns the alerts to insert and the keys of the baselines that changed.
+    """
+    alpha, threshold = settings.anomaly_alpha, settings.anomaly_threshold
+    min_samples, min_impressions = settings.anomaly_min_samples, settings.anomaly_min_impressions
+    today = today or date.today()
+    alerts, changed = [], set()
+    for row in sorted(rows, key=lambda r: (r["campaign_id"], r["metric_date"])):
+        if row["metric_date"] >= today or (row.get("impressions") or 0) < min_impressions:
+            continue
+        ratios = kpis.derive(row)
+        for metric, harmful in WATCHED.items():
+            value = ratios[metric]
+            if value is None:
+                continue
+            key = (row["campaign_id"], metric)
+            baseline = baselines.get(key)
+            if baseline is None:
+                baseline = baselines[key] = Baseline(0.0, 0.0, 0, None)
+            elif baseline.last_date is not None and row["metric_date"] <= baseline.last_date:
+                continue
+            expected = baseline.mean
+            zscore = baseline.update(value, alpha, threshold, min_samples)
+            baseline.last_date = row["metric_date"]
+            changed.add(key)
+            if zscore is None or abs(zscore) <= threshold:
+                continue
+            if (zscore > 0) == (harmful == SPIKE):
+                alerts.append({
+                    "campaign_id": row["campaign_id"], "metric": metric, "metric_date": row["metric_date"],
+                    "value": value, "expected": expected, "zscore": zscore, "direction": harmful,
+                })
+    return alerts, changed
+
+
+def observe(db: Session, rows: List[dict]) -> int:
+    """Run detection on rows being ingested through `db`; the caller commits. Returns the alert count."""
+    if not settings.anomaly_detection or not rows:
+        return 0
+    rows = [{
+        "campaign_id": row["campaign_id"], "metric_date": row["metric_date"],
+        **{key: row.get(key) or 0 for key in kpis.BASE_MEASURES},
+    } for row in rows]
+    baselines = _load(db, {row["campaign_id"] for row in rows})
+    alerts, changed = detect(rows, baselines)
+    if changed:
+        values = defaultdict(list)
+        for campaign_id, metric in changed:
+            baseline = baselines[(campaign_id, metric)]
+            values[baseline.stored].append({
+                "campaign_id": campaign_id, "metric": metric, "mean": baseline.mean,
+                "variance": baseline.variance, "samples": baseline.samples, "last_date": baseline.last_date,
+            })
+        db.bulk_update_mappings(models.MetricBaseline, values[True])
+        db.bulk_insert_mappings(models.MetricBaseline, values[False])
+    if alerts:
+        db.bulk_insert_mappings(models.MetricAlert, alerts)
+        logger.info(f"{len(alerts)} metric anomalies detected")
+    return len(alerts)
@@ -0,0 +1,221 @@
+# app/compression.py
+"""
+Response compression.
+
+CompressionMiddleware compresses responses with brotli (when the `brotli`
+package is installed and the client accepts it) or gzip. Only responses
+whose content type is in COMPRESSION_TYPES and whose body is at least
+COMPRESSION_MIN_SIZE bytes are compressed; streamed responses (exports)
+are compressed chunk by chunk as they are sent. Responses that already
+carry a Content-Encoding pass through untouched.
+
+Payloads served with an ETag go through precompressed_response instead:
+the compressed variants are kept in a size-bounded LRU keyed by a hash of
+the uncompressed body, so each version of the data is compressed once per
+encoding (at the highest level, since it is paid only once) and then served
+from memory. Each encoding is a representation of its own with its own
+strong ETag (the hash, suffixed with the coding unless identity), and
+Vary: Accept-Encoding is always set. A matching If-None-Match gets a 304.
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset(t.strip() for t in settings.compression_types.split(",") if t.strip())
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else settings.brotli_quality)
+    compressor = zlib.compressobj(9 if best else settings.gzip_level, zlib.DEFLATED, 31)  # gzip header
+    return compressor.compress(data) + compressor.flush()
+
+
+class _StreamEncoder:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush every chunk so a streamed export reaches the client as it is produced
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """Pure ASGI so streaming responses are compressed incrementally instead of buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder: Optional[_StreamEncoder] = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, encoder
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start.setdefault("headers", []))
+                if not _compressible(headers) or (not more_body and len(body) < settings.compression_min_size):
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = _StreamEncoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(start)
+                    await send({"type": "http.response.body", "body": encoder.chunk(body), "more_body": True})
+                else:
+                    data = encoder.finish(body)
+                    headers["Content-Length"] = str(len(data))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": data})
+                return
+
+            if encoder is None:
+                await send(message)
+            elif more_body:
+                await send({"type": "http.response.body", "body": encoder.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": encoder.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PrecompressedCache:
+    """LRU of compressed bodies keyed by (body hash, encoding), bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.compressions = 0
+
+    def get(self, digest: str, encoding: str, body: bytes) -> bytes:
+        key = (digest, encoding)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        data = compress(body, encoding, best=True)
+        with self._lock:
+            self.compressions += 1
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+precompressed_cache = PrecompressedCache(settings.precompressed_cache_mb * 1024 * 1024)
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_for(digest: str, encoding: Optional[str] = None) -> str:
+    """Strong ETag of a body (by its hash) as sent with `encoding`, None for identity."""
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def precompressed_response(request: Request, response: Response) -> Response:
+    """
+    Serve a rendered response with an ETag, answering If-None-Match with a
+    304 and sending the body compressed from the precompressed cache.
+    """
+    body = response.body
+    digest = body_hash(body)
+    encoding = negotiate(request.headers.get("accept-encoding", ""))
+    if len(body) < settings.compression_min_size:
+        encoding = None
+    etag = etag_for(digest, encoding)
+    headers: Dict[str, str] = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    # If-None-Match uses the weak comparison: W/ prefixes do not matter
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        body = precompressed_cache.get(digest, encoding, body)
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=response.status_code, headers=headers, media_type=response.media_type)
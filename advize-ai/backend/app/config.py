@@ -1,100 +1,148 @@
 import logging
-import os
-from pydantic_settings import BaseSettings
-from pydantic import Field
-from dotenv import load_dotenv
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Load environment variables explicitly
-project_root = Path(__file__).parent.parent.parent
-env_path = project_root / ".env"
-logger.info(f"Loading .env from: {env_path}")
-load_dotenv(env_path)
-
-class DatabaseSettings(BaseSettings):
-    database_url: str = Field(default=..., env="DATABASE_URL")
-    secret_key: str = Field(default=..., env="SECRET_KEY")
-    algorithm: str = Field(default="HS256", env="ALGORITHM")
-    access_token_expire_minutes: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
-
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        extra = 'ignore'  # Ignore extra environment variables
-
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        logger.info(f"Database settings initialized: {self.__dict__}")
-        logger.info(f"Environment variables loaded: {os.environ}")
-
-database_settings = DatabaseSettings()
-import logging
-import os
-from pydantic_settings import BaseSettings
-from pydantic import Field
 from dotenv import load_dotenv
-from pathlib import Path
+from pydantic import Field
+from pydantic_settings import BaseSettings
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables explicitly
-project_root = Path(__file__).parent.parent.parent
-env_path = project_root / ".env"
-logger.info(f"Loading .env from: {env_path}")
+# backend/.env; loaded once so code that still reads os.environ sees it too
+env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(env_path)
 
-class EmailSettings(BaseSettings):
-    # Email Configuration
-    smtp_server: str = Field(default="smtp.gmail.com", env="SMTP_SERVER")
-    smtp_port: int = Field(default=587, env="SMTP_PORT")
-    smtp_user: str = Field(default=..., env="SMTP_USER")
-    smtp_password: str = Field(default=..., env="SMTP_PASSWORD")
-    email_from: str = Field(default=..., env="EMAIL_FROM")
-    email_from_name: str = Field(default="Attendify Support", env="EMAIL_FROM_NAME")
-
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        extra = 'ignore'  # Ignore extra environment variables
-
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        logger.info(f"Email settings initialized: {self.__dict__}")
-        logger.info(f"Environment variables loaded: {os.environ}")
-
-email_settings = EmailSettings()
-from pydantic_settings import BaseSettings
-from pydantic import Field
-
 
 class Settings(BaseSettings):
-    # Email Configuration
+    # Email Configuration (optional: without it emails are skipped, not fatal)
     smtp_server: str = Field(default="smtp.gmail.com", env="SMTP_SERVER")
     smtp_port: int = Field(default=587, env="SMTP_PORT")
-    smtp_user: str = Field(default=..., env="SMTP_USER")
-    smtp_password: str = Field(default=..., env="SMTP_PASSWORD")
-    email_from: str = Field(default=..., env="EMAIL_FROM")
+    smtp_user: Optional[str] = Field(default=None, env="SMTP_USER")
+    smtp_password: Optional[str] = Field(default=None, env="SMTP_PASSWORD")
+    email_from: Optional[str] = Field(default=None, env="EMAIL_FROM")
     email_from_name: str = Field(default="Attendify Support", env="EMAIL_FROM_NAME")
+    smtp_starttls: bool = Field(default=True, env="SMTP_STARTTLS")
+    smtp_timeout: float = Field(default=30.0, env="SMTP_TIMEOUT")  # seconds per SMTP command
+    frontend_url: str = Field(default="http://127.0.0.1:5500/frontend", env="FRONTEND_URL")
 
     # Database Configuration
     database_url: str = Field(default=..., env="DATABASE_URL")
+    db_create_all: bool = Field(default=True, env="DB_CREATE_ALL")  # create missing tables at startup
+    # Optional read replica for read-only requests
+    read_replica_url: Optional[str] = Field(default=None, env="READ_REPLICA_URL")
+    read_your_writes_seconds: float = Field(default=5.0, env="READ_YOUR_WRITES_SECONDS")
+    replica_max_lag_seconds: float = Field(default=10.0, env="REPLICA_MAX_LAG_SECONDS")
+    replica_lag_check_seconds: float = Field(default=5.0, env="REPLICA_LAG_CHECK_SECONDS")
+    replica_receiver_silence_seconds: float = Field(default=40.0, env="REPLICA_RECEIVER_SILENCE_SECONDS")  # above the primary's keepalive interval
     secret_key: str = Field(default=..., env="SECRET_KEY")
     algorithm: str = Field(default="HS256", env="ALGORITHM")
     access_token_expire_minutes: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    refresh_token_expire_days: int = Field(default=30, env="REFRESH_TOKEN_EXPIRE_DAYS")
+
+    revocation_rebuild_seconds: int = Field(default=60, env="REVOCATION_REBUILD_SECONDS")
+    # Deletion of expired codes and tokens
+    sweep_interval_seconds: int = Field(default=300, env="SWEEP_INTERVAL_SECONDS")
+    sweep_batch_size: int = Field(default=500, env="SWEEP_BATCH_SIZE")
+
+    # Facebook Graph API
+    fb_client_id: Optional[str] = Field(default=None, env="FB_CLIENT_ID")
+    fb_client_secret: Optional[str] = Field(default=None, env="FB_CLIENT_SECRET")
+    fb_redirect_uri: Optional[str] = Field(default=None, env="FB_REDIRECT_URI")
+    graph_api_timeout: float = Field(default=30.0, env="GRAPH_API_TIMEOUT")
+
+    # Ad platform connectors (app.connectors); the URLs can point at local mocks
+    meta_api_url: str = Field(default="https://graph.facebook.com/v23.0", env="META_API_URL")
+    tiktok_api_url: str = Field(default="https://business-api.tiktok.com/open_api/v1.3", env="TIKTOK_API_URL")
+    tiktok_app_id: Optional[str] = Field(default=None, env="TIKTOK_APP_ID")
+    tiktok_app_secret: Optional[str] = Field(default=None, env="TIKTOK_APP_SECRET")
+    snapchat_api_url: str = Field(default="https://adsapi.snapchat.com/v1", env="SNAPCHAT_API_URL")
+    connector_timeout: float = Field(default=30.0, env="CONNECTOR_TIMEOUT")
+    connector_max_concurrency: int = Field(default=4, env="CONNECTOR_MAX_CONCURRENCY")  # requests in flight per platform
+    connector_max_retries: int = Field(default=5, env="CONNECTOR_MAX_RETRIES")
+    connector_backoff_seconds: float = Field(default=0.5, env="CONNECTOR_BACKOFF_SECONDS")  # first retry delay
+    connector_max_retry_delay: float = Field(default=60.0, env="CONNECTOR_MAX_RETRY_DELAY")
+    connector_max_pages: int = Field(default=1000, env="CONNECTOR_MAX_PAGES")  # per listing or insights range
+    sync_default_days: int = Field(default=7, env="SYNC_DEFAULT_DAYS")
+
+    # Scheduled refresh of connected ad accounts (app.scheduler)
+    sync_scheduler_enabled: bool = Field(default=False, env="SYNC_SCHEDULER_ENABLED")  # on one worker only
+    sync_interval_minutes: int = Field(default=60, env="SYNC_INTERVAL_MINUTES")  # per account
+    sync_jitter: float = Field(default=0.1, env="SYNC_JITTER")  # +/- fraction of the interval
+    sync_refresh_days: int = Field(default=3, env="SYNC_REFRESH_DAYS")  # recent days re-fetched per run
+    sync_scheduler_concurrency: int = Field(default=2, env="SYNC_SCHEDULER_CONCURRENCY")  # accounts per platform
+    sync_scheduler_platform_concurrency: str = Field(default="", env="SYNC_SCHEDULER_PLATFORM_CONCURRENCY")  # e.g. "meta=4,snapchat=1"
+    sync_scheduler_reload_seconds: int = Field(default=300, env="SYNC_SCHEDULER_RELOAD_SECONDS")
+
+    # Anomaly detection on ingested metrics (app.anomaly)
+    anomaly_detection: bool = Field(default=True, env="ANOMALY_DETECTION")
+    anomaly_alpha: float = Field(default=0.1, env="ANOMALY_ALPHA")  # EWMA weight of the newest day
+    anomaly_threshold: float = Field(default=3.0, env="ANOMALY_THRESHOLD")  # z-score that raises an alert
+    anomaly_min_samples: int = Field(default=7, env="ANOMALY_MIN_SAMPLES")  # days before alerting
+    anomaly_min_impressions: int = Field(default=100, env="ANOMALY_MIN_IMPRESSIONS")  # smaller days are ignored
+
+    # Alert digest emails (app.notifications)
+    notification_digests: bool = Field(default=True, env="NOTIFICATION_DIGESTS")
+    notification_digest_minutes: int = Field(default=60, env="NOTIFICATION_DIGEST_MINUTES")  # coalescing window
+    notification_batch_size: int = Field(default=500, env="NOTIFICATION_BATCH_SIZE")  # digests per SMTP session
+    notification_max_alerts: int = Field(default=20, env="NOTIFICATION_MAX_ALERTS")  # listed per digest
+
+    # Spend and revenue forecasts (app.forecasting)
+    forecast_history_days: int = Field(default=112, env="FORECAST_HISTORY_DAYS")  # fitted window, 16 weeks
+    forecast_max_days: int = Field(default=60, env="FORECAST_MAX_DAYS")  # longest horizon served
+    forecast_cache_size: int = Field(default=50000, env="FORECAST_CACHE_SIZE")  # campaigns kept per process
+
+    # CAMPAIGN_METRIC partitioning (PostgreSQL only)
+    metric_partitioning: bool = Field(default=False, env="METRIC_PARTITIONING")
+    metric_partition_months_ahead: int = Field(default=3, env="METRIC_PARTITION_MONTHS_AHEAD")
+    metric_retention_months: int = Field(default=0, env="METRIC_RETENTION_MONTHS")  # 0 keeps everything
+
+    # Parquet archive for historical metrics
+    metric_archive_dir: str = Field(default="archive/metrics", env="METRIC_ARCHIVE_DIR")
+    metric_archive_after_days: int = Field(default=180, env="METRIC_ARCHIVE_AFTER_DAYS")
+
+    # Logging
+    log_level: str = Field(default="INFO", env="LOG_LEVEL")
+    log_levels: str = Field(default="", env="LOG_LEVELS")  # e.g. "app.cruds=DEBUG,sqlalchemy.engine=INFO"
+    log_format: str = Field(default="json", env="LOG_FORMAT")  # json or text
+    log_debug_sample_rate: float = Field(default=1.0, env="LOG_DEBUG_SAMPLE_RATE")
+    db_echo: bool = Field(default=False, env="DB_ECHO")  # log every SQL statement
+
+    # Request instrumentation
+    slow_request_ms: int = Field(default=1000, env="SLOW_REQUEST_MS")
+    slow_request_log_statements: int = Field(default=10, env="SLOW_REQUEST_LOG_STATEMENTS")
+
+    # Response compression
+    compression_min_size: int = Field(default=1024, env="COMPRESSION_MIN_SIZE")  # bytes
+    compression_types: str = Field(
+        default="application/json,application/x-ndjson,text/csv,text/plain,text/html",
+        env="COMPRESSION_TYPES"
+    )
+    gzip_level: int = Field(default=6, env="GZIP_LEVEL")
+    brotli_quality: int = Field(default=5, env="BROTLI_QUALITY")
+    precompressed_cache_mb: int = Field(default=64, env="PRECOMPRESSED_CACHE_MB")
+
+    # Live dashboard updates over /ws/dashboard
+    live_flush_ms: int = Field(default=500, env="LIVE_FLUSH_MS")  # coalescing window for metric writes
+    live_queue_size: int = Field(default=32, env="LIVE_QUEUE_SIZE")  # messages per connection
+    live_heartbeat_seconds: float = Field(default=25.0, env="LIVE_HEARTBEAT_SECONDS")
+    live_send_timeout_seconds: float = Field(default=10.0, env="LIVE_SEND_TIMEOUT_SECONDS")
+    live_max_connections_per_user: int = Field(default=5, env="LIVE_MAX_CONNECTIONS_PER_USER")
 
     class Config:
-        env_file = ".env"
+        env_file = env_path
         env_file_encoding = "utf-8"
         extra = 'ignore'  # Ignore extra environment variables
 
-settings = Settings()
+    @property
+    def smtp_configured(self) -> bool:
+        return bool(self.smtp_user and self.smtp_password and self.email_from)
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    """Build the settings once per process; every module shares this object."""
+    return Settings()
 
-def get_settings():
-    return settings
 
-# Initialize settings immediately
 settings = get_settings()
@@ -0,0 +1,21 @@
+# app/connectors/__init__.py
+"""
+Ad platform connectors.
+
+Each platform module implements the Connector interface of base.py with
+its own pagination, throttling and retry rules; orchestrator.py syncs all
+of a user's connected platforms concurrently into AD_ACCOUNT, CAMPAIGN and
+CAMPAIGN_METRIC, and api.py exposes connecting and syncing over HTTP.
+"""
+from app.connectors.base import (
+    Connector, ConnectorError, InsightRow, InsightsPage, PlatformAccount, PlatformCampaign,
+)
+from app.connectors.meta import MetaConnector
+from app.connectors.snapchat import SnapchatConnector
+from app.connectors.tiktok import TikTokConnector
+
+CONNECTORS = {
+    MetaConnector.platform: MetaConnector,
+    TikTokConnector.platform: TikTokConnector,
+    SnapchatConnector.platform: SnapchatConnector,
+}
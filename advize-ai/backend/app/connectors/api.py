@@ -0,0 +1,119 @@
+# app/connectors/api.py
+"""Connecting ad platforms and starting syncs of their accounts, campaigns and metrics."""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.Auth import get_current_active_user
+from app.connectors import CONNECTORS
+from app.connectors.orchestrator import claim_sync, run_sync_job
+from app.database import get_db
+from app.jobs import job_registry
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/platforms", tags=["Platforms"])
+
+
+def _require_platform(platform: str) -> str:
+    if platform not in CONNECTORS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown platform '{platform}'; supported: {', '.join(CONNECTORS)}"
+        )
+    return platform
+
+
+def _connection_read(platform: str, connection) -> schemas.PlatformConnectionRead:
+    if connection is None:
+        return schemas.PlatformConnectionRead(platform=platform, connected=False)
+    return schemas.PlatformConnectionRead(
+        platform=platform,
+        connected=True,
+        connected_at=connection.connected_at,
+        last_synced_at=connection.last_synced_at,
+        last_error=connection.last_error,
+    )
+
+
+@router.get("", response_model=List[schemas.PlatformConnectionRead])
+def list_platforms(
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Supported platforms and the current user's connection to each"""
+    connections = {
+        connection.platform: connection
+        for connection in db.query(models.PlatformConnection).filter(
+            models.PlatformConnection.user_id == current_user.id
+        )
+    }
+    return [_connection_read(platform, connections.get(platform)) for platform in CONNECTORS]
+
+
+@router.put("/{platform}", response_model=schemas.PlatformConnectionRead)
+def connect_platform(
+    payload: schemas.PlatformConnect,
+    platform: str = Depends(_require_platform),
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Store (or replace) the access token used to sync a platform"""
+    connection = db.query(models.PlatformConnection).filter(
+        models.PlatformConnection.user_id == current_user.id,
+        models.PlatformConnection.platform == platform
+    ).first()
+    if connection is None:
+        connection = models.PlatformConnection(user_id=current_user.id, platform=platform)
+        db.add(connection)
+    connection.access_token = payload.access_token
+    connection.connected_at = datetime.utcnow()
+    connection.last_error = None
+    db.commit()
+    db.refresh(connection)
+    return _connection_read(platform, connection)
+
+
+@router.delete("/{platform}", status_code=status.HTTP_204_NO_CONTENT)
+def disconnect_platform(
+    platform: str = Depends(_require_platform),
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Forget a platform's token; already synced data stays"""
+    db.query(models.PlatformConnection).filter(
+        models.PlatformConnection.user_id == current_user.id,
+        models.PlatformConnection.platform == platform
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+@router.post("/sync", status_code=status.HTTP_202_ACCEPTED)
+def start_sync(
+    payload: schemas.PlatformSyncRequest,
+    current_user: models.User = Depends(get_current_active_user)
+) -> Dict[str, str]:
+    """
+    Sync the connected platforms in the background
+    Returns a job id to poll at /api/jobs/{job_id}; its progress lists the
+    result of each platform as it finishes.
+    """
+    for platform in payload.platforms or ():
+        _require_platform(platform)
+    if payload.since and payload.until and payload.since > payload.until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'since' is after 'until'")
+    if not claim_sync(current_user.id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A sync is already running")
+    job = job_registry.submit(
+        "platform_sync", run_sync_job, current_user.id, payload.since, payload.until, payload.platforms
+    )
+    logger.info(f"Started platform sync {job.id} for user {current_user.id}")
+    return {
+        "message": "Platform sync started",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }
@@ -0,0 +1,229 @@
+# app/connectors/base.py
+"""
+Common interface of the ad platform connectors.
+
+A connector wraps one platform's API behind three async calls returning
+platform-neutral records: list_accounts(), list_campaigns(account_id) and
+fetch_insights_page(account_id, since, until, cursor). Subclasses only
+describe their platform: authentication, how results are paged, which
+responses mean "throttled" and how long the platform asks to wait.
+
+The request loop here applies the same policy everywhere: requests are
+paced to the platform's rate, at most CONNECTOR_MAX_CONCURRENCY are in
+flight per connector, and throttled responses, 5xx responses and transport
+errors are retried with exponential backoff and jitter (or the delay the
+platform asked for, capped) up to CONNECTOR_MAX_RETRIES times. Paging
+loops go through next_cursor(), so a cursor that repeats or a listing of
+more than CONNECTOR_MAX_PAGES pages is an error instead of an endless loop.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qsl
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectorError(Exception):
+    """The platform rejected a request, or kept failing after every retry."""
+
+    def __init__(self, platform: str, message: str, status_code: Optional[int] = None):
+        super().__init__(f"{platform}: {message}")
+        self.platform = platform
+        self.status_code = status_code
+
+
+@dataclass
+class PlatformAccount:
+    external_id: str
+    name: str
+    status: str  # an AdAccountStatus value
+    currency: Optional[str] = None
+
+
+@dataclass
+class PlatformCampaign:
+    external_id: str
+    name: str
+    status: str  # a CampaignStatus value
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+@dataclass
+class InsightRow:
+    """One campaign-day of additive measures; ratios are derived later (app.kpis)."""
+    campaign_external_id: str
+    metric_date: date
+    spend: float = 0.0
+    impressions: int = 0
+    clicks: int = 0
+    purchases: float = 0.0
+    revenue: float = 0.0
+
+
+@dataclass
+class InsightsPage:
+    rows: List[InsightRow]
+    cursor: Optional[str] = None  # pass back to get the next page; None after the last one
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart; pause() holds everything back."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the n-th retry (1-based)."""
+    delay = min(settings.connector_max_retry_delay, settings.connector_backoff_seconds * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Connector:
+    platform = ""
+    requests_per_second = 10.0
+
+    def __init__(self, access_token: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.access_token = access_token
+        self.base_url = base_url
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(settings.connector_max_concurrency)
+        self.limiter = RateLimiter(self.requests_per_second)
+        self.requests = 0
+        self.retries = 0
+
+    async def __aenter__(self) -> "Connector":
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.auth_headers(),
+            timeout=settings.connector_timeout,
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    # Platform hooks
+
+    def auth_headers(self) -> Dict[str, str]:
+        return {}
+
+    def auth_params(self) -> Dict[str, str]:
+        return {}
+
+    def retry_delay(self, response: httpx.Response) -> Optional[float]:
+        """
+        None when `response` is final, otherwise the delay the platform asked
+        for before retrying (0 to use the backoff schedule).
+        """
+        if response.status_code == 429 or response.status_code >= 500:
+            return _retry_after_header(response)
+        return None
+
+    def parse(self, response: httpx.Response) -> Any:
+        """Body of a final response; raises ConnectorError for errors."""
+        if response.status_code >= 400:
+            raise ConnectorError(self.platform, response.text[:500], response.status_code)
+        return response.json()
+
+    def observe(self, response: httpx.Response) -> None:
+        """Look at usage headers of every response, e.g. to slow down early."""
+
+    # Interface
+
+    async def list_accounts(self) -> List[PlatformAccount]:
+        raise NotImplementedError
+
+    async def list_campaigns(self, account_id: str) -> List[PlatformCampaign]:
+        raise NotImplementedError
+
+    async def fetch_insights_page(
+        self, account_id: str, since: date, until: date, cursor: Optional[str] = None
+    ) -> InsightsPage:
+        raise NotImplementedError
+
+    # Paging
+
+    def next_cursor(self, seen: Set[str], cursor: Optional[str]) -> Optional[str]:
+        """
+        Return `cursor` after checking that paging moves forward; `seen`
+        holds the cursors of the loop so far. Raises ConnectorError.
+        """
+        if not cursor:
+            return None
+        if cursor in seen:
+            raise ConnectorError(self.platform, f"paging cursor repeated: {cursor[:200]}")
+        if len(seen) >= settings.connector_max_pages:
+            raise ConnectorError(self.platform, f"more than {settings.connector_max_pages} pages")
+        seen.add(cursor)
+        return cursor
+
+    # Request loop
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, **kwargs) -> Any:
+        path, _, query = path.partition("?")
+        # A query string in `path` (an absolute next-page link) is merged here:
+        # httpx 0.28 replaces a URL's query with `params` instead of merging
+        params = {**dict(parse_qsl(query, keep_blank_values=True)), **self.auth_params(), **(params or {})}
+        attempt = 0
+        while True:
+            await self.limiter.wait()
+            status_code = None
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    response = await self._client.request(method, path, params=params, **kwargs)
+                except httpx.TransportError as e:
+                    delay, error = 0.0, f"{type(e).__name__}: {e}"
+                else:
+                    self.observe(response)
+                    delay = self.retry_delay(response)
+                    if delay is None:
+                        return self.parse(response)
+                    status_code = response.status_code
+                    error = f"HTTP {status_code}"
+            if attempt >= settings.connector_max_retries:
+                raise ConnectorError(
+                    self.platform, f"{method} {path} failed after {attempt + 1} attempts: {error}", status_code
+                )
+            attempt += 1
+            self.retries += 1
+            wait = min(delay, settings.connector_max_retry_delay) or backoff_delay(attempt)
+            logger.info(f"{self.platform} {method} {path}: {error}, retry {attempt} in {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    async def get(self, path: str, params: Optional[dict] = None) -> Any:
+        return await self.request("GET", path, params)
+
+
+def _retry_after_header(response: httpx.Response) -> float:
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0  # HTTP-date form: fall back to backoff
@@ -0,0 +1,159 @@
+# app/connectors/meta.py
+"""
+Meta (Facebook / Instagram) Marketing API connector.
+
+Lists are paged with `paging.cursors.after` as long as `paging.next` is
+present. Throttling comes back as HTTP 400/403 with one of the rate-limit
+error codes, and the X-Business-Use-Case-Usage header tells how long until
+access is regained; X-App-Usage percentages are watched to slow down before
+Meta starts refusing calls. Purchases and revenue are read from the
+"purchase" entries of `actions` and `action_values`.
+"""
+import json
+from datetime import date, datetime
+from typing import List, Optional
+
+import httpx
+
+from app.config import settings
+from app.connectors.base import (
+    Connector, InsightRow, InsightsPage, PlatformAccount, PlatformCampaign,
+)
+
+# Application, user, ad account and business use case rate limits
+THROTTLE_CODES = {4, 17, 32, 613, 80000, 80003, 80004, 80014}
+PURCHASE_ACTIONS = ("purchase", "offsite_conversion.fb_pixel_purchase", "omni_purchase")
+# X-App-Usage percentage above which requests are held back
+USAGE_SLOWDOWN_PERCENT = 90
+USAGE_SLOWDOWN_SECONDS = 10.0
+
+ACCOUNT_STATUS = {1: "active", 2: "inactive", 3: "inactive", 7: "inactive", 9: "inactive", 101: "archived"}
+CAMPAIGN_STATUS = {"ACTIVE": "active", "PAUSED": "paused"}  # DELETED, ARCHIVED -> completed
+
+PAGE_SIZE = 100
+INSIGHT_FIELDS = "campaign_id,spend,impressions,clicks,actions,action_values"
+
+
+def _date(value: Optional[str]) -> Optional[date]:
+    return datetime.fromisoformat(value[:10]).date() if value else None
+
+
+def _action_total(entries, names=PURCHASE_ACTIONS) -> float:
+    # Meta reports the same purchases under several action types; take the first one present
+    by_type = {entry.get("action_type"): entry.get("value") for entry in entries or ()}
+    for name in names:
+        if name in by_type:
+            return float(by_type[name])
+    return 0.0
+
+
+class MetaConnector(Connector):
+    platform = "meta"
+    requests_per_second = 20.0
+
+    def __init__(self, access_token: str, base_url: Optional[str] = None, transport=None):
+        super().__init__(access_token, base_url or settings.meta_api_url, transport)
+
+    def auth_params(self):
+        return {"access_token": self.access_token}
+
+    def retry_delay(self, response: httpx.Response) -> Optional[float]:
+        if response.status_code in (400, 403):
+            error = _error(response)
+            if error.get("code") in THROTTLE_CODES or error.get("is_transient"):
+                return _regain_access_seconds(response)
+            return None
+        return super().retry_delay(response)
+
+    def observe(self, response: httpx.Response) -> None:
+        usage = response.headers.get("X-App-Usage")
+        if usage:
+            try:
+                percent = max(json.loads(usage).values())
+            except (ValueError, AttributeError):
+                return
+            if percent >= USAGE_SLOWDOWN_PERCENT:
+                self.limiter.pause(USAGE_SLOWDOWN_SECONDS)
+
+    async def _paged(self, path: str, params: dict) -> List[dict]:
+        items, params, seen = [], {**params, "limit": PAGE_SIZE}, set()
+        while True:
+            body = await self.get(path, params)
+            items.extend(body.get("data", []))
+            paging = body.get("paging", {})
+            after = self.next_cursor(seen, paging.get("cursors", {}).get("after") if paging.get("next") else None)
+            if not after:
+                return items
+            params = {**params, "after": after}
+
+    async def list_accounts(self) -> List[PlatformAccount]:
+        return [
+            PlatformAccount(
+                external_id=item["id"],
+                name=item.get("name") or item["id"],
+                status=ACCOUNT_STATUS.get(item.get("account_status"), "inactive"),
+                currency=item.get("currency"),
+            )
+            for item in await self._paged("/me/adaccounts", {"fields": "id,name,account_status,currency"})
+        ]
+
+    async def list_campaigns(self, account_id: str) -> List[PlatformCampaign]:
+        return [
+            PlatformCampaign(
+                external_id=item["id"],
+                name=item.get("name") or item["id"],
+                status=CAMPAIGN_STATUS.get(item.get("status"), "completed"),
+                start_date=_date(item.get("start_time")),
+                end_date=_date(item.get("stop_time")),
+            )
+            for item in await self._paged(
+                f"/{account_id}/campaigns", {"fields": "id,name,status,start_time,stop_time"}
+            )
+        ]
+
+    async def fetch_insights_page(self, account_id, since, until, cursor=None) -> InsightsPage:
+        params = {
+            "level": "campaign",
+            "time_increment": 1,
+            "fields": INSIGHT_FIELDS,
+            "time_range": json.dumps({"since": since.isoformat(), "until": until.isoformat()}),
+            "limit": PAGE_SIZE,
+        }
+        if cursor:
+            params["after"] = cursor
+        body = await self.get(f"/{account_id}/insights", params)
+        rows = [
+            InsightRow(
+                campaign_external_id=item["campaign_id"],
+                metric_date=_date(item["date_start"]),
+                spend=float(item.get("spend", 0)),
+                impressions=int(item.get("impressions", 0)),
+                clicks=int(item.get("clicks", 0)),
+                purchases=_action_total(item.get("actions")),
+                revenue=_action_total(item.get("action_values")),
+            )
+            for item in body.get("data", [])
+        ]
+        paging = body.get("paging", {})
+        after = paging.get("cursors", {}).get("after") if paging.get("next") else None
+        return InsightsPage(rows, after)
+
+
+def _error(response: httpx.Response) -> dict:
+    try:
+        return response.json().get("error", {})
+    except ValueError:
+        return {}
+
+
+def _regain_access_seconds(response: httpx.Response) -> float:
+    # {"<business id>": [{"type": "ads_insights", "estimated_time_to_regain_access": <minutes>, ...}]}
+    header = response.headers.get("X-Business-Use-Case-Usage")
+    if not header:
+        return 0.0
+    try:
+        entries = [entry for values in json.loads(header).values() for entry in values]
+        minutes = max(entry.get("estimated_time_to_regain_access", 0) for entry in entries)
+    except (ValueError, AttributeError, TypeError):
+        return 0.0
+    return minutes * 60.0
@@ -0,0 +1,304 @@
+# app/connectors/orchestrator.py
+"""
+Sync of a user's connected ad platforms.
+
+sync_user runs one task per connected platform with asyncio.gather, and
+inside a platform one task per ad account, so a slow or throttled platform
+never holds the others back; each connector still paces and bounds its own
+requests. Accounts and campaigns are upserted by external id before their
+insights are fetched, then every insights page is written as soon as it
+arrives (one bulk update plus one bulk insert), so memory does not grow
+with the date range. Database work runs in the thread pool.
+
+A failing account or platform is recorded in its SyncResult and on the
+PLATFORM_CONNECTION row; the rest of the sync carries on.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+
+from app import anomaly, kpis, models
+from app.config import settings
+from app.connectors import CONNECTORS
+from app.connectors.base import Connector, InsightRow, PlatformAccount, PlatformCampaign
+from app.context_snapshot import snapshot_cache
+from app.database import SessionLocal
+from app.forecasting import forecast_cache
+from app.live import dashboard_hub
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncResult:
+    platform: str
+    accounts: int = 0
+    campaigns: int = 0
+    metric_rows: int = 0
+    requests: int = 0
+    retries: int = 0
+    error: Optional[str] = None
+
+
+# Database side (thread pool)
+
+def _load_connections(user_id: int, platforms: Optional[Sequence[str]]) -> List[tuple]:
+    db = SessionLocal()
+    try:
+        query = db.query(
+            models.PlatformConnection.platform, models.PlatformConnection.access_token
+        ).filter(models.PlatformConnection.user_id == user_id)
+        if platforms:
+            query = query.filter(models.PlatformConnection.platform.in_(list(platforms)))
+        return [tuple(row) for row in query if row[0] in CONNECTORS]
+    finally:
+        db.close()
+
+
+def _store_account(
+    user_id: int, platform: str, account: PlatformAccount, campaigns: List[PlatformCampaign]
+) -> Dict[str, int]:
+    """Upsert an ad account and its campaigns; returns campaign ids by external id."""
+    db = SessionLocal(user_id)
+    try:
+        row = db.query(models.AdAccount).filter(
+            models.AdAccount.user_id == user_id,
+            models.AdAccount.platform == platform,
+            models.AdAccount.external_id == account.external_id
+        ).first()
+        if row is None:
+            row = models.AdAccount(user_id=user_id, platform=platform, external_id=account.external_id)
+            db.add(row)
+        row.status = models.AdAccountStatus(account.status)
+        db.flush()
+
+        existing = {
+            campaign.external_id: campaign
+            for campaign in db.query(models.Campaign).filter(
+                models.Campaign.account_id == row.id,
+                models.Campaign.external_id.in_([c.external_id for c in campaigns])
+            )
+        }
+        for campaign in campaigns:
+            current = existing.get(campaign.external_id)
+            if current is None:
+                current = existing[campaign.external_id] = models.Campaign(
+                    account_id=row.id, external_id=campaign.external_id
+                )
+                db.add(current)
+            current.name = campaign.name
+            current.status = models.CampaignStatus(campaign.status)
+            current.start_date = campaign.start_date
+            current.end_date = campaign.end_date
+        db.commit()
+        return {external_id: campaign.id for external_id, campaign in existing.items()}
+    finally:
+        db.close()
+
+
+def _metric_values(campaign_id: int, row: InsightRow) -> dict:
+    measures = {
+        "spend": row.spend, "impressions": row.impressions, "clicks": row.clicks,
+        "purchases": row.purchases, "revenue": row.revenue,
+    }
+    ratios = kpis.derive(measures)
+    # The per-day ratio columns are kept filled for existing readers
+    return {
+        "campaign_id": campaign_id, "metric_date": row.metric_date, **measures,
+        **ratios, "cpp": ratios["cpp"] or 0.0,
+    }
+
+
+def _store_metrics(user_id: int, campaign_ids: Dict[str, int], rows: List[InsightRow]) -> int:
+    """
+    Upsert one page of campaign-days; rows of unknown campaigns are skipped.
+
+    A concurrent writer (another worker syncing the same account) can insert
+    a campaign-day or baseline between the existence check and the insert;
+    the page is then retried once against the rows now present.
+    """
+    try:
+        return _upsert_metrics(user_id, campaign_ids, rows)
+    except IntegrityError:
+        logger.info(f"Metric page for user {user_id} raced another writer, retrying")
+        return _upsert_metrics(user_id, campaign_ids, rows)
+
+
+def _upsert_metrics(user_id: int, campaign_ids: Dict[str, int], rows: List[InsightRow]) -> int:
+    values = {}
+    for row in rows:
+        campaign_id = campaign_ids.get(row.campaign_external_id)
+        if campaign_id is not None:
+            values[(campaign_id, row.metric_date)] = _metric_values(campaign_id, row)
+    if not values:
+        return 0
+    m = models.CampaignMetric
+    db = SessionLocal(user_id)
+    try:
+        dates = [key[1] for key in values]
+        existing = set(db.query(m.campaign_id, m.metric_date).filter(
+            m.campaign_id.in_({key[0] for key in values}),
+            m.metric_date.between(min(dates), max(dates))
+        ))
+        db.bulk_update_mappings(m, [v for key, v in values.items() if key in existing])
+        db.bulk_insert_mappings(m, [v for key, v in values.items() if key not in existing])
+        anomaly.observe(db, list(values.values()))
+        db.commit()
+        return len(values)
+    finally:
+        db.close()
+
+
+def _record_sync(user_id: int, platform: str, error: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.PlatformConnection).filter(
+            models.PlatformConnection.user_id == user_id,
+            models.PlatformConnection.platform == platform
+        ).update({"last_synced_at": datetime.utcnow(), "last_error": error}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+# Platform side
+
+async def _sync_account(
+    connector: Connector, user_id: int, account: PlatformAccount, since: date, until: date, changed: Set[int]
+) -> tuple:
+    """
+    Store an account's campaigns, then its insights page by page; returns
+    (campaigns, metric rows). Every step commits, so campaign ids go into
+    `changed` as soon as they are written: if a later page fails, what was
+    stored is still invalidated.
+    """
+    campaigns = await connector.list_campaigns(account.external_id)
+    campaign_ids = await run_in_threadpool(_store_account, user_id, connector.platform, account, campaigns)
+    changed.update(campaign_ids.values())
+    rows, cursor, seen = 0, None, set()
+    while True:
+        page = await connector.fetch_insights_page(account.external_id, since, until, cursor)
+        rows += await run_in_threadpool(_store_metrics, user_id, campaign_ids, page.rows)
+        cursor = connector.next_cursor(seen, page.cursor)
+        if not cursor:
+            return len(campaigns), rows
+
+
+async def sync_platform(
+    user_id: int, platform: str, access_token: str, since: date, until: date,
+    changed: Set[int], transport=None
+) -> SyncResult:
+    """Sync every ad account of one platform; campaign ids written are added to `changed`, even on errors."""
+    result = SyncResult(platform)
+    connector = CONNECTORS[platform](access_token, transport=transport)
+    errors = []
+    try:
+        async with connector:
+            accounts = await connector.list_accounts()
+            result.accounts = len(accounts)
+            outcomes = await asyncio.gather(
+                *(_sync_account(connector, user_id, account, since, until, changed) for account in accounts),
+                return_exceptions=True
+            )
+        for account, outcome in zip(accounts, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"{platform} sync of account {account.external_id} failed: {outcome!r}")
+                errors.append(f"{account.external_id}: {outcome}")
+                continue
+            campaigns, rows = outcome
+            result.campaigns += campaigns
+            result.metric_rows += rows
+    except Exception as e:
+        logger.error(f"{platform} sync for user {user_id} failed: {str(e)}", exc_info=True)
+        errors.append(str(e))
+    result.requests, result.retries = connector.requests, connector.retries
+    result.error = "; ".join(errors)[:1000] or None
+    await run_in_threadpool(_record_sync, user_id, platform, result.error)
+    return result
+
+
+async def sync_account(
+    user_id: int, platform: str, access_token: str, account: PlatformAccount, since: date, until: date,
+    transport=None
+) -> SyncResult:
+    """Refresh a single known ad account, as the scheduler does; errors end up in the result."""
+    result = SyncResult(platform, accounts=1)
+    connector = CONNECTORS[platform](access_token, transport=transport)
+    campaign_ids: Set[int] = set()
+    try:
+        async with connector:
+            result.campaigns, result.metric_rows = await _sync_account(
+                connector, user_id, account, since, until, campaign_ids
+            )
+    except Exception as e:
+        logger.error(f"{platform} refresh of account {account.external_id} failed: {str(e)}")
+        result.error = str(e)[:1000]
+    result.requests, result.retries = connector.requests, connector.retries
+    if campaign_ids:
+        snapshot_cache.invalidate(user_id)
+        forecast_cache.invalidate(campaign_ids)
+        dashboard_hub.campaigns_changed(campaign_ids)
+    return result
+
+
+async def sync_user(
+    user_id: int,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    platforms: Optional[Sequence[str]] = None,
+    progress: Optional[dict] = None,
+    transport=None,
+) -> List[SyncResult]:
+    """Sync all connected platforms of a user concurrently, `until` defaulting to today."""
+    until = until or date.today()
+    since = since or until - timedelta(days=settings.sync_default_days - 1)
+    connections = await run_in_threadpool(_load_connections, user_id, platforms)
+    changed: Set[int] = set()
+
+    async def run(platform: str, access_token: str) -> SyncResult:
+        result = await sync_platform(user_id, platform, access_token, since, until, changed, transport)
+        if progress is not None:
+            progress[platform] = asdict(result)
+        return result
+
+    results = await asyncio.gather(*(run(platform, token) for platform, token in connections))
+    if changed:
+        snapshot_cache.invalidate(user_id)
+        forecast_cache.invalidate(changed)
+        dashboard_hub.campaigns_changed(changed)
+    return list(results)
+
+
+# One sync per user at a time, manual (POST /api/platforms/sync) or
+# scheduled (app.scheduler): both claim the user first. Claims are per
+# process, like the scheduler itself.
+
+_running: Set[int] = set()
+_running_lock = threading.Lock()
+
+
+def claim_sync(user_id: int) -> bool:
+    with _running_lock:
+        if user_id in _running:
+            return False
+        _running.add(user_id)
+        return True
+
+
+def release_sync(user_id: int) -> None:
+    with _running_lock:
+        _running.discard(user_id)
+
+
+def run_sync_job(job, user_id: int, since: Optional[date], until: Optional[date], platforms=None) -> None:
+    """Background job body: its own event loop in the job thread; releases the user's claim."""
+    try:
+        asyncio.run(sync_user(user_id, since, until, platforms, progress=job.progress))
+    finally:
+        release_sync(user_id)
@@ -0,0 +1,262 @@
+# app/context_snapshot.py
+"""
+Per-user context snapshot for the AI assistant.
+
+A snapshot keeps one small stats row per campaign (totals, last-7-days vs
+previous-7-days, open suggestions) plus the rollups derived from them, so
+the chat endpoint can build its prompt without running analytics queries.
+Totals include archived days (app.metric_archive); the 7-day windows are
+always live. Snapshots live in a size-bounded LRU cache and are refreshed one campaign
+at a time when that campaign's metrics, settings or suggestions change.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from app import kpis, metric_archive, models
+
+TREND_WINDOW_DAYS = 7
+TOP_CAMPAIGNS = 3
+MAX_CACHED_USERS = 1000
+
+
+@dataclass
+class CampaignStats:
+    campaign_id: int
+    name: str
+    status: str
+    spend: float = 0.0
+    impressions: int = 0
+    clicks: int = 0
+    purchases: float = 0.0
+    revenue: float = 0.0
+    recent_spend: float = 0.0
+    recent_revenue: float = 0.0
+    previous_spend: float = 0.0
+    previous_revenue: float = 0.0
+    open_suggestions: List[str] = field(default_factory=list)
+
+    @property
+    def roas(self) -> float:
+        return self.revenue / self.spend if self.spend else 0.0
+
+    @property
+    def trend(self) -> str:
+        recent = self.recent_revenue / self.recent_spend if self.recent_spend else 0.0
+        previous = self.previous_revenue / self.previous_spend if self.previous_spend else 0.0
+        if not previous:
+            return "stable"
+        if recent > previous * 1.2:
+            return "improving"
+        if recent < previous * 0.8:
+            return "declining"
+        return "stable"
+
+
+@dataclass
+class UserContextSnapshot:
+    user_id: int
+    built_on: date
+    campaigns: Dict[int, CampaignStats] = field(default_factory=dict)
+    top_campaigns: List[CampaignStats] = field(default_factory=list)
+    totals: Dict[str, float] = field(default_factory=dict)
+
+    def recompute(self) -> None:
+        """Re-derive rollups from the per-campaign rows (no database access)."""
+        stats = list(self.campaigns.values())
+        spend = sum(s.spend for s in stats)
+        revenue = sum(s.revenue for s in stats)
+        self.totals = {
+            "campaigns": len(stats),
+            "spend": spend,
+            "impressions": sum(s.impressions for s in stats),
+            "clicks": sum(s.clicks for s in stats),
+            "purchases": sum(s.purchases for s in stats),
+            "roas": revenue / spend if spend else 0.0,
+            "open_suggestions": sum(len(s.open_suggestions) for s in stats),
+        }
+        self.top_campaigns = sorted(
+            (s for s in stats if s.spend), key=lambda s: (s.roas, s.spend), reverse=True
+        )[:TOP_CAMPAIGNS]
+
+    @property
+    def best_campaign(self) -> Optional[CampaignStats]:
+        return self.top_campaigns[0] if self.top_campaigns else None
+
+    def to_prompt(self) -> str:
+        """Render the snapshot as a compact block of text for the assistant prompt."""
+        t = self.totals
+        lines = [
+            f"Campaigns: {t.get('campaigns', 0)}, spend {t.get('spend', 0):.2f}, "
+            f"clicks {t.get('clicks', 0)}, purchases {t.get('purchases', 0):.0f}, "
+            f"ROAS {t.get('roas', 0):.2f}"
+        ]
+        for s in self.top_campaigns:
+            lines.append(
+                f"- {s.name} ({s.status}): spend {s.spend:.2f}, ROAS {s.roas:.2f}, trend {s.trend}"
+            )
+        suggestions = [
+            f"- {s.name}: {text}" for s in self.campaigns.values() for text in s.open_suggestions
+        ]
+        if suggestions:
+            lines.append("Open suggestions:")
+            lines.extend(suggestions[:5])
+        return "\n".join(lines)
+
+
+def _stats_query(db: Session, today: date):
+    recent_start = today - timedelta(days=TREND_WINDOW_DAYS)
+    previous_start = recent_start - timedelta(days=TREND_WINDOW_DAYS)
+    m = models.CampaignMetric
+    revenue = m.revenue
+    is_recent = m.metric_date >= recent_start
+    is_previous = and_(m.metric_date >= previous_start, m.metric_date < recent_start)
+    return db.query(
+        models.Campaign.id,
+        models.Campaign.name,
+        models.Campaign.status,
+        func.coalesce(func.sum(m.spend), 0),
+        func.coalesce(func.sum(m.impressions), 0),
+        func.coalesce(func.sum(m.clicks), 0),
+        func.coalesce(func.sum(func.coalesce(m.purchases, 0)), 0),
+        func.coalesce(func.sum(revenue), 0),
+        func.coalesce(func.sum(case((is_recent, m.spend), else_=0)), 0),
+        func.coalesce(func.sum(case((is_recent, revenue), else_=0)), 0),
+        func.coalesce(func.sum(case((is_previous, m.spend), else_=0)), 0),
+        func.coalesce(func.sum(case((is_previous, revenue), else_=0)), 0),
+    ).outerjoin(
+        m, m.campaign_id == models.Campaign.id
+    ).group_by(
+        models.Campaign.id, models.Campaign.name, models.Campaign.status
+    )
+
+
+def _load_stats(db: Session, today: date, user_id: int = None, campaign_id: int = None) -> Dict[int, CampaignStats]:
+    query = _stats_query(db, today)
+    suggestions = db.query(
+        models.OptimizationSuggestion.campaign_id, models.OptimizationSuggestion.suggestion
+    ).filter(models.OptimizationSuggestion.applied == False)
+
+    if campaign_id is not None:
+        query = query.filter(models.Campaign.id == campaign_id)
+        suggestions = suggestions.filter(models.OptimizationSuggestion.campaign_id == campaign_id)
+    else:
+        query = query.join(
+            models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+        ).filter(models.AdAccount.user_id == user_id)
+        suggestions = suggestions.join(
+            models.Campaign, models.Campaign.id == models.OptimizationSuggestion.campaign_id
+        ).join(
+            models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+        ).filter(models.AdAccount.user_id == user_id)
+
+    stats = {}
+    for row in query.all():
+        status = row[2].value if hasattr(row[2], "value") else str(row[2])
+        stats[row[0]] = CampaignStats(row[0], row[1], status, *(float(v) for v in row[3:]))
+    # All-time totals include the days moved to the metric archive
+    campaigns = db.query(models.Campaign.id, models.Campaign.account_id, models.Campaign.id)
+    if campaign_id is not None:
+        campaigns = campaigns.filter(models.Campaign.id == campaign_id)
+    else:
+        campaigns = campaigns.join(
+            models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+        ).filter(models.AdAccount.user_id == user_id)
+    for cid, sums in metric_archive.archived_totals(db, campaigns).items():
+        if cid in stats:
+            for name in kpis.BASE_MEASURES:
+                setattr(stats[cid], name, getattr(stats[cid], name) + sums[name])
+    for cid, text in suggestions.all():
+        if cid in stats:
+            stats[cid].open_suggestions.append(text)
+    return stats
+
+
+class SnapshotCache:
+    """Size-bounded LRU cache of UserContextSnapshot objects."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_USERS):
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[int, UserContextSnapshot]" = OrderedDict()
+        self._campaign_owner: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, db: Session, user_id: int) -> UserContextSnapshot:
+        """Return the cached snapshot for a user, building it on a miss or a new day."""
+        today = date.today()
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None and snapshot.built_on == today:
+                self._snapshots.move_to_end(user_id)
+                return snapshot
+
+        snapshot = UserContextSnapshot(user_id=user_id, built_on=today)
+        snapshot.campaigns = _load_stats(db, today, user_id=user_id)
+        snapshot.recompute()
+
+        with self._lock:
+            self._store(snapshot)
+        return snapshot
+
+    def refresh_campaign(self, db: Session, campaign_id: int, user_id: int = None) -> None:
+        """
+        Recompute a single campaign's row in its owner's snapshot.
+
+        Does nothing when the owner has no cached snapshot; it will be built
+        from scratch on the next chat turn anyway.
+        """
+        with self._lock:
+            owner = user_id if user_id is not None else self._campaign_owner.get(campaign_id)
+            snapshot = self._snapshots.get(owner) if owner is not None else None
+        if snapshot is None:
+            return
+
+        stats = _load_stats(db, snapshot.built_on, campaign_id=campaign_id)
+        with self._lock:
+            if stats:
+                snapshot.campaigns.update(stats)
+                self._campaign_owner[campaign_id] = snapshot.user_id
+            else:
+                snapshot.campaigns.pop(campaign_id, None)
+                self._campaign_owner.pop(campaign_id, None)
+            snapshot.recompute()
+
+    def drop_campaign(self, campaign_id: int) -> None:
+        """Remove a deleted campaign from its owner's snapshot."""
+        with self._lock:
+            owner = self._campaign_owner.pop(campaign_id, None)
+            snapshot = self._snapshots.get(owner) if owner is not None else None
+            if snapshot is not None:
+                snapshot.campaigns.pop(campaign_id, None)
+                snapshot.recompute()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            snapshot = self._snapshots.pop(user_id, None)
+            if snapshot is not None:
+                for cid in snapshot.campaigns:
+                    self._campaign_owner.pop(cid, None)
+
+    def _store(self, snapshot: UserContextSnapshot) -> None:
+        old = self._snapshots.pop(snapshot.user_id, None)
+        if old is not None:
+            for cid in old.campaigns:
+                self._campaign_owner.pop(cid, None)
+        self._snapshots[snapshot.user_id] = snapshot
+        for cid in snapshot.campaigns:
+            self._campaign_owner[cid] = snapshot.user_id
+        while len(self._snapshots) > self.max_entries:
+            _, evicted = self._snapshots.popitem(last=False)
+            for cid in evicted.campaigns:
+                self._campaign_owner.pop(cid, None)
+
+
+snapshot_cache = SnapshotCache()
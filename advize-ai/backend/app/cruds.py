@@ -1,9 +1,17 @@
+import logging
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, select
 from datetime import datetime, timedelta
 import secrets
-from . import models, schemas
+from . import anomaly, kpis, metric_archive, models, schemas
+from .context_snapshot import snapshot_cache
+from .forecasting import forecast_cache
+from .live import dashboard_hub
 from .utils.password import hash_password, verify_password
+from .pagination import keyset_page
+
+logger = logging.getLogger(__name__)
+
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
@@ -60,12 +68,12 @@ def create_oauth_credential(
 
 def verify_oauth_credential(
     db: Session,
-    #email: str,
+    email: str,
     verification_code: str
 ):
     return db.query(models.OAuthCredential).filter(
         and_(
-            #models.OAuthCredential.email == email,
+            models.OAuthCredential.email == email,
             models.OAuthCredential.verification_code == verification_code,
             models.OAuthCredential.code_expires_at > datetime.utcnow(),
             models.OAuthCredential.is_verified == False
@@ -98,14 +106,66 @@ def upsert_oauth(db: Session, user_id: int, oauth: schemas.OAuthCredentialBase):
     db.commit()
     return db_oauth
 
+# Columns a list endpoint may select with fields=, in response order
+AD_ACCOUNT_COLUMNS = {
+    name: getattr(models.AdAccount, name)
+    for name in ("id", "user_id", "platform", "external_id", "status", "connected_at")
+}
+CAMPAIGN_COLUMNS = {
+    name: getattr(models.Campaign, name)
+    for name in ("id", "account_id", "name", "status", "start_date", "end_date", "created_at")
+}
+
+def list_ad_accounts_page(
+    db: Session,
+    user_id: int,
+    fields,
+    after_id: int = None,
+    limit: int = 100,
+    status: schemas.AdAccountStatus = None,
+    platform: str = None
+):
+    """One keyset page of a user's ad accounts as row tuples of `fields`."""
+    query = db.query(*[AD_ACCOUNT_COLUMNS[name] for name in fields]).filter(
+        models.AdAccount.user_id == user_id
+    )
+    if status is not None:
+        query = query.filter(models.AdAccount.status == models.AdAccountStatus(status.value))
+    if platform:
+        query = query.filter(models.AdAccount.platform == platform)
+    return keyset_page(query, models.AdAccount.id, after_id, limit).all()
+
+def list_campaigns_page(
+    db: Session,
+    user_id: int,
+    fields,
+    after_id: int = None,
+    limit: int = 100,
+    status: schemas.CampaignStatus = None,
+    platform: str = None,
+    name_prefix: str = None
+):
+    """One keyset page of the campaigns in a user's ad accounts as row tuples of `fields`."""
+    owned_accounts = select(models.AdAccount.id).where(models.AdAccount.user_id == user_id)
+    if platform:
+        owned_accounts = owned_accounts.where(models.AdAccount.platform == platform)
+    query = db.query(*[CAMPAIGN_COLUMNS[name] for name in fields]).filter(
+        models.Campaign.account_id.in_(owned_accounts)
+    )
+    if status is not None:
+        query = query.filter(models.Campaign.status == models.CampaignStatus(status.value))
+    if name_prefix:
+        query = query.filter(models.Campaign.name.startswith(name_prefix, autoescape=True))
+    return keyset_page(query, models.Campaign.id, after_id, limit).all()
+
 def get_ad_accounts(db: Session, user_id: int):
     try:
-        print(f"Fetching ad accounts for user_id: {user_id}")
+        logger.debug("Fetching ad accounts for user_id: %s", user_id)
         accounts = db.query(models.AdAccount).filter(models.AdAccount.user_id == user_id).all()
-        print(f"Found {len(accounts)} accounts")
+        logger.debug("Found %s accounts", len(accounts))
         return accounts
     except Exception as e:
-        print(f"Error in get_ad_accounts: {str(e)}")
+        logger.error(f"Error in get_ad_accounts: {str(e)}")
         raise
 
 def get_ad_account(db: Session, account_id: int, user_id: int):
@@ -147,18 +207,91 @@ def create_campaign(db: Session, campaign: schemas.CampaignCreate):
     db.refresh(db_cmp)
     return db_cmp
 
+def _owned_account_ids(db: Session, user_id: int):
+    return db.query(models.AdAccount.id).filter(models.AdAccount.user_id == user_id).scalar_subquery()
+
+def delete_campaign(db: Session, campaign_id: int, user_id: int) -> bool:
+    """Delete a campaign owned by the user; metrics and suggestions go with it via ON DELETE CASCADE."""
+    deleted = db.query(models.Campaign).filter(
+        models.Campaign.id == campaign_id,
+        models.Campaign.account_id.in_(_owned_account_ids(db, user_id))
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted > 0
+
+def user_metric_rows_exceed(db: Session, user_id: int, limit: int) -> bool:
+    """Cheaply check whether a user owns more than `limit` metric rows (stops counting at limit + 1)."""
+    campaign_ids = db.query(models.Campaign.id).filter(
+        models.Campaign.account_id.in_(_owned_account_ids(db, user_id))
+    ).scalar_subquery()
+    sample = db.query(models.CampaignMetric.campaign_id).filter(
+        models.CampaignMetric.campaign_id.in_(campaign_ids)
+    ).limit(limit + 1).subquery()
+    return db.query(func.count()).select_from(sample).scalar() > limit
+
+def delete_user(db: Session, user_id: int) -> bool:
+    """Delete a user and, through ON DELETE CASCADE, everything they own, then their archived metrics."""
+    account_ids = [a for (a,) in db.query(models.AdAccount.id).filter(models.AdAccount.user_id == user_id)]
+    deleted = db.query(models.User).filter(models.User.id == user_id).delete(synchronize_session=False)
+    db.commit()
+    metric_archive.purge_accounts(account_ids)
+    return deleted > 0
+
+def purge_user_in_chunks(session_factory, user_id: int, chunk_size: int = 5000, progress: dict = None) -> int:
+    """
+    Delete a very large user in many short transactions.
+
+    Metric rows are removed campaign by campaign, at most `chunk_size` rows
+    per transaction, walking the (campaign_id, metric_date) primary key.
+    The remaining rows are small enough for a single cascading delete of
+    the user. Returns the number of metric rows deleted.
+    """
+    m = models.CampaignMetric
+    progress = progress if progress is not None else {}
+    db = session_factory()
+    try:
+        campaign_ids = [cid for (cid,) in db.query(models.Campaign.id).filter(
+            models.Campaign.account_id.in_(_owned_account_ids(db, user_id))
+        ).all()]
+        progress.update({"campaigns_total": len(campaign_ids), "campaigns_done": 0, "metrics_deleted": 0})
+
+        for campaign_id in campaign_ids:
+            while True:
+                upper = db.query(m.metric_date).filter(
+                    m.campaign_id == campaign_id
+                ).order_by(m.metric_date).offset(chunk_size - 1).limit(1).scalar()
+                chunk = db.query(m).filter(m.campaign_id == campaign_id)
+                if upper is not None:
+                    chunk = chunk.filter(m.metric_date <= upper)
+                progress["metrics_deleted"] += chunk.delete(synchronize_session=False)
+                db.commit()
+                if upper is None:
+                    break
+            progress["campaigns_done"] += 1
+
+        delete_user(db, user_id)
+        return progress["metrics_deleted"]
+    finally:
+        db.close()
+
 def get_metrics(db: Session, campaign_id: int):
     return db.query(models.CampaignMetric).filter(models.CampaignMetric.campaign_id == campaign_id).all()
 
 def upsert_metric(db: Session, metric: schemas.CampaignMetricCreate):
     db_m = db.query(models.CampaignMetric).get((metric.campaign_id, metric.metric_date))
     if db_m:
-        for key, val in metric.dict(exclude_unset=True).items():
+        for key, val in kpis.fill_revenue(metric.dict(exclude_unset=True)).items():
             setattr(db_m, key, val)
     else:
-        db_m = models.CampaignMetric(**metric.dict())
+        db_m = models.CampaignMetric(**kpis.fill_revenue(metric.dict()))
         db.add(db_m)
+    anomaly.observe(db, [{
+        name: getattr(db_m, name) for name in ("campaign_id", "metric_date", *kpis.BASE_MEASURES)
+    }])
     db.commit()
+    snapshot_cache.refresh_campaign(db, metric.campaign_id)
+    forecast_cache.invalidate([metric.campaign_id])
+    dashboard_hub.campaigns_changed([metric.campaign_id])
     return db_m
 
 def get_suggestions(db: Session, campaign_id: int):
@@ -169,6 +302,7 @@ def create_suggestion(db: Session, suggestion: schemas.OptimizationSuggestionCre
     db.add(db_s)
     db.commit()
     db.refresh(db_s)
+    snapshot_cache.refresh_campaign(db, db_s.campaign_id)
     return db_s
 
 def create_chat_session(db: Session, user_id: int):
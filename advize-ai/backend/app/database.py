@@ -1,19 +1,101 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from sqlalchemy.orm import Session, sessionmaker
 
-load_dotenv()  # 🔴 Charge les variables de .env
+from app.config import settings
+from app.instrumentation import Counter
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+logger = logging.getLogger(__name__)
 
-print("DATABASE_URL =", DATABASE_URL)
+Base = declarative_base()
+
+# The engine is created on first use rather than at import, so importing
+# the app (tests, CLIs, worker boot) never touches the database.
+_engine = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+# Optional read replica (READ_REPLICA_URL), created the same way
+_replica_engine = None
+_replica_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+READ_ROUTING = Counter(
+    "db_read_sessions_total", "Sessions opened for read-only requests, by where they were routed and why.",
+    ("target",),
+)
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _create_engine(url: str) -> Engine:
+    engine = create_engine(url, echo=settings.db_echo, future=True, pool_pre_ping=True)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _enable_sqlite_foreign_keys)
+    return engine
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine(settings.database_url)
+                _session_factory.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def get_replica_engine() -> Optional[Engine]:
+    """Engine of the read replica, or None when no replica is configured."""
+    global _replica_engine
+    if _replica_engine is None and settings.read_replica_url:
+        with _engine_lock:
+            if _replica_engine is None:
+                engine = _create_engine(settings.read_replica_url)
+                _replica_session_factory.configure(bind=engine)
+                _replica_engine = engine
+    return _replica_engine
+
+
+def dispose_engine() -> None:
+    global _engine, _replica_engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _replica_engine is not None:
+            _replica_engine.dispose()
+            _replica_engine = None
+
+
+def SessionLocal(user_id: Optional[int] = None) -> Session:
+    """
+    Open a new session, creating the engine on first use.
+
+    Background writers pass the user whose data they write, so their
+    commits open that user's read-your-writes window like request writes do.
+    """
+    get_engine()
+    session = _session_factory()
+    if user_id is not None:
+        session.info["user_id"] = user_id
+    return session
 
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
-Base = declarative_base()
 def get_db():
     db = SessionLocal()
     try:
@@ -21,4 +103,152 @@ def get_db():
     finally:
         db.close()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+
+# ===== Read replica routing =====
+#
+# Read-only requests may be served by the replica, except:
+#   - for READ_YOUR_WRITES_SECONDS after the same user committed a write,
+#     so users see their own changes. This is best effort: the window is
+#     tracked per worker, so a write committed on another worker (or by
+#     the sync scheduler running elsewhere) does not open it. Writes are
+#     attributed through session.info["user_id"]: stamped by
+#     Auth.get_current_user on request sessions, and by SessionLocal(user_id)
+#     for background writes of one user's data (platform syncs). Alert
+#     digest bookkeeping is not stamped; users never read it;
+#   - while the replica lags by more than REPLICA_MAX_LAG_SECONDS or the
+#     last lag check failed, measured every REPLICA_LAG_CHECK_SECONDS by a
+#     lifespan task. A PostgreSQL standby counts as caught up only while
+#     its WAL receiver is streaming, has replayed all it received and heard
+#     from the primary within REPLICA_RECEIVER_SILENCE_SECONDS; otherwise
+#     its lag is the age of the last replayed transaction, so a standby cut
+#     off from the primary ages out. Reading pg_stat_wal_receiver needs
+#     pg_read_all_stats; without it every check takes the second path,
+#     which overstates the lag while the primary is idle (reads then go to
+#     the primary, never to a stale replica);
+#   - when the replica refuses a connection: the request falls back to the
+#     primary at once and the replica is treated as stale until the next
+#     successful lag check.
+# Any two databases with the same schema work as primary and replica,
+# e.g. two local SQLite files or PostgreSQL instances; see
+# benchmarks/replica_check.py.
+
+class ReadYourWrites:
+    """When each user last committed a write on this worker."""
+
+    def __init__(self):
+        self._last_write: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def note_write(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[user_id] = now
+            if len(self._last_write) > 10000:
+                cutoff = now - settings.read_your_writes_seconds
+                self._last_write = {uid: t for uid, t in self._last_write.items() if t > cutoff}
+
+    def in_window(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            last = self._last_write.get(user_id)
+        return last is not None and time.monotonic() - last < settings.read_your_writes_seconds
+
+
+class ReplicaMonitor:
+    """Last measured replication lag; the replica is only used while it is known to be fresh."""
+
+    def __init__(self):
+        self.lag: Optional[float] = None  # None until checked, or after a failed check
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= settings.replica_max_lag_seconds
+
+    def mark_unreachable(self) -> None:
+        self.lag = None
+
+    def check(self) -> Optional[float]:
+        """Measure the replica's lag in seconds; marks it unhealthy if it cannot be reached."""
+        engine = get_replica_engine()
+        if engine is None:
+            return None
+        try:
+            with engine.connect() as conn:
+                self.lag = _replication_lag(conn)
+        except Exception as e:
+            logger.warning(f"Read replica lag check failed: {str(e)}")
+            self.lag = None
+        return self.lag
+
+
+def _replication_lag(conn) -> float:
+    if conn.dialect.name != "postgresql":
+        return 0.0  # no replication to measure, e.g. two local SQLite files
+    # Zero for a standalone instance, or a standby streaming and caught up.
+    # A disconnected receiver stops advancing the received LSN too, so
+    # "replayed all it received" alone would report a stale standby fresh.
+    lag = conn.execute(text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN r.status = 'streaming' "
+        "AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "AND now() - r.last_msg_receipt_time <= make_interval(secs => :silence) THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END "
+        "FROM (SELECT 1) AS one LEFT JOIN pg_stat_wal_receiver AS r ON true"
+    ), {"silence": settings.replica_receiver_silence_seconds}).scalar()
+    # NULL: a standby that has not replayed anything yet
+    return float("inf") if lag is None else float(lag)
+
+
+read_your_writes = ReadYourWrites()
+replica_monitor = ReplicaMonitor()
+
+
+@event.listens_for(_session_factory, "after_flush")
+def _flag_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(_session_factory, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(_session_factory, "after_commit")
+def _note_user_write(session):
+    # user_id is stamped on the request's session by Auth.get_current_user
+    if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+        read_your_writes.note_write(session.info["user_id"])
+
+
+def ReadSessionLocal(method: str = "GET", user_id: Optional[int] = None) -> Session:
+    """Open a session on the replica when the request may read from it, otherwise on the primary."""
+    if method not in READ_ONLY_METHODS or get_replica_engine() is None:
+        return SessionLocal()
+    if read_your_writes.in_window(user_id):
+        READ_ROUTING.inc(("primary_recent_write",))
+        return SessionLocal()
+    if not replica_monitor.healthy:
+        READ_ROUTING.inc(("primary_replica_stale",))
+        return SessionLocal()
+    session = _replica_session_factory()
+    try:
+        # Check a connection out now, so an unreachable replica fails here
+        # rather than in the middle of the request
+        session.connection()
+    except OperationalError as e:
+        session.close()
+        logger.warning(f"Read replica unreachable, reading from the primary: {str(e)}")
+        replica_monitor.mark_unreachable()
+        READ_ROUTING.inc(("primary_replica_error",))
+        return SessionLocal()
+    READ_ROUTING.inc(("replica",))
+    return session
+
+
+def init_db() -> None:
+    """Create missing tables; called from the application lifespan."""
+    from app import models  # noqa: F401 - registers the tables on Base.metadata
+
+    Base.metadata.create_all(bind=get_engine())
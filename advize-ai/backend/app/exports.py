@@ -0,0 +1,191 @@
+# app/exports.py
+"""
+Streaming metric exports.
+
+GET /api/exports/metrics streams campaign metrics as CSV or NDJSON for any
+combination of accounts, campaigns and dates. Rows are fetched through a
+server-side cursor in fixed-size batches and written out in ~64 KB chunks,
+so memory use does not depend on the number of rows. The generator is
+synchronous, so Starlette iterates it in a worker thread and the event loop
+stays free for other requests.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, metric_archive
+from app.Auth import get_current_active_user, get_read_db
+from app.config import settings
+from app.database import ReadSessionLocal
+
+router = APIRouter(prefix="/api/exports", tags=["Exports"])
+
+FETCH_BATCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = ["account_id", "campaign_id", "campaign_name"] + metric_archive.METRIC_COLUMNS[1:]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _live_rows(db: Session, account_ids: List[int], campaign_ids, start_date, end_date) -> Iterator[tuple]:
+    m = models.CampaignMetric
+    c = models.Campaign
+    stmt = select(
+        c.account_id, c.id, c.name, *[getattr(m, name) for name in metric_archive.METRIC_COLUMNS[1:]]
+    ).select_from(m).join(
+        c, c.id == m.campaign_id
+    ).where(
+        c.account_id.in_(account_ids)
+    ).order_by(c.account_id, m.campaign_id, m.metric_date)
+    if campaign_ids:
+        stmt = stmt.where(m.campaign_id.in_(campaign_ids))
+    if start_date:
+        stmt = stmt.where(m.metric_date >= start_date)
+    if end_date:
+        stmt = stmt.where(m.metric_date <= end_date)
+
+    # yield_per turns on stream_results: the driver keeps a server-side
+    # cursor and only FETCH_BATCH_SIZE rows are held in memory at a time.
+    result = db.execute(stmt.execution_options(yield_per=FETCH_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _archived_rows(
+    db: Session, account_ids: List[int], campaign_names: dict, campaign_ids, start_date, end_date
+) -> Iterator[tuple]:
+    root = Path(settings.metric_archive_dir)
+    wanted = set(campaign_ids or ())
+    for account_id in account_ids:
+        # Days restated after they were archived are exported once, from the live table
+        ranges = {}
+        for path in metric_archive.segments_for(root, account_id, start_date, end_date):
+            for campaign_id, entry in metric_archive.segment_totals(path).items():
+                if wanted and campaign_id not in wanted:
+                    continue
+                first, last = ranges.get(campaign_id, (entry["first"], entry["last"]))
+                ranges[campaign_id] = (
+                    max(min(first, entry["first"]), start_date or date.min),
+                    min(max(last, entry["last"]), end_date or date.max),
+                )
+        live = metric_archive.live_overlap(db, ranges)
+        for row in metric_archive.iter_archive(
+            root, account_id, campaign_ids or None, start_date, end_date, FETCH_BATCH_SIZE
+        ):
+            if (row.campaign_id, row.metric_date) not in live:
+                yield (account_id, row.campaign_id, campaign_names.get(row.campaign_id)) + tuple(row[1:])
+
+
+def _serialize(rows: Iterator[tuple], fmt: str) -> Iterator[str]:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        parts = []
+        size = 0
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["metric_date"] = record["metric_date"].isoformat()
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            parts.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield "".join(parts)
+                parts = []
+                size = 0
+        yield "".join(parts)
+
+
+def _gzip(chunks: Iterator[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_metrics(user_id, account_ids, campaign_names, campaign_ids, start_date, end_date, fmt, include_archive):
+    """Generate the export body; owns its own session (replica when available) for the lifetime of the stream."""
+    db = ReadSessionLocal("GET", user_id)
+    try:
+        rows = _live_rows(db, account_ids, campaign_ids, start_date, end_date)
+        if include_archive:
+            rows = itertools.chain(
+                _archived_rows(db, account_ids, campaign_names, campaign_ids, start_date, end_date), rows
+            )
+        yield from _serialize(rows, fmt)
+    finally:
+        db.close()
+
+
+@router.get("/metrics")
+def export_metrics(
+    account_ids: Optional[List[int]] = Query(None),
+    campaign_ids: Optional[List[int]] = Query(None),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    include_archive: bool = True,
+    current_user: models.User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream campaign metrics as CSV or NDJSON
+
+    Filters combine: only rows matching every given filter are exported.
+    Only accounts owned by the current user are ever included.
+    """
+    accounts_query = db.query(models.AdAccount.id).filter(models.AdAccount.user_id == current_user.id)
+    if account_ids:
+        accounts_query = accounts_query.filter(models.AdAccount.id.in_(account_ids))
+    owned_accounts = [a for (a,) in accounts_query.all()]
+    if account_ids and len(owned_accounts) != len(set(account_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ad account not found or access denied"
+        )
+
+    campaign_names = {}
+    if include_archive and owned_accounts:
+        # Archived rows only carry ids; names come from one small lookup
+        campaign_names = dict(db.query(models.Campaign.id, models.Campaign.name).filter(
+            models.Campaign.account_id.in_(owned_accounts)
+        ).all())
+
+    body = stream_metrics(
+        current_user.id, owned_accounts, campaign_names, campaign_ids, start_date, end_date, format, include_archive
+    )
+    filename = f"metrics.{format}"
+    headers = {}
+    if gzip:
+        body = _gzip(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    else:
+        media_type = MEDIA_TYPES[format]
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
@@ -0,0 +1,299 @@
+# app/forecasting.py
+"""
+Spend and revenue forecasts for campaigns.
+
+Each campaign's daily spend and revenue over the last FORECAST_HISTORY_DAYS
+are fitted with additive Holt-Winters: a level, a damped trend and a
+weekly season. ROAS is forecast as forecast revenue over forecast spend,
+never as a series of its own (see app.kpis).
+
+Fitting is vectorized with NumPy over every series of a batch at once:
+the recursion walks the days once, updating arrays of shape
+(parameter sets, series), and for every series the smoothing parameters
+with the lowest one-step-ahead error on its own history are kept. A batch
+of 10k campaigns is a few seconds on one core. Series shorter than two
+weeks are forecast with the mean of their last week instead.
+
+Forecasts are cached per campaign for the day, always for
+FORECAST_MAX_DAYS so any shorter horizon is a slice, and dropped as soon
+as the campaign gets new metrics (ingest calls ForecastCache.invalidate).
+A fit that was running while its campaign changed is not cached. Fits read
+the primary (a replica behind the ingest would cache stale forecasts).
+
+The cache and its invalidation are per process: with several workers, a
+sync on one of them does not drop the forecasts cached by the others,
+which serve them until the next day or until they ingest the campaign
+themselves.
+
+numpy is only needed to forecast; without it the endpoints answer 503.
+"""
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+# Imported on first use, not with the app: numpy adds ~100 ms to startup
+np = None
+
+logger = logging.getLogger(__name__)
+
+SEASON = 7
+PHI = 0.9  # trend damping; an undamped trend runs away over a few weeks
+ALPHAS = (0.1, 0.3, 0.6)
+BETAS = (0.02, 0.1)
+GAMMAS = (0.05, 0.2, 0.4)
+
+HOLT_WINTERS = "holt_winters"
+RECENT_MEAN = "recent_mean"
+NO_HISTORY = "no_history"
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            raise RuntimeError("numpy is required for forecasting (pip install numpy)")
+        np = numpy
+
+
+@dataclass
+class Forecast:
+    campaign_id: int
+    start_date: date  # first forecast day
+    spend: List[float]
+    revenue: List[float]
+    model: str
+    history_days: int  # days since the campaign's first metric, within the window
+
+
+def fit_series(values, starts, horizon: int):
+    """
+    Forecast `horizon` days for every row of `values`.
+
+    values: (series, days) array, the last column being the most recent day
+    starts: (series,) index of each series' first observed day; earlier
+            columns are ignored
+
+    Returns the (series, horizon) forecasts, floored at zero, and a boolean
+    array telling which series got the seasonal model.
+    """
+    _require_numpy()
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    count, days = values.shape
+    forecasts = np.zeros((count, horizon))
+    seasonal = days - starts >= 2 * SEASON
+    steps = np.arange(1, horizon + 1)
+
+    # Short series: mean of the last (up to) seven observed days
+    short = ~seasonal & (starts < days)
+    if short.any():
+        recent = np.arange(days)[None, :] >= np.maximum(starts[short], days - SEASON)[:, None]
+        means = (values[short] * recent).sum(axis=1) / recent.sum(axis=1)
+        forecasts[short] = means[:, None]
+    if not seasonal.any():
+        return forecasts, seasonal
+
+    y = values[seasonal]
+    start = starts[seasonal]
+    n = len(y)
+    series = np.arange(n)
+
+    # Initial state from the first two weeks: level and season from the
+    # first, trend from the change between the two. Season slots are
+    # indexed by day % 7, so every series shares the same calendar.
+    first = np.take_along_axis(y, start[:, None] + np.arange(2 * SEASON), axis=1)
+    level0 = first[:, :SEASON].mean(axis=1)
+    trend0 = (first[:, SEASON:].mean(axis=1) - level0) / SEASON
+    season0 = np.zeros((n, SEASON))
+    season0[series[:, None], (start[:, None] + np.arange(SEASON)) % SEASON] = first[:, :SEASON] - level0[:, None]
+
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+    alpha, beta, gamma = (grid[:, i, None] for i in range(3))  # (sets, 1)
+    level = np.repeat(level0[None, :], len(grid), axis=0)  # (sets, series)
+    trend = np.repeat(trend0[None, :], len(grid), axis=0)
+    season = np.repeat(season0[None, :, :], len(grid), axis=0)  # (sets, series, 7)
+    sse = np.zeros_like(level)
+
+    # The recursion starts after the first week; errors count after the second
+    for t in range(int(start.min()) + SEASON, days):
+        active = t >= start + SEASON
+        if not active.any():
+            continue
+        scored = t >= start + 2 * SEASON
+        slot = t % SEASON
+        observed = y[:, t]
+        previous = season[:, :, slot]
+        damped = level + PHI * trend
+        error = observed - (damped + previous)
+        new_level = alpha * (observed - previous) + (1 - alpha) * damped
+        new_trend = beta * (new_level - level) + (1 - beta) * PHI * trend
+        new_season = gamma * (observed - new_level) + (1 - gamma) * previous
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, :, slot] = np.where(active, new_season, previous)
+        sse += np.where(scored, error * error, 0.0)
+
+    best = sse.argmin(axis=0)
+    level, trend = level[best, series], trend[best, series]
+    season = season[best, series]  # (series, 7)
+    damping = np.cumsum(PHI ** steps)
+    slots = (days - 1 + steps) % SEASON
+    forecasts[seasonal] = level[:, None] + trend[:, None] * damping[None, :] + season[:, slots]
+    return np.maximum(forecasts, 0.0), seasonal
+
+
+def load_series(db: Session, campaign_ids: Sequence[int], end: date, days: int):
+    """
+    Daily spend and revenue of the campaigns up to `end`, missing days as zero; one query.
+
+    The window is shorter than METRIC_ARCHIVE_AFTER_DAYS, so it is all in
+    the live table.
+    """
+    m = models.CampaignMetric
+    first_day = end - timedelta(days=days - 1)
+    index = {campaign_id: i for i, campaign_id in enumerate(campaign_ids)}
+    spend = np.zeros((len(campaign_ids), days))
+    revenue = np.zeros((len(campaign_ids), days))
+    starts = np.full(len(campaign_ids), days, dtype=np.int64)  # no metric: nothing observed
+    for campaign_id, metric_date, day_spend, day_revenue in db.query(
+        m.campaign_id, m.metric_date, m.spend, m.revenue
+    ).filter(
+        m.campaign_id.in_(list(campaign_ids)),
+        m.metric_date.between(first_day, end)
+    ):
+        row, column = index[campaign_id], (metric_date - first_day).days
+        spend[row, column] = day_spend or 0.0
+        revenue[row, column] = day_revenue or 0.0
+        starts[row] = min(starts[row], column)
+    return spend, revenue, starts
+
+
+def fit_campaigns(db: Session, campaign_ids: Sequence[int], today: date) -> List[Forecast]:
+    """Fit spend and revenue of the campaigns in one vectorized batch, from the last complete day."""
+    _require_numpy()
+    if not campaign_ids:
+        return []
+    days = settings.forecast_history_days
+    spend, revenue, starts = load_series(db, campaign_ids, today - timedelta(days=1), days)
+    # Spend and revenue are stacked and fitted as independent series
+    fitted, seasonal = fit_series(
+        np.vstack([spend, revenue]), np.concatenate([starts, starts]), settings.forecast_max_days
+    )
+    count = len(campaign_ids)
+    return [
+        Forecast(
+            campaign_id=campaign_id,
+            start_date=today,
+            spend=fitted[i].tolist(),
+            revenue=fitted[count + i].tolist(),
+            model=HOLT_WINTERS if seasonal[i] else (RECENT_MEAN if starts[i] < days else NO_HISTORY),
+            history_days=int(days - starts[i]),
+        )
+        for i, campaign_id in enumerate(campaign_ids)
+    ]
+
+
+class ForecastCache:
+    """Size-bounded LRU of today's forecasts by campaign."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._forecasts: "OrderedDict[int, Forecast]" = OrderedDict()
+        self._fits: List[Set[int]] = []  # campaigns invalidated during each running fit
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._forecasts)
+
+    def get_many(self, campaign_ids: Iterable[int], today: date) -> Dict[int, Forecast]:
+        found = {}
+        with self._lock:
+            for campaign_id in campaign_ids:
+                forecast = self._forecasts.get(campaign_id)
+                if forecast is not None and forecast.start_date == today:
+                    self._forecasts.move_to_end(campaign_id)
+                    found[campaign_id] = forecast
+        return found
+
+    def begin_fit(self) -> Set[int]:
+        """Start recording invalidations for a fit about to read metrics."""
+        changed: Set[int] = set()
+        with self._lock:
+            self._fits.append(changed)
+        return changed
+
+    def end_fit(self, changed: Set[int], forecasts: Iterable[Forecast]) -> None:
+        """Store a fit's forecasts, except those of campaigns that changed while it ran."""
+        with self._lock:
+            self._fits.remove(changed)
+            for forecast in forecasts:
+                if forecast.campaign_id not in changed:
+                    self._forecasts[forecast.campaign_id] = forecast
+                    self._forecasts.move_to_end(forecast.campaign_id)
+            while len(self._forecasts) > self.max_entries:
+                self._forecasts.popitem(last=False)
+
+    def invalidate(self, campaign_ids: Iterable[int]) -> None:
+        """Drop the forecasts of campaigns that got new metrics; safe from any thread."""
+        with self._lock:
+            for campaign_id in campaign_ids:
+                self._forecasts.pop(campaign_id, None)
+                for changed in self._fits:
+                    changed.add(campaign_id)
+
+
+forecast_cache = ForecastCache(settings.forecast_cache_size)
+
+
+def campaign_forecasts(db: Session, campaign_ids: Sequence[int]) -> Dict[int, Forecast]:
+    """Forecasts of the campaigns, fitting every cache miss in one batch."""
+    _require_numpy()
+    today = date.today()
+    result = forecast_cache.get_many(campaign_ids, today)
+    missing = [campaign_id for campaign_id in campaign_ids if campaign_id not in result]
+    if missing:
+        changed = forecast_cache.begin_fit()
+        fitted: List[Forecast] = []
+        try:
+            fitted = fit_campaigns(db, missing, today)
+        finally:
+            forecast_cache.end_fit(changed, fitted)
+        logger.debug("Fitted forecasts for %s campaigns", len(fitted))
+        result.update((forecast.campaign_id, forecast) for forecast in fitted)
+    return result
+
+
+def summarize(forecast_days: int, series: Iterable[Tuple[List[float], List[float]]], start: date) -> dict:
+    """Daily points and totals over `forecast_days` of summed (spend, revenue) forecasts."""
+    spend = [0.0] * forecast_days
+    revenue = [0.0] * forecast_days
+    for spend_values, revenue_values in series:
+        for i in range(forecast_days):
+            spend[i] += spend_values[i]
+            revenue[i] += revenue_values[i]
+    total_spend, total_revenue = sum(spend), sum(revenue)
+    return {
+        "points": [
+            {
+                "date": start + timedelta(days=i),
+                "spend": spend[i],
+                "revenue": revenue[i],
+                "roas": revenue[i] / spend[i] if spend[i] else None,
+            }
+            for i in range(forecast_days)
+        ],
+        "total_spend": total_spend,
+        "total_revenue": total_revenue,
+        "roas": total_revenue / total_spend if total_spend else None,
+    }
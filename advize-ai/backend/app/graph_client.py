@@ -0,0 +1,35 @@
+# app/graph_client.py
+"""
+Shared HTTP client for the Facebook Graph API.
+
+One AsyncClient (and its connection pool) is created on first use and
+closed by the application lifespan, instead of opening a new client and
+TLS connection for every request.
+"""
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+GRAPH_API_URL = "https://graph.facebook.com/v23.0"
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_graph_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=GRAPH_API_URL,
+            timeout=settings.graph_api_timeout,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_graph_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,318 @@
+# app/instrumentation.py
+"""
+Per-request SQL and latency instrumentation.
+
+An ASGI middleware opens a RequestStats record for every HTTP request and
+SQLAlchemy cursor events (registered on every Engine) add each statement's
+duration and row count to it. When the response finishes, the totals are
+observed into Prometheus histograms labelled by method and route template,
+served as text on GET /metrics together with the other registered
+counters (credential checks and their CPU cost). Requests slower than SLOW_REQUEST_MS are
+logged together with their statements, grouped so N+1 loops stand out.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 500
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_time: float = 0.0
+    rows: int = 0
+    # statement text -> [executions, seconds]
+    by_statement: Dict[str, List] = field(default_factory=dict)
+
+    def record(self, statement: str, seconds: float, rows: int) -> None:
+        self.statements += 1
+        self.db_time += seconds
+        if rows > 0:
+            self.rows += rows
+        entry = self.by_statement.get(statement)
+        if entry is None:
+            self.by_statement[statement] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def worst_statements(self, limit: int) -> List[Tuple[str, int, float]]:
+        ranked = sorted(self.by_statement.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request."""
+    return _request_stats.get()
+
+
+class track_statements:
+    """Collect SQL stats for a block of code outside the HTTP middleware (jobs, scripts, benchmarks)."""
+
+    def __enter__(self) -> RequestStats:
+        self.stats = RequestStats()
+        self._token = _request_stats.set(self.stats)
+        return self.stats
+
+    def __exit__(self, *exc) -> None:
+        _request_stats.reset(self._token)
+
+
+# SQLAlchemy hooks
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    starts = conn.info.get("query_start_time")
+    if stats is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    # DB-API rowcount: rows returned by SELECT on PostgreSQL, rows affected
+    # by DML everywhere; SQLite reports -1 for SELECT.
+    stats.record(statement[:MAX_STATEMENT_LENGTH], elapsed, cursor.rowcount)
+
+
+# Prometheus metrics; every metric registers itself for GET /metrics
+
+REGISTRY: List = []
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames=("method", "route")):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            label_text = ",".join(
+                f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {value:g}" if label_text else f"{self.name} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            label_text = ",".join(
+                f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, labels)
+            )
+            lines.append(f"{self.name}{{{label_text}}} {value:g}" if label_text else f"{self.name} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements executed per HTTP request.",
+    (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+REQUEST_DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per HTTP request.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+REQUEST_ROWS = Histogram(
+    "db_rows_per_request", "Rows returned or affected by SQL per HTTP request.",
+    (0, 1, 10, 100, 1000, 10000, 100000),
+)
+CREDENTIAL_CHECKS = Counter(
+    "auth_credential_checks_total", "Credential checks by kind (password = bcrypt, refresh = HMAC lookup).",
+    ("kind",),
+)
+CREDENTIAL_CPU = Counter(
+    "auth_credential_cpu_seconds_total", "Thread CPU time spent checking credentials, by kind.",
+    ("kind",),
+)
+
+
+class count_credential_check:
+    """Count a password or refresh-token check and the CPU it used on this thread."""
+
+    def __init__(self, kind: str):
+        self.labels = (kind,)
+
+    def __enter__(self):
+        self._start = time.thread_time()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        CREDENTIAL_CPU.inc(self.labels, time.thread_time() - self._start)
+        CREDENTIAL_CHECKS.inc(self.labels)
+
+
+# Middleware
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    app = scope.get("app")
+    for candidate in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", "unmatched")
+    # Never label by raw path: unmatched URLs would create unbounded series
+    return "unmatched"
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware so streaming responses are timed until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            self._observe(scope, stats, elapsed, status_code)
+
+    @staticmethod
+    def _observe(scope, stats: RequestStats, elapsed: float, status_code: int) -> None:
+        route = _route_label(scope)
+        if route == "/metrics":
+            return
+        labels = (scope["method"], route)
+        REQUEST_LATENCY.observe(labels, elapsed)
+        REQUEST_STATEMENTS.observe(labels, stats.statements)
+        REQUEST_DB_TIME.observe(labels, stats.db_time)
+        REQUEST_ROWS.observe(labels, stats.rows)
+
+        if elapsed * 1000 >= settings.slow_request_ms:
+            statements = "\n".join(
+                f"  {count}x {seconds * 1000:.1f} ms  {sql}"
+                for sql, count, seconds in stats.worst_statements(settings.slow_request_log_statements)
+            )
+            logger.warning(
+                f"Slow request {scope['method']} {scope['path']} -> {status_code} "
+                f"({route}): {elapsed * 1000:.1f} ms, {stats.statements} statements, "
+                f"{stats.db_time * 1000:.1f} ms in DB, {stats.rows} rows\n{statements}"
+            )
+
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of every registered metric"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -0,0 +1,93 @@
+# app/jobs.py
+"""
+In-process background jobs.
+
+Long-running maintenance work (e.g. deleting a very large tenant) runs on a
+small thread pool so the request that triggered it can return right away
+with a job id. Job ids are random UUIDs and act as the handle for polling
+GET /api/jobs/{job_id}; that endpoint needs no login because the job may
+outlive the account that started it.
+"""
+import logging
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.schemas import JobRead
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_JOBS = 1000
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "pending"  # pending, running, completed, failed
+    progress: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int = 2, max_jobs: int = MAX_TRACKED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, kind: str, fn: Callable, *args) -> Job:
+        """Run fn(job, *args) in the background; fn may update job.progress as it goes."""
+        job = Job(id=str(uuid.uuid4()), kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable, args) -> None:
+        job.status = "running"
+        try:
+            fn(job, *args)
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {traceback.format_exc()}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs first; running ones are never dropped
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+
+job_registry = JobRegistry()
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job(job_id: str):
+    """Get the status and progress of a background job"""
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return JobRead(**job.__dict__)
@@ -0,0 +1,89 @@
+# app/kpis.py
+"""
+KPI definitions over additive base measures.
+
+CAMPAIGN_METRIC stores per-day base measures that can be summed over any
+set of rows: spend, impressions, clicks, purchases and revenue (conversion
+value). Every ratio is derived from those sums, never averaged:
+
+    ctr  = SUM(clicks)  / SUM(impressions)
+    cpc  = SUM(spend)   / SUM(clicks)
+    roas = SUM(revenue) / SUM(spend)
+    cpp  = SUM(spend)   / SUM(purchases)
+
+so a rollup at any grain (day, campaign, account, date range, filter) is
+one aggregate query, and days with more traffic weigh more, as they should.
+The stored per-day ctr/cpc/roas/cpp columns are kept for existing clients
+but are no longer read for reporting.
+
+`kpi_columns` builds the SQL expressions; `derive` applies the same
+definitions to sums computed in Python, e.g. for archived rows.
+"""
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import Float, cast, func
+
+from app import models
+
+BASE_MEASURES = ("spend", "impressions", "clicks", "purchases", "revenue")
+
+# ratio -> (numerator, denominator)
+RATIOS = {
+    "ctr": ("clicks", "impressions"),
+    "cpc": ("spend", "clicks"),
+    "roas": ("revenue", "spend"),
+    "cpp": ("spend", "purchases"),
+}
+
+
+def ratio(numerator, denominator):
+    """SQL ratio, NULL when the denominator is zero; cast so integer sums do not truncate."""
+    return cast(numerator, Float) / func.nullif(denominator, 0)
+
+
+def measure_sums(m=models.CampaignMetric) -> Dict[str, object]:
+    """SUM() of every base measure, zero over no rows."""
+    return {name: func.coalesce(func.sum(getattr(m, name)), 0) for name in BASE_MEASURES}
+
+
+def kpi_columns(m=models.CampaignMetric, aggregate: bool = True, names: Optional[Iterable[str]] = None) -> List:
+    """
+    Labelled columns for the base measures and ratios: summed over the
+    group when `aggregate`, or per row otherwise. `names` picks a subset.
+    """
+    if aggregate:
+        measures = measure_sums(m)
+    else:
+        measures = {name: func.coalesce(getattr(m, name), 0) for name in BASE_MEASURES}
+    columns = dict(measures)
+    for name, (numerator, denominator) in RATIOS.items():
+        columns[name] = ratio(measures[numerator], measures[denominator])
+    names = list(names) if names is not None else list(BASE_MEASURES) + list(RATIOS)
+    return [columns[name].label(name) for name in names]
+
+
+def derive(sums: Mapping[str, float]) -> Dict[str, Optional[float]]:
+    """Ratios from base-measure sums; None where the denominator is zero."""
+    return {
+        name: (sums[numerator] or 0) / sums[denominator] if sums[denominator] else None
+        for name, (numerator, denominator) in RATIOS.items()
+    }
+
+
+def rollup(rows: Iterable) -> Dict[str, Optional[float]]:
+    """Sum the base measures of metric rows (anything with the attributes) and derive the ratios."""
+    sums = dict.fromkeys(BASE_MEASURES, 0)
+    for row in rows:
+        for name in BASE_MEASURES:
+            sums[name] += getattr(row, name) or 0
+    return {**sums, **derive(sums)}
+
+
+def fill_revenue(values: dict) -> dict:
+    """Derive revenue from ROAS for writers that only send the ratio."""
+    if values.get("revenue") is None:
+        if "roas" in values:
+            values["revenue"] = (values["roas"] or 0) * (values.get("spend") or 0)
+        else:
+            values.pop("revenue", None)
+    return values
@@ -0,0 +1,322 @@
+# app/live.py
+"""
+Live dashboard updates over a WebSocket.
+
+A client connected to /ws/dashboard first receives a "snapshot" (its
+campaigns with the latest day's metrics, plus totals) and then a "delta"
+whenever campaigns or metrics it owns change: only the changed campaigns,
+the ids of deleted ones and the new totals. Deltas carry whole campaign
+entries, so applying one twice, or after a newer snapshot, is harmless.
+
+Writers only record which campaigns changed (DashboardHub.campaigns_changed,
+thread-safe and a no-op while nobody is connected). A background loop in
+app.main calls DashboardHub.flush every LIVE_FLUSH_MS, which builds the
+deltas of all connected users with a fixed number of queries; a bulk ingest
+therefore costs one message per user, not one per row.
+
+Every connection has a send queue of LIVE_QUEUE_SIZE messages. When a slow
+client lets it fill up, the backlog is dropped and replaced by a single
+resync marker, answered with a fresh snapshot once the client catches up,
+so memory per connection stays bounded whatever the client does. The server
+pings every LIVE_HEARTBEAT_SECONDS; connections that send nothing for two
+intervals, or that stall a send for LIVE_SEND_TIMEOUT_SECONDS, are closed.
+
+The hub lives in the process: with several workers, a change is pushed by
+the worker that wrote it, to the clients connected to that worker.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app import kpis, metric_archive, models
+from app.config import settings
+from app.database import SessionLocal
+from app.instrumentation import Counter
+from app.serialization import dumps, rows_to_dicts
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CAMPAIGN_COLUMNS = [
+    models.Campaign.id, models.Campaign.name, models.Campaign.status,
+    models.Campaign.start_date, models.Campaign.end_date, models.Campaign.account_id,
+]
+DASHBOARD_METRIC_KEYS = [*kpis.BASE_MEASURES, *kpis.RATIOS, "metric_date"]
+TOTAL_KEYS = [*kpis.BASE_MEASURES, *kpis.RATIOS]
+EMPTY_TOTALS = {**dict.fromkeys(kpis.BASE_MEASURES, 0), **dict.fromkeys(kpis.RATIOS)}
+
+PING = {"type": "ping"}
+PONG = {"type": "pong"}
+RESYNC = {"type": "resync"}  # queue marker, sent as a fresh snapshot
+
+LIVE_MESSAGES = Counter(
+    "live_dashboard_messages_total", "Messages sent to live dashboard clients, by type.", ("type",)
+)
+LIVE_OVERFLOWS = Counter(
+    "live_dashboard_queue_overflows_total", "Send queues that filled up and were replaced by a snapshot."
+)
+
+
+# Dashboard queries, shared with GET /api/dashboard/campaigns
+
+def latest_metrics(db: Session, condition) -> Dict[int, dict]:
+    """Latest day's metrics of every campaign matching `condition`, one query."""
+    m = models.CampaignMetric
+    latest_dates = db.query(
+        m.campaign_id,
+        func.max(m.metric_date).label("metric_date")
+    ).join(
+        models.Campaign,
+        models.Campaign.id == m.campaign_id
+    ).filter(condition).group_by(m.campaign_id).subquery()
+    return {
+        row[0]: dict(zip(DASHBOARD_METRIC_KEYS, row[1:]))
+        for row in db.query(
+            m.campaign_id,
+            *kpis.kpi_columns(aggregate=False),
+            m.metric_date
+        ).join(
+            latest_dates,
+            and_(
+                m.campaign_id == latest_dates.c.campaign_id,
+                m.metric_date == latest_dates.c.metric_date
+            )
+        )
+    }
+
+
+def dashboard_campaigns(db: Session, condition) -> List[dict]:
+    """Campaigns matching `condition` as plain dicts, each with its latest metrics."""
+    result = rows_to_dicts(
+        [column.key for column in DASHBOARD_CAMPAIGN_COLUMNS],
+        db.query(*DASHBOARD_CAMPAIGN_COLUMNS).filter(condition).all()
+    )
+    metrics = latest_metrics(db, condition)
+    for campaign in result:
+        campaign["metrics"] = metrics.get(campaign["id"], {})
+    return result
+
+
+def user_totals(db: Session, user_ids: Iterable[int]) -> Dict[int, dict]:
+    """KPI totals over all metrics of each user, live and archived; one grouped query for the live ones."""
+    user_ids = list(user_ids)
+    rows = db.query(
+        models.AdAccount.user_id,
+        *kpis.kpi_columns()
+    ).join(
+        models.Campaign, models.Campaign.account_id == models.AdAccount.id
+    ).join(
+        models.CampaignMetric, models.CampaignMetric.campaign_id == models.Campaign.id
+    ).filter(
+        models.AdAccount.user_id.in_(user_ids)
+    ).group_by(models.AdAccount.user_id)
+    totals = {row[0]: dict(zip(TOTAL_KEYS, row[1:])) for row in rows}
+    archived = metric_archive.archived_totals(db, db.query(
+        models.Campaign.id, models.Campaign.account_id, models.AdAccount.user_id
+    ).join(
+        models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+    ).filter(models.AdAccount.user_id.in_(user_ids)))
+    for user_id, sums in archived.items():
+        merged = {name: totals.get(user_id, EMPTY_TOTALS)[name] + sums[name] for name in kpis.BASE_MEASURES}
+        totals[user_id] = {**merged, **kpis.derive(merged)}
+    return totals
+
+
+def build_snapshot(user_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        owned = models.Campaign.account_id.in_(
+            select(models.AdAccount.id).where(models.AdAccount.user_id == user_id)
+        )
+        return {
+            "type": "snapshot",
+            "campaigns": dashboard_campaigns(db, owned),
+            "totals": user_totals(db, [user_id]).get(user_id, EMPTY_TOTALS),
+        }
+    finally:
+        db.close()
+
+
+def build_deltas(changed: Set[int], removed: Dict[int, Set[int]], user_ids: List[int]) -> Dict[int, dict]:
+    """Deltas of the connected users owning a changed campaign or having lost one."""
+    db = SessionLocal()
+    try:
+        changed_by_user: Dict[int, Set[int]] = {}
+        if changed:
+            for campaign_id, user_id in db.query(
+                models.Campaign.id, models.AdAccount.user_id
+            ).join(
+                models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+            ).filter(
+                models.Campaign.id.in_(changed),
+                models.AdAccount.user_id.in_(user_ids)
+            ):
+                changed_by_user.setdefault(user_id, set()).add(campaign_id)
+        affected = set(changed_by_user) | set(removed)
+        if not affected:
+            return {}
+
+        campaign_ids = set().union(*changed_by_user.values())
+        campaigns = {
+            campaign["id"]: campaign
+            for campaign in dashboard_campaigns(db, models.Campaign.id.in_(campaign_ids))
+        } if campaign_ids else {}
+        totals = user_totals(db, affected)
+        return {
+            user_id: {
+                "type": "delta",
+                "campaigns": [
+                    campaigns[campaign_id]
+                    for campaign_id in sorted(changed_by_user.get(user_id, ()))
+                    if campaign_id in campaigns
+                ],
+                "removed": sorted(removed.get(user_id, ())),
+                "totals": totals.get(user_id, EMPTY_TOTALS),
+            }
+            for user_id in affected
+        }
+    finally:
+        db.close()
+
+
+# Connections
+
+class Connection:
+    def __init__(self, websocket: WebSocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.live_queue_size)
+
+    def offer(self, message: dict) -> None:
+        """Queue a message; when the queue is full, drop the backlog for a resync."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            LIVE_OVERFLOWS.inc()
+
+
+class DashboardHub:
+    """Connected dashboards by user, and the changes not pushed to them yet."""
+
+    def __init__(self):
+        # Connections are only added and removed on the event loop
+        self._connections: Dict[int, Set[Connection]] = {}
+        self._lock = threading.Lock()
+        self._changed: Set[int] = set()  # campaign ids, owners resolved on flush
+        self._removed: Dict[int, Set[int]] = {}  # user id -> deleted campaign ids
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        if user_id is not None:
+            return len(self._connections.get(user_id, ()))
+        return sum(len(connections) for connections in self._connections.values())
+
+    def campaigns_changed(self, campaign_ids: Iterable[int]) -> None:
+        """Record that campaigns or their metrics were written; safe from any thread."""
+        if not self._connections:
+            return
+        with self._lock:
+            self._changed.update(campaign_ids)
+
+    def campaign_removed(self, user_id: int, campaign_id: int) -> None:
+        """Record a deleted campaign; its owner can no longer be looked up on flush."""
+        if user_id not in self._connections:
+            return
+        with self._lock:
+            self._removed.setdefault(user_id, set()).add(campaign_id)
+
+    async def flush(self) -> None:
+        """Build and queue the deltas of everything recorded since the last flush."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            removed, self._removed = self._removed, {}
+        user_ids = list(self._connections)
+        if not user_ids or not (changed or removed):
+            return
+        deltas = await run_in_threadpool(build_deltas, changed, removed, user_ids)
+        for user_id, delta in deltas.items():
+            for connection in list(self._connections.get(user_id, ())):
+                connection.offer(delta)
+
+    async def serve(self, websocket: WebSocket, user_id: int) -> None:
+        """Run one authenticated dashboard connection until either side ends it."""
+        # Accept before refusing, so browsers see the close code instead of a failed handshake
+        await websocket.accept()
+        if self.connection_count(user_id) >= settings.live_max_connections_per_user:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        connection = Connection(websocket, user_id)
+        self._connections.setdefault(user_id, set()).add(connection)
+        connection.offer(RESYNC)  # the first message is a snapshot
+        tasks = {
+            asyncio.create_task(self._send_loop(connection)),
+            asyncio.create_task(self._receive_loop(connection)),
+        }
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.info(f"Closing dashboard connection of user {user_id}: {error!r}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            connections = self._connections.get(user_id)
+            if connections is not None:
+                connections.discard(connection)
+                if not connections:
+                    del self._connections[user_id]
+            try:
+                await websocket.close()
+            except RuntimeError:
+                pass  # already closed by the client
+
+    @staticmethod
+    async def _send_loop(connection: Connection) -> None:
+        while True:
+            try:
+                message = await asyncio.wait_for(connection.queue.get(), timeout=settings.live_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                message = PING
+            if message is RESYNC:
+                message = await run_in_threadpool(build_snapshot, connection.user_id)
+            # A client that stops reading must not hold the task (and its queue) forever
+            await asyncio.wait_for(
+                connection.websocket.send_text(dumps(message).decode()),
+                timeout=settings.live_send_timeout_seconds
+            )
+            LIVE_MESSAGES.inc((message["type"],))
+
+    @staticmethod
+    async def _receive_loop(connection: Connection) -> None:
+        # Any message proves the client alive; it answers our pings with pongs
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    connection.websocket.receive(), timeout=2 * settings.live_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.info(f"Dashboard client of user {connection.user_id} missed its heartbeat")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+            try:
+                kind = json.loads(message.get("text") or "{}").get("type")
+            except (ValueError, AttributeError):
+                continue
+            if kind == "ping":
+                connection.offer(PONG)
+            elif kind == "resync":
+                connection.offer(RESYNC)
+
+
+dashboard_hub = DashboardHub()
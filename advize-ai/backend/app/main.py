@@ -1,40 +1,169 @@
 # app/main.py
+import asyncio
+import logging
 import uuid
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Query, Response, WebSocket
+from fastapi.security import SecurityScopes
 import app.cruds as cruds
 from app import models
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
+from typing_extensions import TypedDict
 from datetime import datetime, timedelta, date
 from pydantic import BaseModel
 import httpx
-from app.database import engine, Base, get_db
+from app.database import get_db, get_engine, init_db, dispose_engine, SessionLocal, replica_monitor
 from app import models
 from app.cruds import create_ad_account, get_ad_accounts
 from app import schemas
-from app.Auth import router as AuthRouter, get_current_active_user
+from app.Auth import router as AuthRouter, get_current_active_user, get_read_db
+from app.exports import router as ExportsRouter
+from app.alerts import router as AlertsRouter
+from app.connectors.api import router as PlatformsRouter
+from app.jobs import router as JobsRouter, job_registry
+from app.instrumentation import QueryStatsMiddleware, router as MetricsRouter
+from app.logging_config import RequestIdMiddleware, configure_logging, shutdown_logging
 from app.models import User, Campaign, CampaignMetric, OptimizationSuggestion, ChatSession, ChatMessage, AdAccount
 from fastapi import APIRouter, Depends, status
 from fastapi.responses import JSONResponse
 from app.schemas import UserProfileResponse
+from app.context_snapshot import snapshot_cache, UserContextSnapshot
+from app.config import settings
+from app import forecasting, kpis, notifications, partitioning, metric_archive, sweeper
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from app.graph_client import get_graph_client, close_graph_client
+from app.serialization import FastJSONResponse, SchemaJSONResponse
+from app.compression import CompressionMiddleware, precompressed_response
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_response, parse_fields
 # app/routers/dashboard_router.py
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from app.Auth import get_current_user
+from app.Auth import get_current_user, get_current_user_payload
+from app.live import dashboard_campaigns, dashboard_hub
+from app.scheduler import sync_scheduler
+from app.revocation import revocation_list
+from app import refresh_tokens
 from app.database import get_db
 from app.models import User, AdAccount, Campaign, CampaignMetric
 from app.schemas import DashboardMetricsResponse
 
-# Create tables if needed
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+PARTITION_MAINTENANCE_INTERVAL = 24 * 60 * 60  # seconds
+
+async def maintain_partitions():
+    """Keep future CAMPAIGN_METRIC partitions created when partitioning is enabled"""
+    while True:
+        try:
+            await run_in_threadpool(
+                partitioning.run_maintenance,
+                get_engine(),
+                settings.metric_partition_months_ahead,
+                settings.metric_retention_months
+            )
+        except Exception as e:
+            logger.error(f"Metric partition maintenance failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+
+def _rebuild_revocation_list():
+    db = SessionLocal()
+    try:
+        count = revocation_list.rebuild(db)
+        logger.debug("Revocation filter rebuilt with %s tokens", count)
+    finally:
+        db.close()
+
+async def refresh_revocations():
+    """Rebuild the revoked-token Bloom filter so revocations from other workers are seen"""
+    while True:
+        await asyncio.sleep(settings.revocation_rebuild_seconds)
+        try:
+            await run_in_threadpool(_rebuild_revocation_list)
+        except Exception as e:
+            logger.error(f"Revocation filter rebuild failed: {str(e)}", exc_info=True)
+
+async def sweep_expired_rows():
+    """Delete expired verification codes, reset tokens and auth tokens in small batches"""
+    while True:
+        try:
+            await run_in_threadpool(sweeper.sweep_expired, get_engine(), settings.sweep_batch_size)
+        except Exception as e:
+            logger.error(f"Expired row sweep failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.sweep_interval_seconds)
+
+async def push_dashboard_deltas():
+    """Send the campaign and metric changes of the last window to connected dashboards"""
+    while True:
+        await asyncio.sleep(settings.live_flush_ms / 1000)
+        try:
+            await dashboard_hub.flush()
+        except Exception as e:
+            logger.error(f"Live dashboard flush failed: {str(e)}", exc_info=True)
+
+async def send_alert_digests():
+    """Email every user one digest of the anomaly alerts raised during the last window"""
+    while True:
+        await asyncio.sleep(settings.notification_digest_minutes * 60)
+        try:
+            await run_in_threadpool(notifications.send_digests)
+        except Exception as e:
+            logger.error(f"Alert digest run failed: {str(e)}", exc_info=True)
+
+async def monitor_replica():
+    """Measure read replica lag so reads fall back to the primary while it is stale"""
+    while True:
+        await asyncio.sleep(settings.replica_lag_check_seconds)
+        await run_in_threadpool(replica_monitor.check)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start-up and shutdown of the process-wide resources.
+
+    Nothing here runs at import time: the DB engine, SMTP settings and the
+    Graph API client are all created lazily on first use, and this hook
+    only does the work a serving worker needs before taking traffic.
+    """
+    configure_logging()
+    background_tasks = []
+    if settings.db_create_all:
+        # Create tables if needed
+        await run_in_threadpool(init_db)
+    # Load revoked tokens before serving, so none slips through after a restart
+    await run_in_threadpool(_rebuild_revocation_list)
+    background_tasks.append(asyncio.create_task(refresh_revocations()))
+    background_tasks.append(asyncio.create_task(sweep_expired_rows()))
+    background_tasks.append(asyncio.create_task(push_dashboard_deltas()))
+    if settings.sync_scheduler_enabled:
+        background_tasks.append(asyncio.create_task(sync_scheduler.run()))
+    if settings.notification_digests and settings.smtp_configured:
+        background_tasks.append(asyncio.create_task(send_alert_digests()))
+    if settings.read_replica_url:
+        # Reads stay on the primary until the replica has been checked once
+        await run_in_threadpool(replica_monitor.check)
+        background_tasks.append(asyncio.create_task(monitor_replica()))
+    if settings.metric_partitioning:
+        background_tasks.append(asyncio.create_task(maintain_partitions()))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_graph_client()
+    dispose_engine()
+    shutdown_logging()
 
 app = FastAPI(
     title="AdsAi API",
     description="Backend FastAPI pour AdsAi",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS
@@ -44,13 +173,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "Link"],
 )
+app.add_middleware(CompressionMiddleware)
+# Times everything below it, including CORS handling and compression
+app.add_middleware(QueryStatsMiddleware)
+# Added last so the request id is bound before anything else logs
+app.add_middleware(RequestIdMiddleware)
 
 # Include auth router
 app.include_router(AuthRouter, prefix="/auth", tags=["Authentication"])
+app.include_router(ExportsRouter)
+app.include_router(PlatformsRouter)
+app.include_router(AlertsRouter)
+app.include_router(JobsRouter)
+app.include_router(MetricsRouter)
 
 @app.post("/logout", status_code=200)
-def logout(current_user: User = Depends(get_current_user)):
+def logout(
+    current_user: User = Depends(get_current_user),
+    payload: dict = Depends(get_current_user_payload),
+    db: Session = Depends(get_db)
+):
+    revocation_list.revoke(db, payload)
+    if payload.get("fid"):
+        refresh_tokens.revoke_family(db, payload["fid"])
     return {"message": "Successfully logged out. Please delete the token on the client side."}
 
 @app.get("/me", response_model=UserProfileResponse)
@@ -60,32 +207,28 @@ def get_profile(current_user: User = Depends(get_current_user)):
 @app.get("/dashboard/metrics", response_model=DashboardMetricsResponse)
 def get_dashboard_metrics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    # Get all user ad accounts
-    accounts = db.query(AdAccount).filter_by(user_id=current_user.id).all()
-    account_ids = [account.id for account in accounts]
-
-    # Get campaigns for these accounts
-    campaigns = db.query(Campaign).filter(Campaign.account_id.in_(account_ids)).all()
-    campaign_ids = [c.id for c in campaigns]
-
-    # Aggregate metrics
-    metrics = db.query(
-        CampaignMetric
-    ).filter(CampaignMetric.campaign_id.in_(campaign_ids)).all()
-
-    # Sum up the numbers
-    total_spend = sum(m.spend for m in metrics)
-    total_clicks = sum(m.clicks for m in metrics)
-    total_impressions = sum(m.impressions for m in metrics)
-    total_purchases = sum(m.purchases or 0 for m in metrics)
+    # Sum the metrics of every campaign the user owns in a single aggregate
+    totals = db.query(
+        *kpis.kpi_columns(names=("spend", "clicks", "impressions", "purchases"))
+    ).join(
+        Campaign, Campaign.id == CampaignMetric.campaign_id
+    ).join(
+        AdAccount, AdAccount.id == Campaign.account_id
+    ).filter(AdAccount.user_id == current_user.id).one()
+    # Plus the days moved to the metric archive
+    archived = metric_archive.archived_totals(db, db.query(
+        Campaign.id, Campaign.account_id, AdAccount.user_id
+    ).join(
+        AdAccount, AdAccount.id == Campaign.account_id
+    ).filter(AdAccount.user_id == current_user.id)).get(current_user.id, {})
 
     return {
-        "total_spend": total_spend,
-        "total_clicks": total_clicks,
-        "total_impressions": total_impressions,
-        "total_purchases": total_purchases
+        "total_spend": totals.spend + archived.get("spend", 0),
+        "total_clicks": totals.clicks + archived.get("clicks", 0),
+        "total_impressions": totals.impressions + archived.get("impressions", 0),
+        "total_purchases": totals.purchases + archived.get("purchases", 0)
     }
 
 @app.post("/api/accounts", response_model=schemas.AdAccountRead, status_code=status.HTTP_201_CREATED)
@@ -100,19 +243,36 @@ def create_account(
 
 @app.get("/api/accounts", response_model=List[schemas.AdAccountRead])
 def list_accounts(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Return accounts with an id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    account_status: Optional[schemas.AdAccountStatus] = Query(None, alias="status"),
+    platform: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the account fields"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """List all ad accounts for the current user"""
+    """
+    List the current user's ad accounts, one page at a time
+
+    Pages are ordered by id; pass the X-Next-After-Id response header as
+    `after_id` to get the next page. `fields` limits the returned keys.
+    """
     try:
-        print(f"Current user ID: {current_user.id}")
-        accounts = cruds.get_ad_accounts(db=db, user_id=current_user.id)
-        print(f"Retrieved accounts: {accounts}")
-        return accounts
+        logger.debug("Current user ID: %s", current_user.id)
+        keys = parse_fields(fields, cruds.AD_ACCOUNT_COLUMNS)
+        accounts = cruds.list_ad_accounts_page(
+            db, current_user.id, keys, after_id=after_id, limit=limit,
+            status=account_status, platform=platform
+        )
+        logger.debug("Retrieved %s accounts", len(accounts))
+        return page_response(request, keys, accounts, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in list_accounts: {error_details}")
+        logger.error(f"Error in list_accounts: {error_details}")
         raise HTTPException(
             status_code=500,
             detail={
@@ -126,11 +286,11 @@ def list_accounts(
 @app.get("/api/dashboard/chart-data")
 async def get_chart_data(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> Dict[str, Any]:
     """Get chart data for the dashboard"""
     try:
-        print(f"Fetching chart data for user: {current_user.id}")
+        logger.debug("Fetching chart data for user: %s", current_user.id)
         
         # Get all user ad accounts
         accounts = cruds.get_ad_accounts(db=db, user_id=current_user.id)
@@ -157,7 +317,7 @@ async def get_chart_data(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_chart_data: {error_details}")
+        logger.error(f"Error in get_chart_data: {error_details}")
         raise HTTPException(
             status_code=500,
             detail={
@@ -169,71 +329,36 @@ async def get_chart_data(
 
 @app.get("/api/dashboard/campaigns", response_model=List[Dict[str, Any]])
 async def get_dashboard_campaigns(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get campaigns for the dashboard with their metrics
     Returns a list of campaigns with their performance metrics
     """
     try:
-        print(f"Fetching dashboard campaigns for user: {current_user.id}")
+        logger.debug("Fetching dashboard campaigns for user: %s", current_user.id)
         
         # Get all user's ad accounts
         accounts = cruds.get_ad_accounts(db=db, user_id=current_user.id)
         account_ids = [account.id for account in accounts]
         
         if not account_ids:
-            print(f"No ad accounts found for user {current_user.id}")
+            logger.debug("No ad accounts found for user %s", current_user.id)
             return []
         
-        # Get campaigns with their metrics
-        campaigns = db.query(
-            models.Campaign
-        ).filter(
-            models.Campaign.account_id.in_(account_ids)
-        ).all()
-        
-        # Prepare response with campaign details and metrics
-        result = []
-        for campaign in campaigns:
-            # Get latest metrics for the campaign
-            latest_metric = db.query(models.CampaignMetric).filter(
-                models.CampaignMetric.campaign_id == campaign.id
-            ).order_by(models.CampaignMetric.metric_date.desc()).first()
-            
-            campaign_data = {
-                "id": campaign.id,
-                "name": campaign.name,
-                "status": campaign.status,
-                "start_date": campaign.start_date,
-                "end_date": campaign.end_date,
-                "account_id": campaign.account_id,
-                "metrics": {}
-            }
-            
-            if latest_metric:
-                campaign_data["metrics"] = {
-                    "spend": latest_metric.spend,
-                    "impressions": latest_metric.impressions,
-                    "clicks": latest_metric.clicks,
-                    "ctr": latest_metric.ctr,
-                    "cpc": latest_metric.cpc,
-                    "roas": latest_metric.roas,
-                    "cpp": latest_metric.cpp,
-                    "purchases": latest_metric.purchases,
-                    "metric_date": latest_metric.metric_date
-                }
-            
-            result.append(campaign_data)
+        # Campaigns with their latest metrics, as plain rows: the response is
+        # encoded straight from them without loading ORM objects
+        result = dashboard_campaigns(db, models.Campaign.account_id.in_(account_ids))
         
-        print(f"Returning {len(result)} campaigns with metrics")
-        return result
+        logger.debug("Returning %s campaigns with metrics", len(result))
+        return precompressed_response(request, SchemaJSONResponse(List[Dict[str, Any]], result))
         
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_dashboard_campaigns: {error_details}")
+        logger.error(f"Error in get_dashboard_campaigns: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -243,39 +368,68 @@ async def get_dashboard_campaigns(
             }
         )
 
+def _websocket_user_id(token: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        user = get_current_user(SecurityScopes(), token, db)
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+    return user.id if user.is_active else None
+
+@app.websocket("/ws/dashboard")
+async def dashboard_updates(websocket: WebSocket, token: str = Query(...)):
+    """
+    Push dashboard changes instead of having the page poll
+    Sends a snapshot on connect, then deltas (changed campaigns, removed ids,
+    new totals). The access token goes in the query string since browsers
+    cannot set headers on WebSocket requests.
+    """
+    user_id = await run_in_threadpool(_websocket_user_id, token)
+    if user_id is None:
+        await websocket.accept()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await dashboard_hub.serve(websocket, user_id)
+
 # ===== Campaign Management Routes =====
 @app.get("/api/campaigns", response_model=List[schemas.CampaignRead])
 async def get_campaigns(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Return campaigns with an id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    campaign_status: Optional[schemas.CampaignStatus] = Query(None, alias="status"),
+    platform: Optional[str] = Query(None, description="Only campaigns of ad accounts on this platform"),
+    name_prefix: Optional[str] = Query(None, max_length=255),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the campaign fields"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get all campaigns for the current user
-    Returns campaigns from all ad accounts owned by the user
+    Get the current user's campaigns, one page at a time
+    Returns campaigns from all ad accounts owned by the user, ordered by id.
+    Pass the X-Next-After-Id response header as `after_id` to get the next
+    page. `fields` limits both the selected columns and the returned keys.
     """
     try:
-        print(f"Fetching campaigns for user: {current_user.id}")
+        logger.debug("Fetching campaigns for user: %s", current_user.id)
         
-        # First get all user's ad accounts
-        accounts = cruds.get_ad_accounts(db=db, user_id=current_user.id)
-        account_ids = [account.id for account in accounts]
-        
-        if not account_ids:
-            print(f"No ad accounts found for user {current_user.id}")
-            return []
-            
-        # Get campaigns from these accounts
-        campaigns = db.query(models.Campaign).filter(
-            models.Campaign.account_id.in_(account_ids)
-        ).all()
+        keys = parse_fields(fields, cruds.CAMPAIGN_COLUMNS)
+        campaigns = cruds.list_campaigns_page(
+            db, current_user.id, keys, after_id=after_id, limit=limit,
+            status=campaign_status, platform=platform, name_prefix=name_prefix
+        )
         
-        print(f"Found {len(campaigns)} campaigns for user {current_user.id}")
-        return campaigns
+        logger.debug("Found %s campaigns for user %s", len(campaigns), current_user.id)
+        return page_response(request, keys, campaigns, limit)
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_campaigns: {error_details}")
+        logger.error(f"Error in get_campaigns: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -293,7 +447,7 @@ async def create_campaign(
 ):
     """Create a new campaign"""
     try:
-        print(f"Creating campaign for user {current_user.id} with data: {campaign_data}")
+        logger.debug("Creating campaign for user %s with data: %s", current_user.id, campaign_data)
         
         # Verify the account exists and belongs to the user
         account = db.query(models.AdAccount).filter(
@@ -319,6 +473,8 @@ async def create_campaign(
         db.add(db_campaign)
         db.commit()
         db.refresh(db_campaign)
+        snapshot_cache.refresh_campaign(db, db_campaign.id, user_id=current_user.id)
+        dashboard_hub.campaigns_changed([db_campaign.id])
         
         return db_campaign
         
@@ -327,7 +483,7 @@ async def create_campaign(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in create_campaign: {error_details}")
+        logger.error(f"Error in create_campaign: {error_details}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -357,7 +513,7 @@ async def update_campaign(
     Only updates fields that are provided in the request
     """
     try:
-        print(f"Updating campaign {campaign_id} for user {current_user.id}")
+        logger.debug("Updating campaign %s for user %s", campaign_id, current_user.id)
         
         # Get the campaign
         campaign = db.query(models.Campaign).join(
@@ -389,6 +545,7 @@ async def update_campaign(
                 )
         
         # Update only provided fields
+        previous_account_id = campaign.account_id
         update_data = campaign_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(campaign, field, value)
@@ -397,6 +554,14 @@ async def update_campaign(
         
         db.commit()
         db.refresh(campaign)
+        if campaign.account_id != previous_account_id:
+            # Archived metrics are stored by account: take them along
+            try:
+                metric_archive.move_campaign(campaign.id, previous_account_id, campaign.account_id)
+            except Exception as e:
+                logger.error(f"Failed to move the archived metrics of campaign {campaign.id}: {str(e)}")
+        snapshot_cache.refresh_campaign(db, campaign.id, user_id=current_user.id)
+        dashboard_hub.campaigns_changed([campaign.id])
         
         return campaign
         
@@ -406,7 +571,7 @@ async def update_campaign(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in update_campaign: {error_details}")
+        logger.error(f"Error in update_campaign: {error_details}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -425,39 +590,20 @@ async def delete_campaign(
 ) -> Dict[str, str]:
     """
     Delete a campaign
-    Also deletes all related metrics and optimizations
+    Also deletes all related metrics and optimizations (ON DELETE CASCADE)
     """
     try:
-        print(f"Deleting campaign {campaign_id} for user {current_user.id}")
-        
-        # Get the campaign with ownership check
-        campaign = db.query(models.Campaign).join(
-            models.AdAccount,
-            models.AdAccount.id == models.Campaign.account_id
-        ).filter(
-            models.Campaign.id == campaign_id,
-            models.AdAccount.user_id == current_user.id
-        ).first()
+        logger.debug("Deleting campaign %s for user %s", campaign_id, current_user.id)
         
-        if not campaign:
+        # Single statement with the ownership check in its WHERE clause
+        if not cruds.delete_campaign(db, campaign_id, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Campaign not found or access denied"
             )
-        
-        # Delete related metrics first (due to foreign key constraint)
-        db.query(models.CampaignMetric).filter(
-            models.CampaignMetric.campaign_id == campaign_id
-        ).delete(synchronize_session=False)
-        
-        # Delete related optimization suggestions
-        db.query(models.OptimizationSuggestion).filter(
-            models.OptimizationSuggestion.campaign_id == campaign_id
-        ).delete(synchronize_session=False)
-        
-        # Now delete the campaign
-        db.delete(campaign)
-        db.commit()
+        snapshot_cache.drop_campaign(campaign_id)
+        forecasting.forecast_cache.invalidate([campaign_id])
+        dashboard_hub.campaign_removed(current_user.id, campaign_id)
         
         return {"message": "Campaign deleted successfully"}
         
@@ -467,7 +613,7 @@ async def delete_campaign(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in delete_campaign: {error_details}")
+        logger.error(f"Error in delete_campaign: {error_details}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -495,25 +641,38 @@ class CampaignInsightsResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
     performance_trend: str  # improving, declining, stable
 
-class CampaignPerformanceResponse(BaseModel):
+class PerformancePoint(TypedDict):
+    date: date
+    spend: float
+    impressions: int
+    clicks: int
+    ctr: Optional[float]
+    cpc: Optional[float]
+    roas: Optional[float]
+    cpp: Optional[float]
+    purchases: float
+    revenue: float
+
+class CampaignPerformanceResponse(TypedDict):
     campaign_id: int
     campaign_name: str
     status: str
-    metrics: List[Dict[str, Any]]
+    metrics: List[PerformancePoint]
     summary: Dict[str, Any]
 
 @app.get("/api/campaigns/{campaign_id}/performance", response_model=CampaignPerformanceResponse)
 async def get_campaign_performance(
     campaign_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get performance metrics for a specific campaign
     Returns time-series metrics and summary statistics
     """
     try:
-        print(f"Fetching performance for campaign {campaign_id} for user {current_user.id}")
+        logger.debug("Fetching performance for campaign %s for user %s", campaign_id, current_user.id)
         
         # Get the campaign with ownership check
         campaign = db.query(models.Campaign).join(
@@ -530,52 +689,42 @@ async def get_campaign_performance(
                 detail="Campaign not found or access denied"
             )
         
-        # Get all metrics for this campaign, ordered by date
-        metrics = db.query(models.CampaignMetric).filter(
-            models.CampaignMetric.campaign_id == campaign_id
-        ).order_by(
-            models.CampaignMetric.metric_date.asc()
-        ).all()
-        
-        # Calculate summary statistics
-        total_spend = sum(m.spend for m in metrics) if metrics else 0
-        total_impressions = sum(m.impressions for m in metrics) if metrics else 0
-        total_clicks = sum(m.clicks for m in metrics) if metrics else 0
-        total_purchases = sum(m.purchases or 0 for m in metrics) if metrics else 0
+        # Get all metrics for this campaign, ordered by date.
+        # Archived history is merged in transparently.
+        metrics = metric_archive.load_metrics(db, [campaign])
         
-        avg_ctr = (sum(m.ctr for m in metrics) / len(metrics)) if metrics else 0
-        avg_cpc = (sum(m.cpc for m in metrics) / len(metrics)) if metrics else 0
-        avg_roas = (sum(m.roas for m in metrics) / len(metrics)) if metrics else 0
-        avg_cpp = (sum(m.cpp for m in metrics) / len(metrics)) if metrics else 0
+        # Summary ratios come from the summed base measures, not from
+        # averaging the daily ratios, so high-traffic days weigh more
+        totals = kpis.rollup(metrics)
         
         # Prepare response
         response = {
             "campaign_id": campaign.id,
             "campaign_name": campaign.name,
-            "status": campaign.status,
+            "status": campaign.status.value,
             "metrics": [
                 {
-                    "date": m.metric_date.isoformat(),
+                    "date": m.metric_date,
                     "spend": m.spend,
                     "impressions": m.impressions,
                     "clicks": m.clicks,
-                    "ctr": m.ctr,
-                    "cpc": m.cpc,
-                    "roas": m.roas,
-                    "cpp": m.cpp,
-                    "purchases": m.purchases or 0
+                    **kpis.derive(m._asdict()),
+                    "purchases": m.purchases or 0,
+                    "revenue": m.revenue
                 }
                 for m in metrics
             ],
             "summary": {
-                "total_spend": total_spend,
-                "total_impressions": total_impressions,
-                "total_clicks": total_clicks,
-                "total_purchases": total_purchases,
-                "avg_ctr": avg_ctr,
-                "avg_cpc": avg_cpc,
-                "avg_roas": avg_roas,
-                "avg_cpp": avg_cpp,
+                "total_spend": totals["spend"],
+                "total_impressions": totals["impressions"],
+                "total_clicks": totals["clicks"],
+                "total_purchases": totals["purchases"],
+                "total_revenue": totals["revenue"],
+                # Key names kept for existing clients; these are ratios of sums
+                "avg_ctr": totals["ctr"] or 0,
+                "avg_cpc": totals["cpc"] or 0,
+                "avg_roas": totals["roas"] or 0,
+                "avg_cpp": totals["cpp"] or 0,
                 "date_range": {
                     "start": metrics[0].metric_date.isoformat() if metrics else None,
                     "end": metrics[-1].metric_date.isoformat() if metrics else None
@@ -583,14 +732,14 @@ async def get_campaign_performance(
             }
         }
         
-        return response
+        return precompressed_response(request, SchemaJSONResponse(CampaignPerformanceResponse, response))
         
     except HTTPException:
         raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_campaign_performance: {error_details}")
+        logger.error(f"Error in get_campaign_performance: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -600,18 +749,141 @@ async def get_campaign_performance(
             }
         )
 
+class ForecastPoint(TypedDict):
+    date: date
+    spend: float
+    revenue: float
+    roas: Optional[float]
+
+class CampaignForecastResponse(TypedDict):
+    campaign_id: int
+    campaign_name: str
+    model: str  # holt_winters, recent_mean or no_history
+    history_days: int
+    points: List[ForecastPoint]
+    total_spend: float
+    total_revenue: float
+    roas: Optional[float]
+
+class CampaignForecastTotals(TypedDict):
+    campaign_id: int
+    campaign_name: str
+    model: str
+    total_spend: float
+    total_revenue: float
+    roas: Optional[float]
+
+class AccountForecastResponse(TypedDict):
+    account_id: int
+    points: List[ForecastPoint]
+    total_spend: float
+    total_revenue: float
+    roas: Optional[float]
+    campaigns: List[CampaignForecastTotals]
+
+def _campaign_forecasts(db: Session, campaign_ids: List[int]) -> Dict[int, forecasting.Forecast]:
+    try:
+        return forecasting.campaign_forecasts(db, campaign_ids)
+    except RuntimeError as e:
+        logger.error(f"Forecasting unavailable: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Forecasting is not available")
+
+@app.get("/api/campaigns/{campaign_id}/forecast", response_model=CampaignForecastResponse)
+def get_campaign_forecast(
+    campaign_id: int,
+    days: int = Query(14, ge=1, le=settings.forecast_max_days),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Forecast daily spend, revenue and ROAS of a campaign for the next `days` days
+
+    Served from the forecast cache; a campaign is refitted after new metrics.
+    Reads the primary, not the replica: a fit from a lagging replica would
+    be cached as fresh until the next invalidation. The cache and its
+    invalidation are per process.
+    """
+    campaign = db.query(models.Campaign.id, models.Campaign.name).join(
+        models.AdAccount,
+        models.AdAccount.id == models.Campaign.account_id
+    ).filter(
+        models.Campaign.id == campaign_id,
+        models.AdAccount.user_id == current_user.id
+    ).first()
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found or access denied"
+        )
+
+    forecast = _campaign_forecasts(db, [campaign.id])[campaign.id]
+    return SchemaJSONResponse(CampaignForecastResponse, {
+        "campaign_id": campaign.id,
+        "campaign_name": campaign.name,
+        "model": forecast.model,
+        "history_days": forecast.history_days,
+        **forecasting.summarize(days, [(forecast.spend, forecast.revenue)], forecast.start_date),
+    })
+
+@app.get("/api/accounts/{account_id}/forecast", response_model=AccountForecastResponse)
+def get_account_forecast(
+    account_id: int,
+    days: int = Query(14, ge=1, le=settings.forecast_max_days),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Forecast the summed daily spend, revenue and ROAS of an ad account's campaigns
+
+    All campaigns without a cached forecast are fitted together in one batch,
+    from the primary like the campaign forecast.
+    """
+    account = db.query(models.AdAccount.id).filter(
+        models.AdAccount.id == account_id,
+        models.AdAccount.user_id == current_user.id
+    ).first()
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found or access denied"
+        )
+
+    campaigns = db.query(models.Campaign.id, models.Campaign.name).filter(
+        models.Campaign.account_id == account_id
+    ).order_by(models.Campaign.id).all()
+    forecasts = _campaign_forecasts(db, [campaign.id for campaign in campaigns])
+    response = {
+        "account_id": account_id,
+        **forecasting.summarize(
+            days, [(f.spend, f.revenue) for f in forecasts.values()], date.today()
+        ),
+        "campaigns": [],
+    }
+    for campaign in campaigns:
+        forecast = forecasts[campaign.id]
+        totals = forecasting.summarize(days, [(forecast.spend, forecast.revenue)], forecast.start_date)
+        response["campaigns"].append({
+            "campaign_id": campaign.id,
+            "campaign_name": campaign.name,
+            "model": forecast.model,
+            "total_spend": totals["total_spend"],
+            "total_revenue": totals["total_revenue"],
+            "roas": totals["roas"],
+        })
+    return SchemaJSONResponse(AccountForecastResponse, response)
+
 @app.get("/api/campaigns/{campaign_id}/insights", response_model=CampaignInsightsResponse)
 async def get_campaign_insights(
     campaign_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get AI-powered insights and recommendations for a campaign
     Analyzes performance data to provide actionable insights
     """
     try:
-        print(f"Generating insights for campaign {campaign_id} for user {current_user.id}")
+        logger.debug("Generating insights for campaign %s for user %s", campaign_id, current_user.id)
         
         # Get the campaign with ownership check
         campaign = db.query(models.Campaign).join(
@@ -629,7 +901,8 @@ async def get_campaign_insights(
             )
         
         # Get recent metrics (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        # Compare against a date so partitioned metric tables can be pruned
+        thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
         metrics = db.query(models.CampaignMetric).filter(
             models.CampaignMetric.campaign_id == campaign_id,
             models.CampaignMetric.metric_date >= thirty_days_ago
@@ -653,15 +926,11 @@ async def get_campaign_insights(
                 "performance_trend": "stable"
             }
         
-        # Calculate metrics
-        total_spend = sum(m.spend for m in metrics)
-        total_impressions = sum(m.impressions for m in metrics)
-        total_clicks = sum(m.clicks for m in metrics)
-        total_purchases = sum(m.purchases or 0 for m in metrics)
-        
-        avg_ctr = (sum(m.ctr for m in metrics) / len(metrics)) if metrics else 0
-        avg_cpc = (sum(m.cpc for m in metrics) / len(metrics)) if metrics else 0
-        avg_roas = (sum(m.roas for m in metrics) / len(metrics)) if metrics else 0
+        # Calculate metrics as ratios of the summed base measures
+        totals = kpis.rollup(metrics)
+        total_spend = totals["spend"]
+        avg_ctr = totals["ctr"] or 0
+        avg_roas = totals["roas"] or 0
         
         # Generate insights
         insights = []
@@ -730,8 +999,8 @@ async def get_campaign_insights(
             first_half = metrics[:len(metrics)//2]
             second_half = metrics[len(metrics)//2:]
             
-            first_roas = sum(m.roas for m in first_half) / len(first_half) if first_half else 0
-            second_roas = sum(m.roas for m in second_half) / len(second_half) if second_half else 0
+            first_roas = kpis.rollup(first_half)["roas"] or 0
+            second_roas = kpis.rollup(second_half)["roas"] or 0
             
             if second_roas > first_roas * 1.2:  # 20% improvement
                 trend = "improving"
@@ -756,7 +1025,7 @@ async def get_campaign_insights(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_campaign_insights: {error_details}")
+        logger.error(f"Error in get_campaign_insights: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -770,7 +1039,7 @@ async def get_campaign_insights(
 @app.get("/api/optimization/recommendations")
 async def get_recommendations(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ) -> List[Dict[str, Any]]:
     """Get optimization recommendations"""
     return []
@@ -804,7 +1073,7 @@ async def generate_recommendations(
         if request is None:
             request = OptimizationRequest()
             
-        print(f"Generating optimizations for user {current_user.id}")
+        logger.debug("Generating optimizations for user %s", current_user.id)
         
         # Get user's ad accounts with ownership check
         accounts_query = db.query(models.AdAccount).filter(
@@ -855,25 +1124,32 @@ async def generate_recommendations(
             }
         
         # Get metrics for analysis (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        # Compare against a date so partitioned metric tables can be pruned
+        thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
+        
+        # Aggregate the metrics of all campaigns in one grouped query
+        metric_totals = {
+            row.campaign_id: row
+            for row in db.query(
+                models.CampaignMetric.campaign_id,
+                *kpis.kpi_columns(names=("ctr", "roas", "spend"))
+            ).filter(
+                models.CampaignMetric.campaign_id.in_([c.id for c in campaigns]),
+                models.CampaignMetric.metric_date >= thirty_days_ago
+            ).group_by(models.CampaignMetric.campaign_id)
+        }
         
         # Generate recommendations for each campaign
         recommendations = []
         
         for campaign in campaigns:
-            # Get campaign metrics
-            metrics = db.query(models.CampaignMetric).filter(
-                models.CampaignMetric.campaign_id == campaign.id,
-                models.CampaignMetric.metric_date >= thirty_days_ago
-            ).all()
-            
-            if not metrics:
+            totals = metric_totals.get(campaign.id)
+            if totals is None:
                 continue
                 
-            # Calculate metrics
-            avg_ctr = sum(m.ctr for m in metrics) / len(metrics)
-            avg_roas = sum(m.roas for m in metrics) / len(metrics)
-            total_spend = sum(m.spend for m in metrics)
+            avg_ctr = totals.ctr or 0
+            avg_roas = totals.roas or 0
+            total_spend = totals.spend
             
             # Generate recommendations based on performance
             if avg_roas < 1.0:
@@ -918,7 +1194,7 @@ async def generate_recommendations(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in generate_recommendations: {error_details}")
+        logger.error(f"Error in generate_recommendations: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -957,7 +1233,7 @@ async def apply_recommendation(
     The system will validate the recommendation and user permissions before applying.
     """
     try:
-        print(f"Applying recommendation {recommendation_id} for user {current_user.id}")
+        logger.debug("Applying recommendation %s for user %s", recommendation_id, current_user.id)
         
         # Get the recommendation with campaign and account info
         recommendation = db.query(
@@ -1050,7 +1326,7 @@ async def apply_recommendation(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in apply_recommendation: {error_details}")
+        logger.error(f"Error in apply_recommendation: {error_details}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1099,7 +1375,7 @@ async def send_chat_message(
     It maintains conversation context and provides AI-powered responses.
     """
     try:
-        print(f"Processing chat message for user {current_user.id}")
+        logger.debug("Processing chat message for user %s", current_user.id)
         
         # Validate message content
         if not message_data.message or not message_data.message.strip():
@@ -1130,11 +1406,13 @@ async def send_chat_message(
         session["messages"].append(user_message)
         
         # Generate AI response (simplified example)
-        # In a real implementation, this would call an AI service
+        # In a real implementation, this would call an AI service.
+        # The snapshot is cached per user, so no analytics queries run here.
         ai_response_text = generate_ai_response(
             message_data.message,
             session["messages"][-5:],  # Last 5 messages for context
-            session["context"]
+            session["context"],
+            snapshot_cache.get(db, current_user.id)
         )
         
         # Add AI response to session
@@ -1188,7 +1466,7 @@ async def send_chat_message(
             
         except Exception as db_error:
             db.rollback()
-            print(f"Database error in send_chat_message: {str(db_error)}")
+            logger.error(f"Database error in send_chat_message: {str(db_error)}")
             # Continue even if database save fails
         
         return {
@@ -1205,7 +1483,7 @@ async def send_chat_message(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in send_chat_message: {error_details}")
+        logger.error(f"Error in send_chat_message: {error_details}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={
@@ -1215,17 +1493,43 @@ async def send_chat_message(
             }
         )
 
-def generate_ai_response(message: str, message_history: List[Dict], context: Dict) -> str:
+def build_ai_prompt(message: str, message_history: List[Dict], snapshot: Optional[UserContextSnapshot] = None) -> str:
+    """
+    Build the prompt for the AI service from the user's context snapshot and recent history
+    """
+    parts = []
+    if snapshot is not None:
+        parts.append("Account context:\n" + snapshot.to_prompt())
+    for m in message_history:
+        parts.append(f"{m['role']}: {m['content']}")
+    parts.append(f"user: {message}")
+    return "\n\n".join(parts)
+
+def generate_ai_response(
+    message: str,
+    message_history: List[Dict],
+    context: Dict,
+    snapshot: Optional[UserContextSnapshot] = None
+) -> str:
     """
     Generate an AI response based on the message and context
     
     This is a simplified example. In a real implementation, you would:
     1. Call an external AI service (e.g., OpenAI, Anthropic, etc.)
+       with the prompt returned by build_ai_prompt
     2. Format the message history appropriately for the AI model
-    3. Include any relevant context from the user's account
+    3. Include any relevant context from the user's account (the snapshot)
     """
     # Simple response for demonstration
-    if "hello" in message.lower():
+    if snapshot is not None and "best" in message.lower() and "campaign" in message.lower():
+        best = snapshot.best_campaign
+        if best is None:
+            return "You don't have any campaigns with spend yet, so there's no best performer to report."
+        return (
+            f"Your best performing campaign is \"{best.name}\" with a ROAS of {best.roas:.2f} "
+            f"on {best.spend:.2f} spend. Its recent trend is {best.trend}."
+        )
+    elif "hello" in message.lower():
         return "Hello! How can I help you with your advertising campaigns today?"
     elif "performance" in message.lower():
         return "I can help analyze your campaign performance. Would you like me to check your recent metrics?"
@@ -1234,16 +1538,16 @@ def generate_ai_response(message: str, message_history: List[Dict], context: Dic
     else:
         return "I'm here to help with your advertising needs. You can ask me about campaign performance, optimization recommendations, or any other questions about your ads."
 
-class ConversationMessage(BaseModel):
+class ConversationMessage(TypedDict):
     id: int
     sender: str
     content: str
     timestamp: datetime
 
-class ConversationResponse(BaseModel):
+class ConversationResponse(TypedDict):
     conversation_id: int
     started_at: datetime
-    ended_at: Optional[datetime] = None
+    ended_at: Optional[datetime]
     messages: List[ConversationMessage]
 
 @app.get(
@@ -1268,7 +1572,7 @@ async def get_conversation(
     including both user messages and AI responses, ordered chronologically.
     """
     try:
-        print(f"Fetching conversation {conversation_id} for user {current_user.id}")
+        logger.debug("Fetching conversation %s for user %s", conversation_id, current_user.id)
         
         # First verify the conversation exists and belongs to the user
         conversation = db.query(models.ChatSession).filter(
@@ -1293,30 +1597,35 @@ async def get_conversation(
                     detail="Conversation not found"
                 )
         
-        # Get all messages for this conversation, ordered by creation time
-        db_messages = db.query(models.ChatMessage).filter(
+        # Get all messages for this conversation, ordered by creation time,
+        # as plain rows encoded without building a model per message
+        db_messages = db.query(
+            models.ChatMessage.id,
+            models.ChatMessage.sender,
+            models.ChatMessage.content,
+            models.ChatMessage.timestamp
+        ).filter(
             models.ChatMessage.session_id == conversation_id
         ).order_by(
             models.ChatMessage.timestamp.asc()
         ).all()
         
-        # Convert to response model
         messages = [
-            ConversationMessage(
-                id=msg.id,
-                sender=msg.sender.value,  # Convert enum to string
-                content=msg.content,
-                timestamp=msg.timestamp
-            )
-            for msg in db_messages
+            {
+                "id": msg_id,
+                "sender": sender.value,  # Convert enum to string
+                "content": content,
+                "timestamp": timestamp
+            }
+            for msg_id, sender, content, timestamp in db_messages
         ]
         
-        return {
+        return SchemaJSONResponse(ConversationResponse, {
             "conversation_id": conversation.id,
             "started_at": conversation.started_at,
             "ended_at": conversation.ended_at,
             "messages": messages
-        }
+        })
         
     except HTTPException:
         db.rollback()
@@ -1324,7 +1633,7 @@ async def get_conversation(
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_conversation: {error_details}")
+        logger.error(f"Error in get_conversation: {error_details}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1349,7 +1658,6 @@ async def get_quick_questions(
 
 
 
-import os
 import logging
 
 logger = logging.getLogger(__name__)
@@ -1363,8 +1671,8 @@ async def connect_facebook_ads() -> dict[str, str]:
     """
     try:
         # Get environment variables
-        client_id = os.getenv("FB_CLIENT_ID")
-        redirect_uri = os.getenv("FB_REDIRECT_URI")
+        client_id = settings.fb_client_id
+        redirect_uri = settings.fb_redirect_uri
         
         # Validate required environment variables
         if not client_id or not redirect_uri:
@@ -1406,22 +1714,15 @@ async def facebook_callback(request: Request):
     code = request.query_params.get("code")
     if not code:
         raise HTTPException(status_code=400, detail="Missing code")
-    ## DIRHOM F ENV
-    client_id = os.getenv("FB_CLIENT_ID") #752714857280409
-    client_secret = os.getenv("FB_CLIENT_SECRET") #201effbef7b2480b1c355ee9eb5d6182
-    redirect_uri = os.getenv("FB_REDIRECT_URI") #http://LOCALHOSTTAEK/facebook/callback
-
-
-    token_url = "https://graph.facebook.com/v23.0/oauth/access_token"
     params = {
-        "client_id": client_id,
-        "redirect_uri": redirect_uri,
-        "client_secret": client_secret,
+        "client_id": settings.fb_client_id,
+        "redirect_uri": settings.fb_redirect_uri,
+        "client_secret": settings.fb_client_secret,
         "code": code
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(token_url, params=params)
+    client = get_graph_client()
+    response = await client.get("/oauth/access_token", params=params)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail=response.text)
@@ -1429,11 +1730,8 @@ async def facebook_callback(request: Request):
     access_token = response.json()["access_token"]
 
     # Now use token to fetch connected ad accounts
-    ad_accounts_url = "https://graph.facebook.com/v23.0/me/adaccounts"
     ad_params = {"fields": "id,name", "access_token": access_token}
-
-    async with httpx.AsyncClient() as client:
-        ad_response = await client.get(ad_accounts_url, params=ad_params)
+    ad_response = await client.get("/me/adaccounts", params=ad_params)
 
     if ad_response.status_code != 200:
         raise HTTPException(status_code=ad_response.status_code, detail=ad_response.text)
@@ -1463,7 +1761,7 @@ async def get_ad_accounts(access_token: str = Query(..., description="Facebook a
                 detail="A valid Facebook access token is required"
             )
             
-        url = "https://graph.facebook.com/v23.0/me/adaccounts"
+        url = "/me/adaccounts"
         params = {
             "fields": "id,name,account_id,account_status,currency,business_name,business_id",
             "access_token": access_token
@@ -1471,31 +1769,30 @@ async def get_ad_accounts(access_token: str = Query(..., description="Facebook a
 
         logger.debug(f"Making request to Facebook Graph API: {url} with params: {params}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, params=params)
-            response_data = response.json()
+        response = await get_graph_client().get(url, params=params)
+        response_data = response.json()
+        
+        logger.debug(f"Facebook API response status: {response.status_code}")
+        logger.debug(f"Facebook API response data: {response_data}")
+        
+        if response.status_code != 200:
+            error_message = response_data.get('error', {}).get('message', 'Unknown error')
+            error_type = response_data.get('error', {}).get('type', 'Unknown')
+            error_code = response_data.get('error', {}).get('code', 0)
             
-            logger.debug(f"Facebook API response status: {response.status_code}")
-            logger.debug(f"Facebook API response data: {response_data}")
+            logger.error(
+                f"Facebook API error: {error_message} (Type: {error_type}, Code: {error_code})"
+            )
             
-            if response.status_code != 200:
-                error_message = response_data.get('error', {}).get('message', 'Unknown error')
-                error_type = response_data.get('error', {}).get('type', 'Unknown')
-                error_code = response_data.get('error', {}).get('code', 0)
-                
-                logger.error(
-                    f"Facebook API error: {error_message} (Type: {error_type}, Code: {error_code})"
-                )
-                
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail={
-                        "message": "Failed to fetch ad accounts from Facebook",
-                        "error": error_message,
-                        "type": error_type,
-                        "code": error_code
-                    }
-                )
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": "Failed to fetch ad accounts from Facebook",
+                    "error": error_message,
+                    "type": error_type,
+                    "code": error_code
+                }
+            )
                 
         logger.info(f"Successfully retrieved {len(response_data.get('data', []))} ad accounts")
         return response_data
@@ -1524,30 +1821,28 @@ async def get_campaigns_and_kpis(
     if not ad_account_id.startswith("act_"):
         ad_account_id = f"act_{ad_account_id}"
 
-    campaigns_url = f"https://graph.facebook.com/v23.0/{ad_account_id}/campaigns"
     campaigns_params = {
         "fields": "id,name,status,effective_status,objective",
         "access_token": access_token
     }
 
-    async with httpx.AsyncClient() as client:
-        campaigns_res = await client.get(campaigns_url, params=campaigns_params)
+    campaigns_res = await get_graph_client().get(f"/{ad_account_id}/campaigns", params=campaigns_params)
 
-        if campaigns_res.status_code != 200:
-            raise HTTPException(status_code=campaigns_res.status_code, detail=campaigns_res.text)
+    if campaigns_res.status_code != 200:
+        raise HTTPException(status_code=campaigns_res.status_code, detail=campaigns_res.text)
 
-        campaigns = campaigns_res.json().get("data", [])
+    campaigns = campaigns_res.json().get("data", [])
 
-        results = []
-        for campaign in campaigns:
-            campaign_id = campaign["id"]
-            
-            results.append({
-                "id": campaign_id,
-                "name": campaign.get("name"),
-                "status": campaign.get("status"),
-                "objective": campaign.get("objective"),
-            })
+    results = []
+    for campaign in campaigns:
+        campaign_id = campaign["id"]
+        
+        results.append({
+            "id": campaign_id,
+            "name": campaign.get("name"),
+            "status": campaign.get("status"),
+            "objective": campaign.get("objective"),
+        })
 
     return results
 # Create CAMPAIGN 
@@ -1562,7 +1857,7 @@ class CampaignCreateRequest(BaseModel):
 @app.post("/facebook/campaigns")
 async def create_campaign(payload: CampaignCreateRequest):
     ad_account_id = f"{payload.ad_account_id}"
-    url = f"https://graph.facebook.com/v23.0/{ad_account_id}/campaigns"
+    url = f"/{ad_account_id}/campaigns"
     params = {
         "access_token": payload.access_token
     }
@@ -1575,8 +1870,7 @@ async def create_campaign(payload: CampaignCreateRequest):
         "special_ad_categories": "[]"
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, params=params, data=data)
+    response = await get_graph_client().post(url, params=params, data=data)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail=response.text)
@@ -1588,15 +1882,14 @@ async def get_campaign_kpis(
     campaign_id: str,
     access_token: str = Query(...)
 ):
-    url = f"https://graph.facebook.com/v23.0/{campaign_id}/insights"
+    url = f"/{campaign_id}/insights"
     params = {
         "fields": "spend,impressions,clicks,ctr,cpc,cpp,reach,purchase_roas,cost_per_result",
         "access_token": access_token,
         "date_preset": "last_7d"  # or "lifetime" or use time_range for custom
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
+    response = await get_graph_client().get(url, params=params)
 
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail=response.text)
@@ -1634,60 +1927,55 @@ async def update_user_profile(
     # Step 4: Return a success response
     return {"message": "Profile updated successfully"}
 
+# Above this many metric rows a user is deleted by a chunked background job
+LARGE_TENANT_METRIC_ROWS = 100000
+
+def _purge_user_job(job, user_id: int):
+    cruds.purge_user_in_chunks(SessionLocal, user_id, progress=job.progress)
+    snapshot_cache.invalidate(user_id)
+
 @app.delete("/api/users/profile")
 async def delete_user_profile(
+    response: Response,
     current_user: models.User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, str]:
     """
     Delete user profile and all related data
     
-    This will:
-    1. Find all ad accounts owned by the user
-    2. For each ad account, find and delete related campaigns
-    3. Delete the ad accounts
-    4. Finally delete the user
+    Ad accounts, campaigns, metrics, suggestions, chat history and tokens
+    are removed by ON DELETE CASCADE foreign keys, archived metrics with
+    their account's segment files. Very large tenants are
+    deactivated immediately and deleted by a chunked background job; the
+    response is then 202 with a job id to poll at /api/jobs/{job_id}.
     """
     try:
-        # Start a transaction
-        with db.begin_nested():
-            # Step 1: Retrieve the current user from DB with relationships
-            user = db.query(models.User).options(
-                joinedload(models.User.ad_accounts)
-                .joinedload(models.AdAccount.campaigns)
-            ).filter(models.User.id == current_user.id).first()
-            
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-
-            # Step 2: Delete all related data
-            for account in user.ad_accounts:
-                # Delete all campaigns for this account
-                for campaign in account.campaigns:
-                    # Delete any related metrics first
-                    db.query(models.CampaignMetric).filter(
-                        models.CampaignMetric.campaign_id == campaign.id
-                    ).delete(synchronize_session=False)
-                    
-                    # Delete the campaign
-                    db.delete(campaign)
-                
-                # Now delete the account
-                db.delete(account)
-            
-            # Step 3: Finally delete the user
-            db.delete(user)
-        
-        # Commit the transaction
-        db.commit()
+        if cruds.user_metric_rows_exceed(db, current_user.id, LARGE_TENANT_METRIC_ROWS):
+            # Lock the account out right away; the data goes in the background
+            current_user.is_active = False
+            db.commit()
+            job = job_registry.submit("delete_user", _purge_user_job, current_user.id)
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {
+                "message": "Profile deletion started",
+                "job_id": job.id,
+                "status_url": f"/api/jobs/{job.id}"
+            }
+
+        # The instance is expired and gone once the delete commits
+        user_id = current_user.id
+        if not cruds.delete_user(db, user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        snapshot_cache.invalidate(user_id)
         
         # Return success response
         return {"message": "Profile and all related data deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error deleting user profile: {str(e)}"
         )
-    
\ No newline at end of file
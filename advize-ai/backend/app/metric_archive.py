@@ -0,0 +1,511 @@
+# app/metric_archive.py
+"""
+Columnar archive for historical CampaignMetric rows.
+
+Rows older than METRIC_ARCHIVE_AFTER_DAYS are moved out of CAMPAIGN_METRIC
+into Parquet segment files, one directory per ad account:
+
+    <METRIC_ARCHIVE_DIR>/account_<id>/<first date>_<last date>.parquet
+
+Every archive run writes a new segment, next to a small JSON file with the
+first and last date and the base-measure sums of each campaign in it. Reads
+pick the segments whose date range overlaps the request from the file names
+alone, open them memory-mapped and merge them with the live rows, so
+callers see a single series regardless of where each day is stored. All-time
+totals add the JSON sums to the live aggregate (archived_totals) instead of
+reading the segments.
+
+A day is in one tier only, except when it was restated after it was archived
+or a run was interrupted before deleting: live rows win, such days are not
+archived a second time, and archived_totals leaves their archived copy out.
+A campaign moved to another account has its rows moved to that account's
+directory (move_campaign), the only time a segment is rewritten. Deleting a
+user removes the directories of their accounts.
+
+pyarrow is only needed to archive or to read archived data. Without it,
+load_metrics serves the live table only.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import kpis, models
+
+# Imported on first use, not with the app: pyarrow alone takes hundreds of ms
+pa = pc = pq = None
+_pyarrow_missing = False
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_TOTALS = 10000  # segments whose JSON totals are kept in memory
+
+METRIC_COLUMNS = [
+    "campaign_id", "metric_date", "spend", "impressions", "clicks",
+    "ctr", "cpc", "roas", "cpp", "purchases", "revenue",
+]
+
+
+class MetricRow(NamedTuple):
+    campaign_id: int
+    metric_date: date
+    spend: float
+    impressions: int
+    clicks: int
+    ctr: Optional[float]
+    cpc: Optional[float]
+    roas: Optional[float]
+    cpp: float
+    purchases: Optional[float]
+    revenue: float = 0.0
+
+
+def _load_pyarrow() -> bool:
+    """Import pyarrow on first use; returns whether it is installed."""
+    global pa, pc, pq, _pyarrow_missing
+    if pa is None and not _pyarrow_missing:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.parquet
+        except ImportError:  # pragma: no cover - optional dependency
+            _pyarrow_missing = True
+        else:
+            pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+    return pa is not None
+
+
+def _require_pyarrow():
+    if not _load_pyarrow():
+        raise RuntimeError("pyarrow is required for the metric archive (pip install pyarrow)")
+
+
+def _schema():
+    return pa.schema([
+        ("campaign_id", pa.int32()),
+        ("metric_date", pa.date32()),
+        ("spend", pa.float32()),
+        ("impressions", pa.int64()),
+        ("clicks", pa.int64()),
+        ("ctr", pa.float32()),
+        ("cpc", pa.float32()),
+        ("roas", pa.float32()),
+        ("cpp", pa.float32()),
+        ("purchases", pa.float32()),
+        ("revenue", pa.float32()),
+    ])
+
+
+def _rows(columns: Dict[str, list]) -> Iterable[MetricRow]:
+    if "revenue" not in columns:
+        # Segments written before revenue was stored: recover it from the daily ROAS
+        columns["revenue"] = [(roas or 0) * (spend or 0) for roas, spend in zip(columns["roas"], columns["spend"])]
+    return (MetricRow(*values) for values in zip(*(columns[name] for name in METRIC_COLUMNS)))
+
+
+def account_dir(root: Path, account_id: int) -> Path:
+    return Path(root) / f"account_{account_id}"
+
+
+def _segment_range(path: Path):
+    first, last = path.name.split(".")[0].split("_")
+    return date.fromisoformat(first), date.fromisoformat(last)
+
+
+def segments_for(root: Path, account_id: int, start: Optional[date], end: Optional[date]) -> List[Path]:
+    """Return the segment files of an account that overlap [start, end]."""
+    directory = account_dir(root, account_id)
+    if not directory.is_dir():
+        return []
+    selected = []
+    for path in sorted(directory.glob("*.parquet")):
+        first, last = _segment_range(path)
+        if (start is None or last >= start) and (end is None or first <= end):
+            selected.append(path)
+    return selected
+
+
+def _totals(rows: Iterable[MetricRow]) -> Dict[int, dict]:
+    """First and last date and base-measure sums of each campaign."""
+    totals: Dict[int, dict] = {}
+    for row in rows:
+        entry = totals.get(row.campaign_id)
+        if entry is None:
+            entry = totals[row.campaign_id] = {
+                "first": row.metric_date, "last": row.metric_date, **dict.fromkeys(kpis.BASE_MEASURES, 0)
+            }
+        entry["first"] = min(entry["first"], row.metric_date)
+        entry["last"] = max(entry["last"], row.metric_date)
+        for name in kpis.BASE_MEASURES:
+            entry[name] += getattr(row, name) or 0
+    return totals
+
+
+def _write_totals(path: Path, totals: Dict[int, dict]) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({
+        str(campaign_id): {**entry, "first": entry["first"].isoformat(), "last": entry["last"].isoformat()}
+        for campaign_id, entry in totals.items()
+    }))
+    os.replace(tmp, path.with_suffix(".json"))
+
+
+def _write_table(path: Path, table) -> None:
+    """Write (or replace) a segment and its totals, each atomically."""
+    _write_totals(path, _totals(_rows({name: table[name].to_pylist() for name in table.column_names})))
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def write_segment(root: Path, account_id: int, rows: List[MetricRow]) -> Path:
+    """Write rows (sorted by campaign and date) as a new immutable segment."""
+    _require_pyarrow()
+    columns = list(zip(*rows))
+    table = pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, _schema())],
+        schema=_schema(),
+    )
+    first = min(r.metric_date for r in rows)
+    last = max(r.metric_date for r in rows)
+    directory = account_dir(root, account_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{first.isoformat()}_{last.isoformat()}.parquet"
+    if path.exists():
+        # Two segments over the same window: keep both, the suffix is ignored on read
+        path = directory / f"{first.isoformat()}_{last.isoformat()}.{uuid.uuid4().hex[:8]}.parquet"
+    _write_table(path, table)
+    return path
+
+
+_segment_totals: Dict[Tuple[str, int], Dict[int, dict]] = {}
+
+
+def segment_totals(path: Path) -> Dict[int, dict]:
+    """
+    Per-campaign first/last date and base-measure sums of a segment, from its
+    JSON file; cached by path and modification time. Segments written before
+    the JSON files existed get theirs on first use.
+    """
+    key = (str(path), path.stat().st_mtime_ns)
+    totals = _segment_totals.get(key)
+    if totals is not None:
+        return totals
+    try:
+        totals = {
+            int(campaign_id): {
+                **entry,
+                "first": date.fromisoformat(entry["first"]),
+                "last": date.fromisoformat(entry["last"]),
+            }
+            for campaign_id, entry in json.loads(path.with_suffix(".json").read_text()).items()
+        }
+    except FileNotFoundError:
+        if not _load_pyarrow():
+            logger.warning(f"No totals for {path} and pyarrow is not installed; its rows are not counted")
+            return {}
+        table = pq.read_table(path, memory_map=True)
+        totals = _totals(_rows({name: table[name].to_pylist() for name in table.column_names}))
+        _write_totals(path, totals)
+    if len(_segment_totals) >= MAX_CACHED_TOTALS:
+        _segment_totals.clear()
+    _segment_totals[key] = totals
+    return totals
+
+
+def read_archive(
+    root: Path,
+    account_id: int,
+    campaign_ids: Iterable[int],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[MetricRow]:
+    """Read archived rows for some campaigns of one account, memory-mapped."""
+    paths = segments_for(root, account_id, start, end)
+    if not paths or not _load_pyarrow():
+        return []
+    wanted = pa.array(list(campaign_ids), type=pa.int32())
+    rows = []
+    for path in paths:
+        table = pq.read_table(path, memory_map=True)
+        mask = pc.is_in(table["campaign_id"], value_set=wanted)
+        if start is not None:
+            mask = pc.and_(mask, pc.greater_equal(table["metric_date"], pa.scalar(start, pa.date32())))
+        if end is not None:
+            mask = pc.and_(mask, pc.less_equal(table["metric_date"], pa.scalar(end, pa.date32())))
+        table = table.filter(mask)
+        rows.extend(_rows({name: table[name].to_pylist() for name in METRIC_COLUMNS if name in table.column_names}))
+    return rows
+
+
+def iter_archive(
+    root: Path,
+    account_id: int,
+    campaign_ids: Optional[Iterable[int]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    batch_size: int = 10000,
+):
+    """Yield archived rows of one account batch by batch, without loading whole segments."""
+    paths = segments_for(root, account_id, start, end)
+    if not paths or not _load_pyarrow():
+        return
+    wanted = pa.array(list(campaign_ids), type=pa.int32()) if campaign_ids is not None else None
+    for path in paths:
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        names = [name for name in METRIC_COLUMNS if name in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=names):
+            mask = None
+            if wanted is not None:
+                mask = pc.is_in(batch.column("campaign_id"), value_set=wanted)
+            if start is not None:
+                cond = pc.greater_equal(batch.column("metric_date"), pa.scalar(start, pa.date32()))
+                mask = cond if mask is None else pc.and_(mask, cond)
+            if end is not None:
+                cond = pc.less_equal(batch.column("metric_date"), pa.scalar(end, pa.date32()))
+                mask = cond if mask is None else pc.and_(mask, cond)
+            if mask is not None:
+                batch = batch.filter(mask)
+            yield from _rows({name: batch.column(name).to_pylist() for name in names})
+
+
+def live_overlap(db: Session, ranges: Dict[int, Tuple[date, date]]) -> Set[Tuple[int, date]]:
+    """(campaign_id, metric_date) of live rows inside each campaign's archived date range; one query."""
+    if not ranges:
+        return set()
+    m = models.CampaignMetric
+    first = min(start for start, _ in ranges.values())
+    last = max(end for _, end in ranges.values())
+    return {
+        (campaign_id, metric_date)
+        for campaign_id, metric_date in db.query(m.campaign_id, m.metric_date).filter(
+            m.campaign_id.in_(list(ranges)), m.metric_date.between(first, last)
+        )
+        if ranges[campaign_id][0] <= metric_date <= ranges[campaign_id][1]
+    }
+
+
+def archived_totals(db: Session, campaigns, root: Optional[Path] = None) -> Dict[object, Dict[str, float]]:
+    """
+    Base-measure sums of archived days, by key, for adding to live totals.
+
+    `campaigns` yields (campaign_id, account_id, key) rows, typically a
+    query; it is not run when nothing was ever archived. Sums come from the
+    segments' JSON totals; days that are also live are subtracted, since
+    the live row is the one counted.
+    """
+    from app.config import settings
+
+    root = Path(root or settings.metric_archive_dir)
+    if not root.is_dir():
+        return {}
+    keys: Dict[int, object] = {}
+    by_account: Dict[int, Set[int]] = defaultdict(set)
+    for campaign_id, account_id, key in campaigns:
+        keys[campaign_id] = key
+        by_account[account_id].add(campaign_id)
+
+    sums: Dict[int, Dict[str, float]] = {}
+    ranges: Dict[int, Tuple[date, date]] = {}
+    for account_id, campaign_ids in by_account.items():
+        for path in segments_for(root, account_id, None, None):
+            for campaign_id, entry in segment_totals(path).items():
+                if campaign_id not in campaign_ids:
+                    continue
+                campaign_sums = sums.setdefault(campaign_id, dict.fromkeys(kpis.BASE_MEASURES, 0))
+                for name in kpis.BASE_MEASURES:
+                    campaign_sums[name] += entry[name]
+                first, last = ranges.get(campaign_id, (entry["first"], entry["last"]))
+                ranges[campaign_id] = (min(first, entry["first"]), max(last, entry["last"]))
+
+    overlap = live_overlap(db, ranges)
+    if overlap:
+        for account_id, campaign_ids in by_account.items():
+            overlapping = {campaign_id for campaign_id, _ in overlap if campaign_id in campaign_ids}
+            if not overlapping:
+                continue
+            days = [metric_date for campaign_id, metric_date in overlap if campaign_id in overlapping]
+            for row in read_archive(root, account_id, overlapping, min(days), max(days)):
+                if (row.campaign_id, row.metric_date) in overlap:
+                    for name in kpis.BASE_MEASURES:
+                        sums[row.campaign_id][name] -= getattr(row, name) or 0
+
+    totals: Dict[object, Dict[str, float]] = {}
+    for campaign_id, campaign_sums in sums.items():
+        key_sums = totals.setdefault(keys[campaign_id], dict.fromkeys(kpis.BASE_MEASURES, 0))
+        for name in kpis.BASE_MEASURES:
+            key_sums[name] += campaign_sums[name]
+    return totals
+
+
+def move_campaign(campaign_id: int, from_account: int, to_account: int, root: Optional[Path] = None) -> int:
+    """
+    Move a campaign's archived rows to the directory of the account it was
+    moved to; returns the number of rows moved.
+
+    The rows are written to the new account first, then the old segments
+    are rewritten without them, so an interruption leaves a copy in both
+    directories rather than in neither.
+    """
+    from app.config import settings
+
+    root = Path(root or settings.metric_archive_dir)
+    paths = [path for path in segments_for(root, from_account, None, None) if campaign_id in segment_totals(path)]
+    if not paths:
+        return 0
+    _require_pyarrow()
+    rows = sorted(read_archive(root, from_account, [campaign_id]), key=lambda row: row.metric_date)
+    write_segment(root, to_account, rows)
+    for path in paths:
+        table = pq.read_table(path)
+        table = table.filter(pc.not_equal(table["campaign_id"], pa.scalar(campaign_id, pa.int32())))
+        if table.num_rows:
+            _write_table(path, table)
+        else:
+            path.unlink()
+            path.with_suffix(".json").unlink(missing_ok=True)
+    logger.info(f"Moved {len(rows)} archived metric rows of campaign {campaign_id} to account {to_account}")
+    return len(rows)
+
+
+def purge_accounts(account_ids: Iterable[int], root: Optional[Path] = None) -> int:
+    """Remove the archived segments of deleted accounts; returns the number of directories removed."""
+    from app.config import settings
+
+    root = Path(root or settings.metric_archive_dir)
+    removed = 0
+    for account_id in account_ids:
+        directory = account_dir(root, account_id)
+        if directory.is_dir():
+            shutil.rmtree(directory)
+            removed += 1
+    if removed:
+        logger.info(f"Removed the metric archive of {removed} deleted accounts")
+    return removed
+
+
+def load_metrics(
+    db: Session,
+    campaigns: Iterable[models.Campaign],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    root: Optional[Path] = None,
+) -> List[MetricRow]:
+    """
+    Return metric rows for the given campaigns from both tiers, ordered by
+    campaign and date. Live rows win if a day exists in both.
+    """
+    from app.config import settings
+
+    root = Path(root or settings.metric_archive_dir)
+    campaigns = list(campaigns)
+    if not campaigns:
+        return []
+
+    m = models.CampaignMetric
+    query = db.query(*[getattr(m, name) for name in METRIC_COLUMNS]).filter(
+        m.campaign_id.in_([c.id for c in campaigns])
+    )
+    if start is not None:
+        query = query.filter(m.metric_date >= start)
+    if end is not None:
+        query = query.filter(m.metric_date <= end)
+    merged: Dict[tuple, MetricRow] = {}
+
+    by_account: Dict[int, List[int]] = {}
+    for c in campaigns:
+        by_account.setdefault(c.account_id, []).append(c.id)
+    for account_id, campaign_ids in by_account.items():
+        for row in read_archive(root, account_id, campaign_ids, start, end):
+            merged[(row.campaign_id, row.metric_date)] = row
+
+    for row in query.all():
+        merged[(row[0], row[1])] = MetricRow(*row)
+
+    return [merged[key] for key in sorted(merged)]
+
+
+def archive_metrics(db: Session, before: date, root: Optional[Path] = None) -> int:
+    """
+    Move every metric row older than `before` into the archive.
+
+    Each account is handled in its own transaction: its segment is written
+    and renamed into place before the rows are deleted, so a crash can leave
+    a row in both tiers (reads tolerate that) but never in neither. Rows up
+    to a campaign's last archived day are such leftovers or restatements:
+    they stay live, so no day is archived twice.
+    """
+    from app.config import settings
+
+    _require_pyarrow()
+    root = Path(root or settings.metric_archive_dir)
+    m = models.CampaignMetric
+    account_ids = [
+        a for (a,) in db.query(models.Campaign.account_id).join(
+            m, m.campaign_id == models.Campaign.id
+        ).filter(m.metric_date < before).distinct()
+    ]
+
+    archived = 0
+    for account_id in account_ids:
+        campaign_ids = db.query(models.Campaign.id).filter(
+            models.Campaign.account_id == account_id
+        ).scalar_subquery()
+        archived_until: Dict[int, date] = {}
+        for segment in segments_for(root, account_id, None, None):
+            for campaign_id, entry in segment_totals(segment).items():
+                archived_until[campaign_id] = max(archived_until.get(campaign_id, date.min), entry["last"])
+        rows = [
+            MetricRow(*row)
+            for row in db.query(*[getattr(m, name) for name in METRIC_COLUMNS]).filter(
+                m.campaign_id.in_(campaign_ids), m.metric_date < before
+            ).order_by(m.campaign_id, m.metric_date)
+        ]
+        rows = [row for row in rows if row.metric_date > archived_until.get(row.campaign_id, date.min)]
+        if not rows:
+            continue
+        path = write_segment(root, account_id, rows)
+        # Delete exactly what was written: campaigns grouped by their last archived day
+        by_bound: Dict[date, Set[int]] = defaultdict(set)
+        for row in rows:
+            by_bound[archived_until.get(row.campaign_id, date.min)].add(row.campaign_id)
+        for bound, bound_ids in by_bound.items():
+            db.query(m).filter(
+                m.campaign_id.in_(list(bound_ids)), m.metric_date > bound, m.metric_date < before
+            ).delete(synchronize_session=False)
+        db.commit()
+        archived += len(rows)
+        logger.info(f"Archived {len(rows)} metric rows for account {account_id} to {path}")
+    return archived
+
+
+def main(argv=None) -> int:
+    from app.config import settings
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Archive old campaign metrics to Parquet")
+    parser.add_argument(
+        "--before", type=date.fromisoformat,
+        default=date.today() - timedelta(days=settings.metric_archive_after_days),
+    )
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        print(f"Archived {archive_metrics(db, args.before)} rows older than {args.before}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
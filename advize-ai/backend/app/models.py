@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, ForeignKey, REAL, Date
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum, ForeignKey, REAL, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -37,18 +37,24 @@ class User(Base):
 
     # Relationships
     oauth_credential = relationship("OAuthCredential", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    ad_accounts = relationship("AdAccount", back_populates="user", cascade="all, delete-orphan")
-    chat_sessions = relationship("ChatSession", back_populates="user", cascade="all, delete-orphan")
+    # Child rows are removed by ON DELETE CASCADE in the database;
+    # passive_deletes keeps the ORM from loading them just to delete them.
+    ad_accounts = relationship("AdAccount", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    chat_sessions = relationship("ChatSession", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     notification_pref = relationship(
         "NotificationPreference", 
         back_populates="user", 
         uselist=False, 
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
-    password_reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan")
+    password_reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 class OAuthCredential(Base):
     __tablename__ = "OAUTH_CREDENTIAL"
+    __table_args__ = (
+        Index("ix_OAUTH_CREDENTIAL_email_verification_code", "email", "verification_code"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("USER.id", ondelete='CASCADE'), nullable=True, unique=True)
     email = Column(String, unique=True, nullable=False)
@@ -56,7 +62,7 @@ class OAuthCredential(Base):
     lastname = Column(String, nullable=True)
     password_hash = Column(String, nullable=True)
     verification_code = Column(String, nullable=True)
-    code_expires_at = Column(DateTime, nullable=True)
+    code_expires_at = Column(DateTime, nullable=True, index=True)
     access_token = Column(String, nullable=True)
     refresh_token = Column(String, nullable=True)
     connected_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -66,20 +72,29 @@ class OAuthCredential(Base):
 
 class AdAccount(Base):
     __tablename__ = "AD_ACCOUNT"
+    # Platform sync matches accounts by (user, platform, external id)
+    __table_args__ = (
+        Index("ix_AD_ACCOUNT_user_id_platform_external_id", "user_id", "platform", "external_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("USER.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
     platform = Column(String, nullable=False)
     external_id = Column(String, nullable=False)
     status = Column(Enum(AdAccountStatus), nullable=False)
     connected_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="ad_accounts")
-    campaigns = relationship("Campaign", back_populates="account")
+    campaigns = relationship("Campaign", back_populates="account", passive_deletes=True)
 
 class Campaign(Base):
     __tablename__ = "CAMPAIGN"
+    __table_args__ = (
+        Index("ix_CAMPAIGN_account_id_external_id", "account_id", "external_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    account_id = Column(Integer, ForeignKey("AD_ACCOUNT.id"), nullable=False)
+    account_id = Column(Integer, ForeignKey("AD_ACCOUNT.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Campaign id on the ad platform; NULL for campaigns created here
+    external_id = Column(String, nullable=True)
     name = Column(String, nullable=False)
     status = Column(Enum(CampaignStatus), nullable=False)
     start_date = Column(Date)
@@ -87,12 +102,17 @@ class Campaign(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     account = relationship("AdAccount", back_populates="campaigns")
-    metrics = relationship("CampaignMetric", back_populates="campaign")
-    suggestions = relationship("OptimizationSuggestion", back_populates="campaign")
+    metrics = relationship("CampaignMetric", back_populates="campaign", passive_deletes=True)
+    suggestions = relationship("OptimizationSuggestion", back_populates="campaign", passive_deletes=True)
 
 class CampaignMetric(Base):
     __tablename__ = "CAMPAIGN_METRIC"
-    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id"), primary_key=True)
+    # The primary key already covers (campaign_id, metric_date) lookups;
+    # this one serves cross-campaign date-range scans.
+    __table_args__ = (
+        Index("ix_CAMPAIGN_METRIC_metric_date", "metric_date"),
+    )
+    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id", ondelete="CASCADE"), primary_key=True)
     metric_date = Column(Date, primary_key=True)
     spend = Column(REAL, default=0.0, nullable=False)
     impressions = Column(Integer, default=0, nullable=False)
@@ -102,13 +122,19 @@ class CampaignMetric(Base):
     roas = Column(REAL)
     cpp = Column(REAL, default=0.0, nullable=False)
     purchases = Column(REAL)
+    # Conversion value; with the other additive columns it is the source of
+    # every ratio (see app.kpis), the per-day ratios above are as ingested.
+    revenue = Column(REAL, default=0.0, nullable=False)
 
     campaign = relationship("Campaign", back_populates="metrics")
 
 class OptimizationSuggestion(Base):
     __tablename__ = "OPTIMIZATION_SUGGESTION"
+    __table_args__ = (
+        Index("ix_OPTIMIZATION_SUGGESTION_campaign_id_applied", "campaign_id", "applied"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id"), nullable=False)
+    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id", ondelete="CASCADE"), nullable=False)
     category = Column(String, nullable=False)
     suggestion = Column(String, nullable=False)
     applied = Column(Boolean, default=False, nullable=False)
@@ -118,17 +144,20 @@ class OptimizationSuggestion(Base):
 class ChatSession(Base):
     __tablename__ = "CHAT_SESSION"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("USER.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
     started_at = Column(DateTime, default=datetime.utcnow)
     ended_at = Column(DateTime)
 
     user = relationship("User", back_populates="chat_sessions")
-    messages = relationship("ChatMessage", back_populates="session")
+    messages = relationship("ChatMessage", back_populates="session", passive_deletes=True)
 
 class ChatMessage(Base):
     __tablename__ = "CHAT_MESSAGE"
+    __table_args__ = (
+        Index("ix_CHAT_MESSAGE_session_id_timestamp", "session_id", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("CHAT_SESSION.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("CHAT_SESSION.id", ondelete="CASCADE"), nullable=False)
     sender = Column(Enum(MessageSender), nullable=False)
     content = Column(String, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -138,7 +167,7 @@ class ChatMessage(Base):
 class NotificationPreference(Base):
     __tablename__ = "NOTIFICATION_PREFERENCE"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("USER.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
     enabled = Column(Boolean, default=True, nullable=False)
 
     user = relationship("User", back_populates="notification_pref")
@@ -146,9 +175,75 @@ class NotificationPreference(Base):
 class PasswordResetToken(Base):
     __tablename__ = "PASSWORD_RESET_TOKEN"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("USER.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
     token = Column(String, unique=True, nullable=False, index=True)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
     used = Column(Boolean, default=False, nullable=False)
 
-    user = relationship("User", back_populates="password_reset_tokens")
\ No newline at end of file
+    user = relationship("User", back_populates="password_reset_tokens")
+
+
+class RevokedToken(Base):
+    __tablename__ = "REVOKED_TOKEN"
+    # JWT id of a revoked access token; the row is only needed until the token expires
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RefreshToken(Base):
+    __tablename__ = "REFRESH_TOKEN"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Every token rotated from the same login shares a family; reuse revokes the family
+    family_id = Column(String(32), nullable=False, index=True)
+    # HMAC-SHA256 of the token, hex; the token itself is never stored
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+    revoked = Column(Boolean, default=False, nullable=False)
+
+class PlatformConnection(Base):
+    """Access token of a user on an ad platform, used by the connector sync"""
+    __tablename__ = "PLATFORM_CONNECTION"
+    __table_args__ = (
+        Index("ix_PLATFORM_CONNECTION_user_id_platform", "user_id", "platform", unique=True),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("USER.id", ondelete="CASCADE"), nullable=False)
+    platform = Column(String(32), nullable=False)
+    access_token = Column(String, nullable=False)
+    connected_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_synced_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+
+class MetricBaseline(Base):
+    """Rolling EWMA state of one ratio of one campaign, updated on ingest (app.anomaly)"""
+    __tablename__ = "METRIC_BASELINE"
+    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id", ondelete="CASCADE"), primary_key=True)
+    metric = Column(String(16), primary_key=True)
+    mean = Column(REAL, nullable=False)
+    variance = Column(REAL, nullable=False)
+    samples = Column(Integer, nullable=False)
+    last_date = Column(Date, nullable=False)  # older or restated days are not folded in again
+
+class MetricAlert(Base):
+    __tablename__ = "METRIC_ALERT"
+    __table_args__ = (
+        Index("ix_METRIC_ALERT_campaign_id_metric_date", "campaign_id", "metric_date"),
+        Index("ix_METRIC_ALERT_notified_at", "notified_at"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    campaign_id = Column(Integer, ForeignKey("CAMPAIGN.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(16), nullable=False)
+    metric_date = Column(Date, nullable=False)
+    value = Column(REAL, nullable=False)
+    expected = Column(REAL, nullable=False)  # baseline mean before this value
+    zscore = Column(REAL, nullable=False)
+    direction = Column(String(8), nullable=False)  # "spike" or "drop"
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    acknowledged = Column(Boolean, default=False, nullable=False)
+    # Set once the alert went out in a digest (or was skipped by the user's preference)
+    notified_at = Column(DateTime, nullable=True)
@@ -0,0 +1,168 @@
+# app/notifications.py
+"""
+Alert digest emails.
+
+Alerts raised by app.anomaly are not mailed one by one. Every
+NOTIFICATION_DIGEST_MINUTES a background loop in app.main collects the
+alerts not notified yet, coalesces them into one digest per user and sends
+the digests through EmailService.send_many, one SMTP session (connect,
+TLS, login) per NOTIFICATION_BATCH_SIZE digests. A wave of alerts across
+50k users is therefore 100 SMTP sessions, not 50k.
+
+Users are processed in batches of the same size with a fixed number of
+queries per batch: recipients and their NotificationPreference in one
+query, their pending alerts in another, then the notified alerts are
+marked. Users who turned notifications off (or are inactive) have their
+alerts marked without an email, so they do not pile up. Digests the server
+did not accept stay pending and are retried in the next window, unless
+the recipient was refused for good (a 5xx reply, e.g. an unknown mailbox):
+those alerts are marked too, or they would be re-rendered and refused
+again every window.
+
+The loop runs in the process: with several workers, enable it on one of
+them only (NOTIFICATION_DIGESTS).
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import REJECTED, SENT, EmailService
+
+logger = logging.getLogger(__name__)
+
+METRIC_LABELS = {"cpc": "CPC", "cpp": "Cost per purchase", "roas": "ROAS", "ctr": "CTR"}
+VERBS = {"spike": "rose", "drop": "fell"}
+UPDATE_CHUNK = 1000  # alert ids per UPDATE
+
+
+def _alerts_of(query):
+    return query.select_from(models.MetricAlert).join(
+        models.Campaign, models.Campaign.id == models.MetricAlert.campaign_id
+    ).join(
+        models.AdAccount, models.AdAccount.id == models.Campaign.account_id
+    )
+
+
+def pending_user_ids(db: Session, until: datetime) -> List[int]:
+    """Users with alerts raised up to `until` and not notified yet."""
+    return [user_id for (user_id,) in _alerts_of(
+        db.query(models.AdAccount.user_id)
+    ).filter(
+        models.MetricAlert.notified_at.is_(None),
+        models.MetricAlert.created_at <= until
+    ).distinct().order_by(models.AdAccount.user_id)]
+
+
+def load_recipients(db: Session, user_ids: Sequence[int]) -> Dict[int, Tuple[str, str, bool]]:
+    """(email, first name, wants notifications) of each user, with their preference, in one query."""
+    pref = models.NotificationPreference
+    rows = db.query(
+        models.User.id, models.User.email, models.User.firstname, models.User.is_active, pref.enabled
+    ).outerjoin(
+        pref, pref.user_id == models.User.id
+    ).filter(models.User.id.in_(list(user_ids)))
+    # No preference row means notifications are on, the column default
+    return {
+        user_id: (email, firstname, bool(is_active) and enabled is not False)
+        for user_id, email, firstname, is_active, enabled in rows
+    }
+
+
+def load_alerts(db: Session, user_ids: Sequence[int], until: datetime) -> Dict[int, list]:
+    """Pending alerts of the users, most severe first, with their campaign names."""
+    a = models.MetricAlert
+    alerts = defaultdict(list)
+    for row in _alerts_of(db.query(
+        models.AdAccount.user_id, a.id, models.Campaign.name, a.metric, a.metric_date,
+        a.value, a.expected, a.zscore, a.direction
+    )).filter(
+        models.AdAccount.user_id.in_(list(user_ids)),
+        a.notified_at.is_(None),
+        a.created_at <= until
+    ).order_by(models.AdAccount.user_id, func.abs(a.zscore).desc()):
+        alerts[row.user_id].append(row)
+    return alerts
+
+
+def _format(metric: str, value: float) -> str:
+    if metric == "ctr":
+        return f"{value:.2%}"
+    if metric == "roas":
+        return f"{value:.2f}x"
+    return f"{value:.2f}"
+
+
+def render_digest(firstname: Optional[str], alerts: list) -> Tuple[str, str]:
+    """Subject and plain-text body of one user's digest."""
+    campaigns = len({alert.name for alert in alerts})
+    subject = (
+        f"{len(alerts)} campaign alert{'s' if len(alerts) > 1 else ''}"
+        f" on {campaigns} campaign{'s' if campaigns > 1 else ''}"
+    )
+    greeting = f"Hello {firstname}," if firstname else "Hello,"
+    lines = [greeting, "", "Unusual results were detected on your campaigns:", ""]
+    for alert in alerts[:settings.notification_max_alerts]:
+        label = METRIC_LABELS.get(alert.metric, alert.metric)
+        verb = VERBS.get(alert.direction, alert.direction)
+        lines.append(
+            f"- {alert.name}, {alert.metric_date.isoformat()}: {label} {verb} to "
+            f"{_format(alert.metric, alert.value)} (usually {_format(alert.metric, alert.expected)})"
+        )
+    if len(alerts) > settings.notification_max_alerts:
+        lines.append(f"- and {len(alerts) - settings.notification_max_alerts} more")
+    lines += [
+        "",
+        f"See them on your dashboard: {settings.frontend_url}/dashboard.html",
+        "You can turn these emails off in your notification settings.",
+    ]
+    return subject, "\n".join(lines)
+
+
+def _mark_notified(db: Session, alert_ids: List[int], now: datetime) -> None:
+    for start in range(0, len(alert_ids), UPDATE_CHUNK):
+        db.query(models.MetricAlert).filter(
+            models.MetricAlert.id.in_(alert_ids[start:start + UPDATE_CHUNK])
+        ).update({"notified_at": now}, synchronize_session=False)
+
+
+def send_digests(email_service=None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Send one digest per user with pending alerts; returns sent, failed, rejected and skipped user counts."""
+    email_service = email_service or EmailService.get_instance()
+    batch_size = batch_size or settings.notification_batch_size
+    now = datetime.utcnow()
+    counts = {"sent": 0, "failed": 0, "rejected": 0, "skipped": 0}
+    db = SessionLocal()
+    try:
+        user_ids = pending_user_ids(db, now)
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            recipients = load_recipients(db, batch)
+            messages, message_alert_ids, done = [], [], []
+            for user_id, alerts in load_alerts(db, batch, now).items():
+                email, firstname, wanted = recipients.get(user_id, (None, None, False))
+                alert_ids = [alert.id for alert in alerts]
+                if not wanted or not email:
+                    done.extend(alert_ids)
+                    counts["skipped"] += 1
+                    continue
+                messages.append((email, *render_digest(firstname, alerts)))
+                message_alert_ids.append(alert_ids)
+            outcomes = email_service.send_many(messages) if messages else []
+            for outcome, alert_ids in zip(outcomes, message_alert_ids):
+                if outcome in (SENT, REJECTED):
+                    done.extend(alert_ids)
+                counts[outcome] += 1
+            _mark_notified(db, done, now)
+            db.commit()
+    finally:
+        db.close()
+    if any(counts.values()):
+        logger.info(f"Alert digests: {counts}")
+    return counts
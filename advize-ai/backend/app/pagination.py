@@ -0,0 +1,56 @@
+# app/pagination.py
+"""
+Keyset pagination and sparse fieldsets for list endpoints.
+
+Pages are ordered by primary key and continue from `after_id`, so every
+page is an index range scan of at most `limit` rows no matter how deep the
+client pages, and rows inserted meanwhile never shift later pages. The
+body stays a plain JSON list; the cursor for the next page is sent in the
+X-Next-After-Id header and as a Link rel="next" header, both omitted on
+the last page.
+
+`fields=` narrows the SELECT to the named columns and the payload to the
+same keys. The id is always included since it is the cursor.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+
+from app.serialization import SchemaJSONResponse, rows_to_dicts
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_fields(fields: Optional[str], columns: Dict[str, Any]) -> List[str]:
+    """Validate a comma-separated `fields` value against `columns`; None selects every column."""
+    if not fields:
+        return list(columns)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in columns]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(columns)}"
+        )
+    return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+
+def keyset_page(query, id_column, after_id: Optional[int], limit: int):
+    """Restrict a query to the page after `after_id`; fetches one extra row to detect a next page."""
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column).limit(limit + 1)
+
+
+def page_response(request: Request, keys: Sequence[str], rows: Sequence, limit: int) -> Response:
+    """JSON list of the page's rows, with next-page headers when more rows exist."""
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1][0]  # id is always the first column
+        next_url = request.url.include_query_params(after_id=next_after_id, limit=limit)
+        headers["X-Next-After-Id"] = str(next_after_id)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return SchemaJSONResponse(List[Dict[str, Any]], rows_to_dicts(keys, rows), headers=headers)
@@ -0,0 +1,275 @@
+# app/partitioning.py
+"""
+Monthly range partitioning for CAMPAIGN_METRIC (PostgreSQL only).
+
+Partitioning is optional and controlled by METRIC_PARTITIONING. Once the
+table has been converted (see `python -m app.partitioning convert`), the
+maintenance job keeps METRIC_PARTITION_MONTHS_AHEAD future partitions in
+place and detaches partitions older than METRIC_RETENTION_MONTHS, which is
+a metadata-only operation instead of a large DELETE. Rows that landed in
+the DEFAULT partition while maintenance was not running are moved into
+their month's partition when it is created.
+
+Queries keep working unchanged; they only need to compare metric_date to a
+date (not a timestamp) for the planner to prune partitions.
+"""
+import argparse
+import logging
+import re
+import sys
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "CAMPAIGN_METRIC"
+LEGACY_TABLE = "CAMPAIGN_METRIC_legacy"
+DEFAULT_PARTITION = "CAMPAIGN_METRIC_default"
+_PARTITION_RE = re.compile(r"^CAMPAIGN_METRIC_y(\d{4})m(\d{2})$")
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"CAMPAIGN_METRIC_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": TABLE}).first() is not None
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """Return (name, first day of month) for every monthly partition, oldest first."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": TABLE}).scalars()
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partition(conn: Connection, month: date) -> str:
+    """
+    Create the partition of a month.
+
+    Rows of that month already in the DEFAULT partition (written while
+    maintenance was not running) would make the CREATE fail, so DEFAULT is
+    detached, the rows are moved to the new partition and DEFAULT is
+    attached again, all in the caller's transaction.
+    """
+    month = month_start(month)
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    stranded = conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f'"{DEFAULT_PARTITION}"'}
+    ).scalar() and conn.execute(text(
+        f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE metric_date >= :start AND metric_date < :end LIMIT 1'
+    ), bounds).first() is not None
+    if stranded:
+        conn.execute(text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"'))
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    if stranded:
+        moved = conn.execute(text(
+            f'INSERT INTO "{name}" SELECT * FROM "{DEFAULT_PARTITION}" '
+            "WHERE metric_date >= :start AND metric_date < :end"
+        ), bounds).rowcount
+        conn.execute(text(
+            f'DELETE FROM "{DEFAULT_PARTITION}" WHERE metric_date >= :start AND metric_date < :end'
+        ), bounds)
+        conn.execute(text(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT'))
+        logger.info(f"Moved {moved} rows of {month:%Y-%m} from {DEFAULT_PARTITION} to {name}")
+    return name
+
+
+def ensure_partitions(conn: Connection, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """Create the partitions for the current month and the next `months_ahead` months."""
+    current = month_start(today or date.today())
+    existing = {name for name, _ in list_partitions(conn)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            created.append(create_partition(conn, month))
+    return created
+
+
+def detach_partitions_before(conn: Connection, cutoff: date, drop: bool = False) -> List[str]:
+    """
+    Detach every monthly partition that ends on or before `cutoff`.
+
+    Detached tables are left in place (so they can be archived or dumped)
+    unless `drop` is set.
+    """
+    detached = []
+    for name, month in list_partitions(conn):
+        if add_months(month, 1) > cutoff:
+            break
+        conn.execute(text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"'))
+        if drop:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        detached.append(name)
+    return detached
+
+
+def ensure_cascading_foreign_key(conn: Connection) -> bool:
+    """
+    Make the campaign foreign key of a converted table ON DELETE CASCADE.
+
+    Tables converted before the key cascaded blocked set-based deletes of
+    campaigns, accounts and users. Returns whether the key was replaced.
+    """
+    name = f"{TABLE}_part_campaign_id_fkey"
+    action = conn.execute(text(
+        "SELECT confdeltype FROM pg_constraint WHERE conname = :name"
+    ), {"name": name}).scalar()
+    if action is None or action == "c":
+        return False
+    conn.execute(text(f'ALTER TABLE "{TABLE}" DROP CONSTRAINT "{name}"'))
+    conn.execute(text(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" '
+        'FOREIGN KEY (campaign_id) REFERENCES "CAMPAIGN" (id) ON DELETE CASCADE'
+    ))
+    logger.info(f"{name} now cascades deletes")
+    return True
+
+
+def run_maintenance(engine: Engine, months_ahead: int, retention_months: int = 0) -> None:
+    """Create upcoming partitions, apply the retention policy and fix up the campaign foreign key."""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return
+        ensure_cascading_foreign_key(conn)
+        created = ensure_partitions(conn, months_ahead)
+        detached = []
+        if retention_months > 0:
+            cutoff = add_months(month_start(date.today()), -retention_months)
+            detached = detach_partitions_before(conn, cutoff)
+    if created or detached:
+        logger.info(f"Metric partitions created: {created}, detached: {detached}")
+
+
+def convert_to_partitioned(engine: Engine, chunk_size: int = 10000, months_ahead: int = 3) -> int:
+    """
+    Convert a plain CAMPAIGN_METRIC table into a partitioned one.
+
+    The existing table is renamed to CAMPAIGN_METRIC_legacy and a partitioned
+    table is created under the original name, with partitions covering every
+    month present in the data. Rows are then copied over in primary-key
+    order, `chunk_size` rows per transaction, so no single statement holds
+    locks for long. Metric ingestion should be paused while this runs, since
+    new writes land in the new table before historical rows are copied.
+
+    Returns the number of rows copied. The legacy table is kept for the
+    operator to verify and drop.
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name != "postgresql":
+            raise RuntimeError("Metric partitioning requires PostgreSQL")
+        if is_partitioned(conn):
+            logger.info(f"{TABLE} is already partitioned")
+            return 0
+
+        conn.execute(text(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_TABLE}"'))
+        conn.execute(text(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+            "PARTITION BY RANGE (metric_date)"
+        ))
+        # Explicit names: the legacy table still owns the original index names
+        conn.execute(text(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_part_pkey" '
+            "PRIMARY KEY (campaign_id, metric_date)"
+        ))
+        conn.execute(text(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_part_campaign_id_fkey" '
+            'FOREIGN KEY (campaign_id) REFERENCES "CAMPAIGN" (id) ON DELETE CASCADE'
+        ))
+        conn.execute(text(f'CREATE INDEX "ix_{TABLE}_metric_date_p" ON "{TABLE}" (metric_date)'))
+        # Backfilled rows older than the first partition land here instead of failing
+        conn.execute(text(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT'))
+
+        first, last = conn.execute(text(
+            f'SELECT min(metric_date), max(metric_date) FROM "{LEGACY_TABLE}"'
+        )).one()
+        month = month_start(first or date.today())
+        stop = add_months(month_start(max(last or date.today(), date.today())), months_ahead)
+        while month <= stop:
+            create_partition(conn, month)
+            month = add_months(month, 1)
+
+    copied = 0
+    cursor = None
+    while True:
+        with engine.begin() as conn:
+            lower = "(campaign_id, metric_date) > (:cid, :day)" if cursor else "TRUE"
+            params = {"cid": cursor[0] if cursor else None, "day": cursor[1] if cursor else None}
+            # Last key of this chunk; None means the remainder fits in one chunk
+            upper = conn.execute(text(
+                f'SELECT campaign_id, metric_date FROM "{LEGACY_TABLE}" WHERE {lower} '
+                "ORDER BY campaign_id, metric_date OFFSET :offset LIMIT 1"
+            ), {**params, "offset": chunk_size - 1}).first()
+            bound = "(campaign_id, metric_date) <= (:ucid, :uday)" if upper else "TRUE"
+            result = conn.execute(text(
+                f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY_TABLE}" WHERE {lower} AND {bound} '
+                "ON CONFLICT (campaign_id, metric_date) DO NOTHING"
+            ), {**params, "ucid": upper[0] if upper else None, "uday": upper[1] if upper else None})
+            copied += result.rowcount
+        if upper is None:
+            break
+        cursor = tuple(upper)
+        logger.info(f"Copied {copied} metric rows (cursor {cursor})")
+    return copied
+
+
+def main(argv=None) -> int:
+    from app.config import settings
+    from app.database import get_engine
+
+    parser = argparse.ArgumentParser(description="CAMPAIGN_METRIC partition tooling")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="convert the table to monthly partitions")
+    convert.add_argument("--chunk-size", type=int, default=10000)
+    sub.add_parser("maintain", help="create future partitions and apply retention")
+    detach = sub.add_parser("detach", help="detach partitions older than a date")
+    detach.add_argument("before", type=date.fromisoformat)
+    detach.add_argument("--drop", action="store_true")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.command == "convert":
+        copied = convert_to_partitioned(engine, args.chunk_size, settings.metric_partition_months_ahead)
+        print(f"Copied {copied} rows into partitioned {TABLE}")
+    elif args.command == "maintain":
+        run_maintenance(engine, settings.metric_partition_months_ahead, settings.metric_retention_months)
+    elif args.command == "detach":
+        with engine.begin() as conn:
+            print("\n".join(detach_partitions_before(conn, args.before, args.drop)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# app/refresh_tokens.py
+"""
+Rotating refresh tokens.
+
+Login costs a bcrypt verification, which is deliberately slow. Clients
+keep their session alive with a refresh token instead: an opaque random
+string whose HMAC-SHA256 (keyed with SECRET_KEY) is the only thing
+stored, so validating one is a single unique-index lookup.
+
+Every refresh consumes the presented token and issues a new one in the
+same family. A token that is presented again after it was used means it
+leaked (either the client or an attacker holds a stale copy), so the
+whole family is revoked and the user has to log in again. Used rows are
+kept until they expire for exactly that check; after that they only take
+up space and can be deleted. Changing the password revokes every family
+of the user, so a stolen refresh token stops working with the old password.
+"""
+import hashlib
+import hmac
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+from app.instrumentation import count_credential_check
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BYTES = 32
+
+
+class RefreshTokenError(Exception):
+    """The refresh token is unknown, expired, revoked or was already used."""
+
+
+def hash_token(token: str) -> str:
+    return hmac.new(settings.secret_key.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+def issue(db: Session, user_id: int, family_id: Optional[str] = None) -> Tuple[str, models.RefreshToken]:
+    """Create a refresh token, starting a new family unless one is given; returns (token, row)."""
+    token = secrets.token_urlsafe(TOKEN_BYTES)
+    row = models.RefreshToken(
+        user_id=user_id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=hash_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days),
+    )
+    db.add(row)
+    db.commit()
+    return token, row
+
+
+def revoke_family(db: Session, family_id: str) -> int:
+    """Revoke every token of a family; returns the number of rows changed."""
+    count = db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id,
+        models.RefreshToken.revoked == False,
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def revoke_user(db: Session, user_id: int) -> int:
+    """Revoke every token of a user, e.g. when the password changes; the caller commits."""
+    return db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_id,
+        models.RefreshToken.revoked == False,
+    ).update({models.RefreshToken.revoked: True}, synchronize_session=False)
+
+
+def rotate(db: Session, token: str) -> Tuple[str, models.RefreshToken]:
+    """Consume a refresh token and issue its successor; raises RefreshTokenError."""
+    with count_credential_check("refresh"):
+        row = db.query(models.RefreshToken).filter(
+            models.RefreshToken.token_hash == hash_token(token)
+        ).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            raise RefreshTokenError("Invalid or expired refresh token")
+        if row.revoked:
+            raise RefreshTokenError("Refresh token has been revoked")
+
+        # Claim the token with a conditional update so two concurrent
+        # refreshes with the same token cannot both succeed.
+        claimed = db.query(models.RefreshToken).filter(
+            models.RefreshToken.id == row.id,
+            models.RefreshToken.used_at.is_(None),
+        ).update({models.RefreshToken.used_at: datetime.utcnow()}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            revoked = revoke_family(db, row.family_id)
+            logger.warning(
+                "Refresh token reuse for user %s, revoked %s tokens of family %s",
+                row.user_id, revoked, row.family_id,
+            )
+            raise RefreshTokenError("Refresh token has already been used")
+
+    return issue(db, row.user_id, row.family_id)
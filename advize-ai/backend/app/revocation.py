@@ -0,0 +1,107 @@
+# app/revocation.py
+"""
+Access-token revocation.
+
+Every access token carries a random `jti`. Logging out stores the jti in
+REVOKED_TOKEN until the token would have expired anyway. Checking that
+table on every request would add a query to every authenticated call, so
+each worker keeps a Bloom filter of the revoked jtis: a token that is not
+in the filter (the common case) is accepted without touching the
+database, and only filter hits are confirmed with a primary-key lookup.
+
+Revocations made by this worker are added to its filter immediately.
+Other workers pick them up when their filter is rebuilt, every
+REVOCATION_REBUILD_SECONDS, which bounds how long a revoked token can
+still be used elsewhere.
+"""
+import hashlib
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 1024
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one blake2b digest."""
+
+    def __init__(self, capacity: int, false_positive_rate: float = FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self):
+        self._filter = BloomFilter(MIN_CAPACITY)
+        self._lock = threading.Lock()
+        self.db_checks = 0  # filter hits that needed a DB lookup
+
+    def rebuild(self, db: Session) -> int:
+        """Reload the filter from the unexpired rows of REVOKED_TOKEN; returns the row count."""
+        jtis = [jti for (jti,) in db.query(models.RevokedToken.jti).filter(
+            models.RevokedToken.expires_at > datetime.utcnow()
+        )]
+        self._swap(jtis)
+        return len(jtis)
+
+    def _swap(self, jtis: Iterable[str]) -> None:
+        jtis = list(jtis)
+        # Twice the current size leaves room for revocations until the next rebuild
+        bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(jtis)))
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            self._filter.add(jti)
+
+    def is_revoked(self, db: Session, jti: Optional[str]) -> bool:
+        # Tokens issued before revocation support have no jti and simply expire
+        if not jti or jti not in self._filter:
+            return False
+        self.db_checks += 1
+        return db.get(models.RevokedToken, jti) is not None
+
+    def revoke(self, db: Session, payload: dict) -> bool:
+        """Revoke the token a decoded JWT payload belongs to; False if it has no jti."""
+        jti = payload.get("jti")
+        if not jti:
+            return False
+        if db.get(models.RevokedToken, jti) is None:
+            db.add(models.RevokedToken(
+                jti=jti,
+                user_id=int(payload["sub"]),
+                expires_at=datetime.utcfromtimestamp(payload["exp"]),
+            ))
+            db.commit()
+        self.add(jti)
+        return True
+
+
+revocation_list = RevocationList()
@@ -3,14 +3,19 @@ from fastapi.responses import JSONResponse
 from app.schemas import UserProfileResponse
 # app/routers/dashboard_router.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from app.Auth import get_current_user
+from app.Auth import get_current_user, get_current_user_payload
 from app.database import get_db
 from app.models import User, AdAccount, Campaign, CampaignMetric, AdAccountStatus
 from app.schemas import DashboardMetricsResponse, AdAccountCreate, AdAccountRead
-from typing import List
-from app.cruds import create_ad_account, get_ad_accounts
+from typing import List, Optional
+from app import cruds
+from app.cruds import create_ad_account
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_response, parse_fields
+from app.schemas import AdAccountStatus as AdAccountStatusFilter
+from app.revocation import revocation_list
+from app import refresh_tokens
 
 router = APIRouter(prefix="/api", tags=["Dashboard"])
 
@@ -20,7 +25,14 @@ from app.models import User
 
 
 @router.post("/logout", status_code=200)
-def logout(current_user: User = Depends(get_current_user)):
+def logout(
+    current_user: User = Depends(get_current_user),
+    payload: dict = Depends(get_current_user_payload),
+    db: Session = Depends(get_db)
+):
+    revocation_list.revoke(db, payload)
+    if payload.get("fid"):
+        refresh_tokens.revoke_family(db, payload["fid"])
     return {"message": "Successfully logged out. Please delete the token on the client side."}
 
 @router.get("/me", response_model=UserProfileResponse)
@@ -39,11 +51,22 @@ def create_account(
 
 @router.get("/accounts", response_model=List[AdAccountRead])
 def list_accounts(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Return accounts with an id greater than this"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    account_status: Optional[AdAccountStatusFilter] = Query(None, alias="status"),
+    platform: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of the account fields"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all ad accounts for the current user"""
-    return get_ad_accounts(db=db, user_id=current_user.id)
+    """List the current user's ad accounts, one keyset page at a time"""
+    keys = parse_fields(fields, cruds.AD_ACCOUNT_COLUMNS)
+    accounts = cruds.list_ad_accounts_page(
+        db, current_user.id, keys, after_id=after_id, limit=limit,
+        status=account_status, platform=platform
+    )
+    return page_response(request, keys, accounts, limit)
 
 @router.get("/dashboard/metrics", response_model=DashboardMetricsResponse)
 def get_dashboard_metrics(
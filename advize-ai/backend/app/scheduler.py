@@ -0,0 +1,281 @@
+# app/scheduler.py
+"""
+Periodic refresh of every connected ad account.
+
+Each ad account whose owner has connected its platform is refreshed every
+SYNC_INTERVAL_MINUTES: the last SYNC_REFRESH_DAYS days of insights are
+fetched again, since platforms keep restating recent days. First runs are
+spread uniformly over one interval and every later run is moved by up to
+SYNC_JITTER of the interval, so a restart or a batch of new connections
+never sends all accounts to a platform at once.
+
+Accounts that are due wait in one priority queue per platform. The queue
+is ordered by recent spend and by how recently the owner was active (a
+refresh token issued at login or rotation), so when a platform falls
+behind, the accounts people are looking at are refreshed first. At most
+SYNC_SCHEDULER_CONCURRENCY accounts per platform are refreshed at once
+(overridable per platform), on top of each connector's own request pacing.
+
+The account list is reloaded every SYNC_SCHEDULER_RELOAD_SECONDS, so new
+or disconnected platforms are picked up within that delay. Each refresh
+claims its user like a manual sync does (orchestrator.claim_sync), so the
+two never write the same account at once; an account whose user is busy
+is retried CLAIM_RETRY_SECONDS later.
+
+The scheduler runs in the process and is off by default
+(SYNC_SCHEDULER_ENABLED): with several workers, enable it on one of them
+only, or every worker refreshes every account.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func
+
+from app import models
+from app.config import settings
+from app.connectors import CONNECTORS
+from app.connectors.base import PlatformAccount
+from app.connectors.orchestrator import claim_sync, release_sync, sync_account
+from app.database import SessionLocal
+from app.instrumentation import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+SPEND_WINDOW_DAYS = 7
+ACTIVITY_WEIGHT = 10.0  # a user active right now outranks a 20000x spend difference
+ACTIVITY_HALF_LIFE_HOURS = 24.0
+CLAIM_RETRY_SECONDS = 30.0  # wait when the account's user is already syncing
+
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "sync_scheduler_queue_depth", "Ad accounts due for a refresh and waiting for a slot, by platform.", ("platform",)
+)
+SCHEDULER_LAG = Gauge(
+    "sync_scheduler_lag_seconds", "How long the longest-waiting due account has waited, by platform.", ("platform",)
+)
+SCHEDULER_START_DELAY = Histogram(
+    "sync_scheduler_start_delay_seconds", "Delay between an account being due and its refresh starting.",
+    (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600), labelnames=("platform",),
+)
+SCHEDULER_RUN_DURATION = Histogram(
+    "sync_scheduler_run_duration_seconds", "Duration of scheduled account refreshes, by platform and outcome.",
+    (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600), labelnames=("platform", "outcome"),
+)
+SCHEDULER_RUNS = Counter(
+    "sync_scheduler_runs_total", "Scheduled account refreshes, by platform and outcome.", ("platform", "outcome")
+)
+
+
+@dataclass
+class ScheduledAccount:
+    account_id: int
+    user_id: int
+    platform: str
+    external_id: str
+    status: str
+    access_token: str
+    priority: float = 0.0
+    due: float = 0.0  # time.monotonic() of the next run
+
+
+def priority(spend: Optional[float], last_active: Optional[datetime], now: datetime) -> float:
+    """Higher runs first: log of recent spend plus a bonus halving every ACTIVITY_HALF_LIFE_HOURS of inactivity."""
+    score = math.log1p(max(spend or 0.0, 0.0))
+    if last_active is not None:
+        hours = max((now - last_active).total_seconds() / 3600, 0.0)
+        score += ACTIVITY_WEIGHT * 0.5 ** (hours / ACTIVITY_HALF_LIFE_HOURS)
+    return score
+
+
+def load_accounts(now: datetime) -> List[ScheduledAccount]:
+    """Every ad account on a connected platform, with its priority; three queries."""
+    m = models.CampaignMetric
+    db = SessionLocal()
+    try:
+        accounts = db.query(
+            models.AdAccount.id, models.AdAccount.user_id, models.AdAccount.platform,
+            models.AdAccount.external_id, models.AdAccount.status, models.PlatformConnection.access_token
+        ).join(
+            models.PlatformConnection,
+            and_(
+                models.PlatformConnection.user_id == models.AdAccount.user_id,
+                models.PlatformConnection.platform == models.AdAccount.platform
+            )
+        ).filter(models.AdAccount.platform.in_(list(CONNECTORS))).all()
+        if not accounts:
+            return []
+        spend = dict(db.query(
+            models.Campaign.account_id, func.sum(m.spend)
+        ).join(
+            m, m.campaign_id == models.Campaign.id
+        ).filter(
+            m.metric_date >= now.date() - timedelta(days=SPEND_WINDOW_DAYS - 1)
+        ).group_by(models.Campaign.account_id).all())
+        last_active = dict(db.query(
+            models.RefreshToken.user_id, func.max(models.RefreshToken.created_at)
+        ).group_by(models.RefreshToken.user_id).all())
+    finally:
+        db.close()
+    return [
+        ScheduledAccount(
+            account_id=account_id, user_id=user_id, platform=platform, external_id=external_id,
+            status=status.value, access_token=access_token,
+            priority=priority(spend.get(account_id), last_active.get(user_id), now),
+        )
+        for account_id, user_id, platform, external_id, status, access_token in accounts
+    ]
+
+
+def _interval() -> float:
+    return settings.sync_interval_minutes * 60
+
+
+def _jittered(interval: float) -> float:
+    return interval * (1 + random.uniform(-settings.sync_jitter, settings.sync_jitter))
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """Parse "platform=N,platform=N" into a dict."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        platform, _, limit = item.partition("=")
+        limits[platform.strip()] = int(limit)
+    return limits
+
+
+class SyncScheduler:
+    """Accounts waiting for their next run, and the due ones queued by platform."""
+
+    def __init__(self, transport=None):
+        self.transport = transport  # httpx transport for the connectors; the mocks use an ASGI one
+        self._accounts: Dict[int, ScheduledAccount] = {}
+        self._timers: List[tuple] = []  # heap of (due, account id); stale entries are skipped
+        self._ready: Dict[str, List[tuple]] = {}  # platform -> heap of (-priority, due, account id)
+        self._queued: Set[int] = set()  # account ids in a ready queue
+        self._running: Set[int] = set()
+        self._active: Dict[str, int] = {}  # platform -> refreshes running
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._limits = _parse_limits(settings.sync_scheduler_platform_concurrency)
+
+    def reload(self, accounts: List[ScheduledAccount], now: Optional[float] = None) -> None:
+        """Replace the account list; schedules kept, new accounts spread over one interval."""
+        now = time.monotonic() if now is None else now
+        fresh = {}
+        for account in accounts:
+            current = self._accounts.get(account.account_id)
+            if current is None:
+                account.due = now + random.uniform(0, _interval())
+                heapq.heappush(self._timers, (account.due, account.account_id))
+                current = account
+            else:
+                current.priority = account.priority
+                current.access_token = account.access_token
+                current.status = account.status
+            fresh[account.account_id] = current
+        self._accounts = fresh
+        for platform, queue in self._ready.items():
+            queue[:] = [entry for entry in queue if entry[2] in fresh]
+            heapq.heapify(queue)
+        self._queued &= set(fresh)
+
+    def _release_due(self, now: float) -> None:
+        """Move every account whose time has come to its platform's ready queue."""
+        while self._timers and self._timers[0][0] <= now:
+            due, account_id = heapq.heappop(self._timers)
+            account = self._accounts.get(account_id)
+            if account is None or account.due != due or account_id in self._queued or account_id in self._running:
+                continue
+            self._queued.add(account_id)
+            heapq.heappush(self._ready.setdefault(account.platform, []), (-account.priority, due, account_id))
+
+    def _limit(self, platform: str) -> int:
+        return self._limits.get(platform, settings.sync_scheduler_concurrency)
+
+    def _dispatch(self, now: float) -> None:
+        for platform, queue in self._ready.items():
+            while queue and self._active.get(platform, 0) < self._limit(platform):
+                _, _, account_id = heapq.heappop(queue)
+                account = self._accounts[account_id]
+                self._queued.discard(account_id)
+                if not claim_sync(account.user_id):
+                    # A manual sync, or another account of the user, is running
+                    account.due = now + CLAIM_RETRY_SECONDS
+                    heapq.heappush(self._timers, (account.due, account_id))
+                    continue
+                self._running.add(account_id)
+                self._active[platform] = self._active.get(platform, 0) + 1
+                task = asyncio.create_task(self._refresh(account), name=f"sync-account-{account_id}")
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def _observe(self, now: float) -> None:
+        for platform in CONNECTORS:
+            queue = self._ready.get(platform, [])
+            SCHEDULER_QUEUE_DEPTH.set((platform,), len(queue))
+            SCHEDULER_LAG.set((platform,), max((now - due for _, due, _ in queue), default=0.0))
+
+    async def _refresh(self, account: ScheduledAccount) -> None:
+        SCHEDULER_START_DELAY.observe((account.platform,), max(time.monotonic() - account.due, 0.0))
+        until = date.today()
+        since = until - timedelta(days=settings.sync_refresh_days - 1)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await sync_account(
+                account.user_id, account.platform, account.access_token,
+                PlatformAccount(account.external_id, account.external_id, account.status),
+                since, until, self.transport
+            )
+            outcome = "error" if result.error else "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            SCHEDULER_RUN_DURATION.observe((account.platform, outcome), elapsed)
+            SCHEDULER_RUNS.inc((account.platform, outcome))
+            self._active[account.platform] -= 1
+            self._running.discard(account.account_id)
+            release_sync(account.user_id)
+            # The next run counts from the end of this one, so a slow platform never piles up runs
+            if self._accounts.get(account.account_id) is account:
+                account.due = time.monotonic() + _jittered(_interval())
+                heapq.heappush(self._timers, (account.due, account.account_id))
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def run(self) -> None:
+        """Reload, release and dispatch until cancelled; cancelling stops the running refreshes too."""
+        self._wakeup = asyncio.Event()
+        next_reload = 0.0
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= next_reload:
+                    try:
+                        self.reload(await run_in_threadpool(load_accounts, datetime.utcnow()))
+                    except Exception as e:
+                        logger.error(f"Sync scheduler reload failed: {str(e)}", exc_info=True)
+                    next_reload = now + settings.sync_scheduler_reload_seconds
+                    now = time.monotonic()
+                self._release_due(now)
+                self._dispatch(now)
+                self._observe(now)
+                wake_at = min(self._timers[0][0], next_reload) if self._timers else next_reload
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(wake_at - time.monotonic(), 0.01))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+sync_scheduler = SyncScheduler()
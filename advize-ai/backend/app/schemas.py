@@ -15,12 +15,19 @@ class DashboardMetricsResponse(BaseModel):
 
 # --- VerificationRequest schema ---
 class VerificationRequest(BaseModel):
-    verification_code: int
+    email: EmailStr
+    # A string, so codes with leading zeros survive
+    verification_code: str
 
 # --- Token schema for authentication ---
 class Token(BaseModel):
     access_token: str
     token_type: str
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 # --- ENUMS pour schémas (reprise de SQLAlchemy enums) ---
 class AdAccountStatus(str, enum.Enum):
@@ -125,6 +132,7 @@ class CampaignMetricBase(BaseModel):
     roas: Optional[float]
     cpp: float
     purchases: Optional[float]
+    revenue: Optional[float] = None  # derived from roas * spend when omitted
 
 class CampaignMetricCreate(CampaignMetricBase):
     campaign_id: int
@@ -210,3 +218,49 @@ class UserProfileResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+# --- Schémas background jobs ---
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: dict
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+# --- Schémas ad platform connectors ---
+class PlatformConnect(BaseModel):
+    access_token: str
+
+
+class PlatformConnectionRead(BaseModel):
+    platform: str
+    connected: bool
+    connected_at: Optional[datetime] = None
+    last_synced_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+class PlatformSyncRequest(BaseModel):
+    since: Optional[date] = None
+    until: Optional[date] = None
+    platforms: Optional[List[str]] = None  # default: every connected platform
+
+
+class MetricAlertRead(BaseModel):
+    id: int
+    campaign_id: int
+    metric: str
+    metric_date: date
+    value: float
+    expected: float
+    zscore: float
+    direction: str
+    created_at: datetime
+    acknowledged: bool
+
+    class Config:
+        orm_mode = True
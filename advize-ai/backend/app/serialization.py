@@ -0,0 +1,60 @@
+# app/serialization.py
+"""
+JSON response encoding.
+
+FastJSONResponse is the application's default response class: it encodes
+with orjson when installed and otherwise with pydantic-core, both several
+times faster than the stdlib json module Starlette uses.
+
+Hot endpoints that return long lists skip FastAPI's response validation
+altogether. They build plain dicts straight from row tuples (no ORM
+objects, no per-row Pydantic models) and return a SchemaJSONResponse,
+which serializes them in one pass with a TypeAdapter for the response
+schema. Adapters are built once per schema and cached, so the schema is
+only compiled on first use. Response schemas used this way are TypedDicts,
+which pydantic-core serializes from dicts without creating instances; the
+same types stay the routes' response_model, so the OpenAPI docs are
+unchanged.
+"""
+from functools import lru_cache
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional, pydantic-core is the fallback encoder
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def adapter(schema: Any) -> TypeAdapter:
+    """TypeAdapter for a response schema, compiled on first use."""
+    return TypeAdapter(schema)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON-compatible content (dates, datetimes, enums and UUIDs included)."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return adapter(Any).dump_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class SchemaJSONResponse(Response):
+    """Response whose body is `content` serialized with the cached adapter for `schema`, without validation."""
+
+    media_type = "application/json"
+
+    def __init__(self, schema: Any, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(adapter(schema).dump_json(content), status_code=status_code, headers=headers)
+
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence]) -> List[dict]:
+    """Turn query row tuples into dicts keyed by `keys`."""
+    return [dict(zip(keys, row)) for row in rows]
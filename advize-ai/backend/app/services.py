@@ -1,12 +1,13 @@
+import logging
 import secrets
 import string
-import os
 from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy import Column, String, Integer
 from sqlalchemy.orm import relationship, Session
 
 from app.utils.password import hash_password, verify_password
+from app import refresh_tokens
 from app.models  import User
 from app.models import PasswordResetToken
 from app.database import get_db
@@ -22,16 +23,18 @@ from sqlalchemy.orm import Session
 from app.models import User
 
 # Import configuration
-from app.config import database_settings
+from app.config import settings
 from app.database import SessionLocal
 
+logger = logging.getLogger(__name__)
+
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Get token configuration from settings
-SECRET_KEY = database_settings.secret_key
-ALGORITHM = database_settings.algorithm
-ACCESS_TOKEN_EXPIRE_MINUTES = database_settings.access_token_expire_minutes
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
 # Create a new database session
 def get_db_session() -> Generator[Session, None, None]:
@@ -45,19 +48,12 @@ def create_user(user_data: dict) -> User:
     """Crée un nouvel utilisateur dans la base de données."""
     db = next(get_db_session())
     try:
-        print("=== Creating User in Service ===")
-        print(f"Email: {user_data['email']}")
-        print(f"Name: {user_data['name']} {user_data['prenom']}")
-        print(f"Password length: {len(user_data['password'])}")
+        logger.debug("Creating user %s", user_data['email'])
         
         # Hash the password
-        print("\nHashing password...")
         hashed_password = hash_password(user_data["password"])
-        print(f"Generated hash: {hashed_password}")
-        print(f"Hash length: {len(hashed_password)}")
         
         # Create user instance
-        print("\nCreating user instance...")
         user = User(
             email=user_data["email"],
             name=user_data["name"],
@@ -68,19 +64,15 @@ def create_user(user_data: dict) -> User:
         )
         
         # Add to database
-        print("\nSaving to database...")
         db.add(user)
         db.commit()
         db.refresh(user)
         
-        print("✅ User created successfully")
-        print(f"User ID: {user.user_id}")
-        print(f"Stored hash: {user.password_hash}")
-        print(f"Stored hash length: {len(user.password_hash)}")
+        logger.info("Created user %s", user.user_id)
         
         return user
     except Exception as e:
-        print(f"❌ Error creating user: {str(e)}")
+        logger.error(f"Error creating user: {str(e)}")
         if 'db' in locals():
             db.rollback()
         raise Exception(f"Failed to create user: {str(e)}")
@@ -145,8 +137,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     return user
 
 
-# Get frontend URL from environment variable or use default
-FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://127.0.0.1:5500/frontend')
+FRONTEND_URL = settings.frontend_url
 
 
 class PasswordResetService:
@@ -175,7 +166,7 @@ class PasswordResetService:
             
             # Store the verification code in the database with expiration time
             db.add(PasswordResetToken(
-                user_id=user.user_id,
+                user_id=user.id,
                 token=verification_code,
                 expires_at=datetime.utcnow() + timedelta(minutes=15)
             ))
@@ -183,7 +174,7 @@ class PasswordResetService:
 
             # Send email with reset link
             reset_url = f"{FRONTEND_URL}/reset-password.html?token={verification_code}"
-            email_service.send_email(
+            EmailService.get_instance().send_email(
                 to_email=email,
                 subject="Password Reset Request",
                 body=f"Dear {user.name} {user.prenom},\n\n"
@@ -199,7 +190,7 @@ class PasswordResetService:
             return verification_code
 
         except Exception as e:
-            print(f"Error sending reset email: {str(e)}")
+            logger.error(f"Error sending reset email: {str(e)}")
             return None
 
     @staticmethod
@@ -209,47 +200,49 @@ class PasswordResetService:
         Returns True if password was successfully reset, False otherwise.
         """
         try:
-            print(f"Attempting to reset password for email: {email}")
-            print(f"Verification code received: {verification_code}")
+            logger.debug("Attempting to reset password for email: %s", email)
             
             # Get user and token in a single query
             user = db.query(User).filter(User.email == email).first()
             if not user:
-                print(f"User not found for email: {email}")
+                logger.debug("User not found for email: %s", email)
                 return False
 
-            print(f"User found with ID: {user.user_id}")
+            logger.debug("User found with ID: %s", user.id)
             
             token = db.query(PasswordResetToken).filter(
-                PasswordResetToken.user_id == user.user_id,
+                PasswordResetToken.user_id == user.id,
                 PasswordResetToken.token == verification_code,
                 PasswordResetToken.expires_at > datetime.utcnow()
             ).first()
 
             if not token:
-                print(f"Token not found or expired for user {user.user_id}, email: {email}")
+                logger.debug("Token not found or expired for user %s, email: %s", user.id, email)
                 return False
 
-            print(f"Found token for user {user.user_id}")
-            print(f"Token expires at: {token.expires_at}")
+            logger.debug("Found token for user %s", user.id)
+            logger.debug("Token expires at: %s", token.expires_at)
 
             # Update password
             user.password_hash = hash_password(new_password)
+
+            # Sign out every session kept alive by a refresh token
+            revoked = refresh_tokens.revoke_user(db, user.id)
             
             # Delete the used token
             db.delete(token)
             
             # Commit all changes in one transaction
             db.commit()
-            print(f"Password reset successful for user {user.user_id}")
+            logger.info("Password reset successful for user %s (%s refresh tokens revoked)", user.id, revoked)
             return True
 
         except Exception as e:
-            print(f"Error resetting password: {str(e)}")
+            logger.error(f"Error resetting password: {str(e)}")
             return False
             return verification_code
         except Exception as e:
-            print(f"Error sending reset email: {str(e)}")
+            logger.error(f"Error sending reset email: {str(e)}")
             return None
 
     @staticmethod
@@ -264,19 +257,27 @@ class PasswordResetService:
                     email, verification_code, new_password, db
                 )
         except Exception as e:
-            print(f"Error in verify_code_and_reset_password: {str(e)}")
+            logger.error(f"Error in verify_code_and_reset_password: {str(e)}")
             return False
 # app/services/email_service.py
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 from app.config import settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Outcome of each message of EmailService.send_many
+SENT = "sent"
+FAILED = "failed"  # transient (4xx, connection lost): worth retrying
+REJECTED = "rejected"  # permanent (5xx): retrying will not help
+
+
+def _is_permanent(error: smtplib.SMTPException) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return getattr(error, "smtp_code", 0) >= 500
+
 
 class EmailService:
     _instance = None
@@ -307,15 +308,40 @@ class EmailService:
             logger.info(f"SMTP User: {self.smtp_user}")
             logger.info(f"From Email: {self.email_from}")
             logger.info(f"Email From Name: {self.email_from_name}")
-            logger.info("Email service initialized successfully")
             
-            # Set flag to indicate email is configured
-            self.is_configured = True
+            # Missing SMTP settings disable email instead of failing startup
+            self.is_configured = settings.smtp_configured
+            if not self.is_configured:
+                logger.warning("SMTP settings incomplete - emails will not be sent")
 
         except Exception as e:
             logger.error(f"Failed to initialize email service: {str(e)}", exc_info=True)
             self.is_configured = False
 
+    def _build_message(self, to_email: str, subject: str, body: str, html: Optional[str] = None) -> str:
+        msg = MIMEMultipart()
+        msg['From'] = f"{self.email_from_name} <{self.email_from}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        if html:
+            msg.attach(MIMEText(body, 'plain'))
+            msg.attach(MIMEText(html, 'html'))
+        else:
+            msg.attach(MIMEText(body, 'plain'))
+        return msg.as_string()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=settings.smtp_timeout)
+        try:
+            if settings.smtp_starttls:
+                server.starttls()
+            server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
     def send_email(self, to_email: str, subject: str, body: str, html: Optional[str] = None) -> bool:
         if not self.is_configured:
             logger.warning("Email service is not configured - cannot send email")
@@ -323,22 +349,11 @@ class EmailService:
 
         try:
             # Create message
-            msg = MIMEMultipart()
-            msg['From'] = f"{self.email_from_name} <{self.email_from}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-
-            if html:
-                msg.attach(MIMEText(body, 'plain'))
-                msg.attach(MIMEText(html, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
+            message = self._build_message(to_email, subject, body, html)
 
             # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.sendmail(self.email_from, to_email, msg.as_string())
+            with self._connect() as server:
+                server.sendmail(self.email_from, to_email, message)
                 logger.info(f"Email sent successfully to {to_email}")
                 return True
 
@@ -352,7 +367,51 @@ class EmailService:
             logger.error(f"Failed to send email: {str(e)}")
             return False
 
-# Initialize email service
-email_service = EmailService.get_instance()
-if not email_service.is_configured:
-    raise Exception("Email service not properly configured")
\ No newline at end of file
+    def send_many(self, messages: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Send (to_email, subject, body) messages over one SMTP session.
+
+        The handshake, TLS and login happen once for the whole list instead
+        of once per message. A rejected recipient only fails its own
+        message; if the server drops the connection, it is reopened once
+        and sending resumes. Returns each message's outcome: SENT, FAILED
+        or REJECTED (refused with a permanent 5xx reply).
+        """
+        sent = [FAILED] * len(messages)
+        if not self.is_configured:
+            logger.warning("Email service is not configured - cannot send email")
+            return sent
+
+        reconnected = False
+        index = 0
+        server = None
+        try:
+            while index < len(messages):
+                if server is None:
+                    server = self._connect()
+                to_email, subject, body = messages[index]
+                try:
+                    server.sendmail(self.email_from, to_email, self._build_message(to_email, subject, body))
+                    sent[index] = SENT
+                except smtplib.SMTPServerDisconnected:
+                    if reconnected:
+                        raise
+                    reconnected, server = True, None
+                    continue
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    logger.warning(f"Email to {to_email} rejected: {str(e)}")
+                    if _is_permanent(e):
+                        sent[index] = REJECTED
+                index += 1
+        except smtplib.SMTPAuthenticationError:
+            logger.error("Failed to authenticate with SMTP server")
+        except Exception as e:
+            logger.error(f"Failed to send email batch after {sent.count(SENT)}/{len(messages)} messages: {str(e)}")
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except smtplib.SMTPException:
+                    server.close()
+        logger.info(f"Sent {sent.count(SENT)}/{len(messages)} emails over one SMTP session")
+        return sent
@@ -0,0 +1,59 @@
+# app/sweeper.py
+"""
+Deletion of expired authentication rows.
+
+Unverified sign-ups, password reset tokens, revoked access tokens and
+refresh tokens are all useless once they expire, but nothing on the
+request path removes them. The sweeper deletes them periodically, at most
+SWEEP_BATCH_SIZE rows per statement and one transaction per batch, so a
+large backlog never holds locks for long or blocks logins. Every sweep
+walks an index on the expiry column.
+"""
+import logging
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import and_, delete, select
+from sqlalchemy.engine import Engine
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+def _expired_conditions(now: datetime):
+    """table -> (primary key column, condition selecting expired rows)"""
+    oauth = models.OAuthCredential.__table__
+    reset = models.PasswordResetToken.__table__
+    revoked = models.RevokedToken.__table__
+    refresh = models.RefreshToken.__table__
+    return {
+        # Verified credentials have no code and are never swept
+        oauth: (oauth.c.id, and_(oauth.c.is_verified == False, oauth.c.code_expires_at < now)),
+        reset: (reset.c.id, reset.c.expires_at < now),
+        revoked: (revoked.c.jti, revoked.c.expires_at < now),
+        refresh: (refresh.c.id, refresh.c.expires_at < now),
+    }
+
+
+def delete_in_batches(engine: Engine, table, key, condition, batch_size: int) -> int:
+    """Delete the rows matching `condition`, `batch_size` per transaction; returns the row count."""
+    deleted = 0
+    while True:
+        batch = select(key).where(condition).limit(batch_size).scalar_subquery()
+        with engine.begin() as conn:
+            count = conn.execute(delete(table).where(key.in_(batch))).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def sweep_expired(engine: Engine, batch_size: int) -> Dict[str, int]:
+    """Delete every expired row; returns the number deleted per table."""
+    now = datetime.utcnow()
+    counts = {}
+    for table, (key, condition) in _expired_conditions(now).items():
+        counts[table.name] = delete_in_batches(engine, table, key, condition, batch_size)
+    if any(counts.values()):
+        logger.info(f"Swept expired rows: {counts}")
+    return counts
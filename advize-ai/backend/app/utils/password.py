@@ -1,9 +1,12 @@
 from passlib.context import CryptContext
 
+from app.instrumentation import count_credential_check
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with count_credential_check("password"):
+        return pwd_context.verify(plain_password, hashed_password)
@@ -0,0 +1,173 @@
+# benchmarks/bench_anomaly.py
+"""
+Throughput and accuracy of the streaming anomaly detector (app.anomaly).
+
+Generates `--days` of daily metrics for `--campaigns` campaigns and feeds
+them day by day, in batches of `--batch` rows, the way syncs ingest them.
+A few campaign-days get an injected incident (spend multiplied, or
+revenue cut), which must come out as CPC/cost-per-purchase spikes or ROAS
+drops. Two runs:
+
+  memory  detect() alone on in-memory baselines, the per-row cost
+  db      observe() against a temporary SQLite database, one transaction
+          per batch: baseline load, bulk baseline writes and alert inserts
+
+Both print rows per minute, and the recall and false alerts on the
+injected incidents.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_anomaly --campaigns 2000 --days 120
+    python -m benchmarks.bench_anomaly --skip-db --campaigns 10000 --days 60
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+INCIDENT_RATE = 0.002
+WARMUP_DAYS = 14
+
+
+def generate(campaigns: int, days: int, seed: int = 11):
+    """Rows grouped by day, and the set of (campaign id, date) with an incident."""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    profiles = [
+        (rng.uniform(50, 2000), rng.uniform(0.005, 0.04), rng.uniform(0.3, 2.5), rng.uniform(0.01, 0.08), rng.uniform(1, 6))
+        for _ in range(campaigns)
+    ]  # daily spend, CTR, CPC, conversion rate, ROAS
+    incidents = set()
+    by_day = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        rows = []
+        for campaign_id, (spend, ctr, cpc, conversion, roas) in enumerate(profiles, 1):
+            clicks = max(int(spend / cpc * rng.uniform(0.9, 1.1)), 1)
+            impressions = int(clicks / (ctr * rng.uniform(0.9, 1.1)))
+            purchases = float(max(round(clicks * conversion * rng.uniform(0.85, 1.15)), 1))
+            day_spend = clicks * cpc * rng.uniform(0.93, 1.07)
+            revenue = day_spend * roas * rng.uniform(0.9, 1.1)
+            if offset >= WARMUP_DAYS and rng.random() < INCIDENT_RATE:
+                incidents.add((campaign_id, day))
+                if rng.random() < 0.5:
+                    day_spend *= 4  # bids runaway: CPC and cost per purchase spike
+                else:
+                    revenue *= 0.1  # tracking or checkout broken: ROAS collapses
+            rows.append({
+                "campaign_id": campaign_id, "metric_date": day, "spend": day_spend,
+                "impressions": impressions, "clicks": clicks, "purchases": purchases, "revenue": revenue,
+            })
+        by_day.append(rows)
+    return by_day, incidents
+
+
+def batches(by_day, size: int):
+    for rows in by_day:
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+
+def score(alerts, incidents) -> str:
+    flagged = {(alert["campaign_id"], alert["metric_date"]) for alert in alerts}
+    found = len(flagged & incidents)
+    return (
+        f"recall {found}/{len(incidents)} ({found / max(len(incidents), 1):.0%}), "
+        f"{len(flagged - incidents)} false campaign-days"
+    )
+
+
+def report(label: str, rows: int, elapsed: float, detail: str) -> None:
+    print(f"{label:<7} {rows:>9} rows in {elapsed:6.2f}s  {rows / elapsed * 60:>13,.0f} rows/min  {detail}")
+
+
+def run_memory(by_day, incidents, size: int) -> None:
+    from app.anomaly import detect
+
+    baselines, alerts, rows = {}, [], 0
+    t0 = time.perf_counter()
+    for batch in batches(by_day, size):
+        found, _ = detect(batch, baselines)
+        alerts.extend(found)
+        rows += len(batch)
+    report("memory", rows, time.perf_counter() - t0, score(alerts, incidents))
+
+
+def run_db(by_day, incidents, size: int, campaigns: int) -> None:
+    from app import anomaly, models
+    from app.database import Base, SessionLocal, get_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        user_id = conn.execute(models.User.__table__.insert().values(
+            email="bench-anomaly@advize.test", password_hash="x", firstname="Bench", lastname="Anomaly",
+            is_active=True,
+        )).inserted_primary_key[0]
+        account_id = conn.execute(models.AdAccount.__table__.insert().values(
+            user_id=user_id, platform="meta", external_id="act_bench", status=models.AdAccountStatus.active,
+        )).inserted_primary_key[0]
+        conn.execute(models.Campaign.__table__.insert(), [
+            {"id": campaign_id, "account_id": account_id, "name": f"Campaign {campaign_id}",
+             "status": models.CampaignStatus.active}
+            for campaign_id in range(1, campaigns + 1)
+        ])
+
+    rows = 0
+    t0 = time.perf_counter()
+    for batch in batches(by_day, size):
+        db = SessionLocal()
+        try:
+            anomaly.observe(db, batch)
+            db.commit()
+        finally:
+            db.close()
+        rows += len(batch)
+    elapsed = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        alerts = [
+            {"campaign_id": campaign_id, "metric_date": metric_date}
+            for campaign_id, metric_date in db.query(models.MetricAlert.campaign_id, models.MetricAlert.metric_date)
+        ]
+        baselines = db.query(models.MetricBaseline).count()
+    finally:
+        db.close()
+    report("db", rows, elapsed, f"{score(alerts, incidents)}, {baselines} baseline rows")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark streaming metric anomaly detection")
+    parser.add_argument("--campaigns", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--batch", type=int, default=500, help="rows per ingest batch")
+    parser.add_argument("--skip-db", action="store_true", help="only time detection on in-memory baselines")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read when app.config is first imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'anomaly.db')}"
+        os.environ.setdefault("SECRET_KEY", "bench-anomaly")
+        os.environ["DB_CREATE_ALL"] = "false"
+        os.environ["METRIC_PARTITIONING"] = "false"
+
+        t0 = time.perf_counter()
+        by_day, incidents = generate(args.campaigns, args.days)
+        print(f"generated {args.campaigns * args.days} rows, {len(incidents)} incidents "
+              f"in {time.perf_counter() - t0:.1f}s\n")
+        run_memory(by_day, incidents, args.batch)
+        if not args.skip_db:
+            try:
+                run_db(by_day, incidents, args.batch, args.campaigns)
+            finally:
+                from app.database import dispose_engine
+                dispose_engine()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
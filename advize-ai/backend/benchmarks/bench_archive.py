@@ -0,0 +1,89 @@
+# benchmarks/bench_archive.py
+"""
+Multi-year range scans over the Parquet metric archive.
+
+Writes `--years` of daily rows for `--campaigns` campaigns of one account as
+half-year segments (what a monthly archive job produces over time), then
+times read_archive for 1-year, 3-year and full-range scans, for a single
+campaign and for every campaign of the account.
+
+Usage (from the backend directory, pyarrow required):
+
+    python -m benchmarks.bench_archive --campaigns 200 --years 5
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.metric_archive import MetricRow, read_archive, write_segment
+
+ACCOUNT_ID = 1
+
+
+def build_archive(root: Path, campaigns: int, years: int, seed: int = 7) -> int:
+    rng = random.Random(seed)
+    start = date.today().replace(month=1, day=1) - timedelta(days=365 * years)
+    days = 365 * years
+    written = 0
+    for segment_start in range(0, days, 182):
+        rows = []
+        for cid in range(1, campaigns + 1):
+            for offset in range(segment_start, min(segment_start + 182, days)):
+                impressions = rng.randint(500, 50000)
+                clicks = rng.randint(0, impressions // 20)
+                spend = round(rng.uniform(5, 500), 2)
+                purchases = float(rng.randint(0, max(clicks // 10, 1)))
+                roas = rng.uniform(0.2, 6.0)
+                rows.append(MetricRow(
+                    cid, start + timedelta(days=offset), spend, impressions, clicks,
+                    clicks / impressions, spend / clicks if clicks else None,
+                    roas, spend / purchases if purchases else 0.0, purchases, roas * spend,
+                ))
+        write_segment(root, ACCOUNT_ID, rows)
+        written += len(rows)
+    return written
+
+
+def time_scan(root: Path, campaign_ids, start, end, repeat: int):
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = len(read_archive(root, ACCOUNT_ID, campaign_ids, start, end))
+        samples.append(time.perf_counter() - t0)
+    return rows, statistics.median(samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Parquet archive range scans")
+    parser.add_argument("--campaigns", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        t0 = time.perf_counter()
+        total = build_archive(root, args.campaigns, args.years)
+        print(f"Archived {total} rows in {time.perf_counter() - t0:.2f}s")
+
+        end = date.today()
+        all_ids = range(1, args.campaigns + 1)
+        for label, years in (("1y", 1), ("3y", 3), (f"{args.years}y", args.years)):
+            start = end - timedelta(days=365 * years)
+            for scope, ids in (("1 campaign", [1]), (f"{args.campaigns} campaigns", all_ids)):
+                rows, seconds = time_scan(root, ids, start, end, args.repeat)
+                print(
+                    f"{label:>4} {scope:>16}: {rows:>9} rows in {seconds * 1000:8.1f} ms "
+                    f"({rows / seconds / 1e6:6.2f} M rows/s)"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
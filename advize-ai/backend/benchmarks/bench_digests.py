@@ -0,0 +1,213 @@
+# benchmarks/bench_digests.py
+"""
+Alert digest delivery against a local SMTP sink.
+
+Seeds `--users` users (a share of them with notifications turned off)
+with a few anomaly alerts each in a temporary SQLite database, then runs
+app.notifications.send_digests against an in-process SMTP server that
+accepts everything and counts sessions, logins and messages. For
+comparison, the first `--sample` digests are also sent the old way, one
+EmailService.send_email call (and so one SMTP session) each, and the
+per-message cost is extrapolated to every user.
+
+Prints SMTP sessions, SQL statements and wall time per strategy, and
+checks that every alert ended up notified.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_digests --users 50000
+    python -m benchmarks.bench_digests --users 5000 --latency-ms 20
+"""
+import argparse
+import base64
+import os
+import random
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+
+class SinkStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = 0
+        self.logins = 0
+        self.messages = 0
+
+
+class SMTPSink(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, QUIT."""
+
+    def reply(self, line: str) -> None:
+        time.sleep(self.server.latency)  # one network round trip per command
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        stats = self.server.stats
+        with stats.lock:
+            stats.sessions += 1
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-sink\r\n250-AUTH PLAIN LOGIN\r\n")
+                self.reply("250 OK")
+            elif command.startswith("AUTH"):
+                base64.b64decode(line.split()[-1])
+                with stats.lock:
+                    stats.logins += 1
+                self.reply("235 authenticated")
+            elif command == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with stats.lock:
+                    stats.messages += 1
+                self.reply("250 queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 OK")
+
+
+def seed(users: int, opted_out: float, seed_value: int = 5) -> int:
+    """Users with 1-6 alerts each; returns the number of alerts."""
+    from app import models
+    from app.database import get_engine
+
+    rng = random.Random(seed_value)
+    created = datetime.utcnow() - timedelta(minutes=5)
+    metrics = [("cpc", "spike"), ("cpp", "spike"), ("roas", "drop"), ("ctr", "drop")]
+    alerts = 0
+    with get_engine().begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": user_id, "email": f"user{user_id}@advize.test", "password_hash": "x",
+             "firstname": f"User{user_id}", "lastname": "Bench", "created_at": created, "is_active": True}
+            for user_id in range(1, users + 1)
+        ])
+        conn.execute(models.NotificationPreference.__table__.insert(), [
+            {"user_id": user_id, "enabled": rng.random() >= opted_out}
+            for user_id in range(1, users + 1) if user_id % 2  # half the users never saved a preference
+        ])
+        conn.execute(models.AdAccount.__table__.insert(), [
+            {"id": user_id, "user_id": user_id, "platform": "meta", "external_id": f"act_{user_id}",
+             "status": models.AdAccountStatus.active}
+            for user_id in range(1, users + 1)
+        ])
+        conn.execute(models.Campaign.__table__.insert(), [
+            {"id": user_id, "account_id": user_id, "name": f"Campaign {user_id}", "status": models.CampaignStatus.active}
+            for user_id in range(1, users + 1)
+        ])
+        rows = []
+        for user_id in range(1, users + 1):
+            for _ in range(rng.randint(1, 6)):
+                metric, direction = rng.choice(metrics)
+                rows.append({
+                    "campaign_id": user_id, "metric": metric, "metric_date": date.today() - timedelta(days=1),
+                    "value": rng.uniform(0.5, 5), "expected": rng.uniform(0.5, 5), "zscore": rng.uniform(3, 12),
+                    "direction": direction, "created_at": created, "acknowledged": False,
+                })
+        conn.execute(models.MetricAlert.__table__.insert(), rows)
+        alerts = len(rows)
+    return alerts
+
+
+def run(args, sink: SinkStats) -> int:
+    from app import models, notifications
+    from app.database import Base, SessionLocal, get_engine
+    from app.instrumentation import track_statements
+    from app.services import EmailService
+
+    Base.metadata.create_all(bind=get_engine())
+    alerts = seed(args.users, args.opted_out)
+    print(f"seeded {args.users} users, {alerts} alerts")
+    service = EmailService.get_instance()
+
+    # Old way: one SMTP session per message
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        sample_ids = notifications.pending_user_ids(db, now)[:args.sample]
+        recipients = notifications.load_recipients(db, sample_ids)
+        sample = [
+            (recipients[user_id][0], *notifications.render_digest(recipients[user_id][1], user_alerts))
+            for user_id, user_alerts in notifications.load_alerts(db, sample_ids, now).items()
+        ]
+    finally:
+        db.close()
+    sessions = sink.sessions
+    t0 = time.perf_counter()
+    for to_email, subject, body in sample:
+        service.send_email(to_email, subject, body)
+    per_message = (time.perf_counter() - t0) / max(len(sample), 1)
+    print(f"send_email   {len(sample)} messages, {sink.sessions - sessions} SMTP sessions, "
+          f"{per_message * 1000:.1f} ms each -> ~{per_message * args.users:.0f}s for {args.users} users")
+
+    # Digests: one SMTP session per batch, bulk-loaded preferences
+    sessions, messages = sink.sessions, sink.messages
+    t0 = time.perf_counter()
+    with track_statements() as stats:
+        counts = notifications.send_digests(service, args.batch)
+    elapsed = time.perf_counter() - t0
+    print(f"send_digests {counts['sent']} sent, {counts['skipped']} opted out, {counts['failed']} failed, "
+          f"{counts['rejected']} rejected: "
+          f"{sink.sessions - sessions} SMTP sessions, {sink.messages - messages} messages, "
+          f"{stats.statements} SQL statements, {elapsed:.1f}s")
+
+    db = SessionLocal()
+    try:
+        pending = db.query(models.MetricAlert).filter(models.MetricAlert.notified_at.is_(None)).count()
+    finally:
+        db.close()
+    expected_sessions = -(-args.users // args.batch)
+    ok = pending == 0 and counts["failed"] == 0 and sink.sessions - sessions <= expected_sessions
+    print(f"\n{'OK' if ok else 'FAIL'}: {pending} alerts left pending, "
+          f"{sink.sessions - sessions} sessions for {expected_sessions} batches")
+    return 0 if ok else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark alert digest delivery against a local SMTP sink")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500, help="digests per SMTP session")
+    parser.add_argument("--opted-out", type=float, default=0.2, help="share of preferences turned off")
+    parser.add_argument("--sample", type=int, default=200, help="messages sent one session each, for comparison")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every SMTP reply")
+    args = parser.parse_args(argv)
+
+    sink = SinkStats()
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPSink)
+    server.daemon_threads = True
+    server.stats, server.latency = sink, args.latency_ms / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read when app.config is first imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'digests.db')}"
+        os.environ.setdefault("SECRET_KEY", "bench-digests")
+        os.environ["DB_CREATE_ALL"] = "false"
+        os.environ["METRIC_PARTITIONING"] = "false"
+        os.environ["SMTP_SERVER"] = "127.0.0.1"
+        os.environ["SMTP_PORT"] = str(port)
+        os.environ["SMTP_USER"] = "bench"
+        os.environ["SMTP_PASSWORD"] = "bench"
+        os.environ["EMAIL_FROM"] = "alerts@advize.test"
+        os.environ["SMTP_STARTTLS"] = "false"
+        try:
+            return run(args, sink)
+        finally:
+            server.shutdown()
+            from app.database import dispose_engine
+            dispose_engine()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
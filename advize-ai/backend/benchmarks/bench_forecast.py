@@ -0,0 +1,152 @@
+# benchmarks/bench_forecast.py
+"""
+Speed and accuracy of the vectorized spend/revenue forecasts (app.forecasting).
+
+Generates `--days` of daily spend and revenue for `--campaigns` campaigns,
+each with its own level, trend, weekly pattern and noise, and some
+campaigns started recently. The last `--horizon` days are held out. Two
+runs:
+
+  memory  fit_series() on the whole batch, spend and revenue stacked, and
+          its error on the held-out days against a seasonal naive
+          forecast (the same weekday of the last observed week)
+  db      campaign_forecasts() against a temporary SQLite database: one
+          metric query and one batch fit for every campaign, then the same
+          call again, served from the forecast cache
+
+Errors are WAPE: absolute errors summed over the horizon, over the actual
+total.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_forecast --campaigns 10000
+    python -m benchmarks.bench_forecast --skip-db --campaigns 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def generate(campaigns: int, days: int, seed: int = 3):
+    """Spend and revenue arrays of shape (campaigns, days), and each campaign's first day."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    level = rng.uniform(50, 2000, (campaigns, 1))
+    growth = rng.uniform(-0.003, 0.006, (campaigns, 1))
+    weekly = 1 + rng.uniform(0, 0.4, (campaigns, 1)) * np.sin(2 * np.pi * (t + rng.integers(0, 7, (campaigns, 1))) / 7)
+    spend = level * (1 + growth * t) * weekly * rng.normal(1, 0.06, (campaigns, days))
+    roas = rng.uniform(1, 6, (campaigns, 1)) * (1 + rng.uniform(-0.002, 0.002, (campaigns, 1)) * t)
+    revenue = spend * roas * rng.normal(1, 0.08, (campaigns, days))
+    # A fifth of the campaigns started inside the window, some too recently for a seasonal fit
+    starts = np.where(rng.random(campaigns) < 0.2, rng.integers(0, days, campaigns), 0)
+    observed = t[None, :] >= starts[:, None]
+    return np.maximum(spend, 0) * observed, np.maximum(revenue, 0) * observed, starts
+
+
+def wape(forecast, actual) -> float:
+    import numpy as np
+
+    return float(np.abs(forecast - actual).sum() / max(actual.sum(), 1e-9))
+
+
+def run_memory(spend, revenue, starts, horizon: int) -> None:
+    import numpy as np
+    from app.forecasting import SEASON, fit_series
+
+    days = spend.shape[1] - horizon
+    values = np.vstack([spend, revenue])
+    history, actual = values[:, :days], values[:, days:]
+    first = np.concatenate([starts, starts])
+    t0 = time.perf_counter()
+    fitted, seasonal = fit_series(history, np.minimum(first, days), horizon)
+    elapsed = time.perf_counter() - t0
+    naive = np.tile(history[:, -SEASON:], -(-horizon // SEASON))[:, :horizon]
+    print(f"memory  {len(values):>7} series in {elapsed:6.2f}s  ({len(values) / elapsed:,.0f} series/s), "
+          f"{int(seasonal.sum())} seasonal")
+    print(f"        WAPE over {horizon} days on seasonal series: "
+          f"holt-winters {wape(fitted[seasonal], actual[seasonal]):.1%}, "
+          f"seasonal naive {wape(naive[seasonal], actual[seasonal]):.1%}")
+
+
+def run_db(spend, revenue, starts) -> None:
+    from app import forecasting, models
+    from app.database import Base, SessionLocal, get_engine
+    from app.instrumentation import track_statements
+
+    campaigns, days = spend.shape
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    first_day = date.today() - timedelta(days=days)
+    with engine.begin() as conn:
+        user_id = conn.execute(models.User.__table__.insert().values(
+            email="bench-forecast@advize.test", password_hash="x", firstname="Bench", lastname="Forecast",
+            is_active=True,
+        )).inserted_primary_key[0]
+        account_id = conn.execute(models.AdAccount.__table__.insert().values(
+            user_id=user_id, platform="meta", external_id="act_bench", status=models.AdAccountStatus.active,
+        )).inserted_primary_key[0]
+        conn.execute(models.Campaign.__table__.insert(), [
+            {"id": campaign_id, "account_id": account_id, "name": f"Campaign {campaign_id}",
+             "status": models.CampaignStatus.active}
+            for campaign_id in range(1, campaigns + 1)
+        ])
+        for offset in range(days):
+            conn.execute(models.CampaignMetric.__table__.insert(), [
+                {"campaign_id": i + 1, "metric_date": first_day + timedelta(days=offset),
+                 "spend": float(spend[i, offset]), "revenue": float(revenue[i, offset]),
+                 "impressions": 0, "clicks": 0, "purchases": 0.0}
+                for i in range(campaigns) if offset >= starts[i]
+            ])
+
+    campaign_ids = list(range(1, campaigns + 1))
+    for label in ("fit", "cached"):
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            with track_statements() as stats:
+                forecasts = forecasting.campaign_forecasts(db, campaign_ids)
+            elapsed = time.perf_counter() - t0
+        finally:
+            db.close()
+        print(f"db      {label:<6} {len(forecasts):>7} campaigns in {elapsed:6.2f}s, {stats.statements} SQL statements")
+    print(f"        {len(forecasting.forecast_cache)} forecasts cached")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vectorized spend and revenue forecasts")
+    parser.add_argument("--campaigns", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=126, help="generated days, including the held-out ones")
+    parser.add_argument("--horizon", type=int, default=14, help="held-out days scored in the memory run")
+    parser.add_argument("--skip-db", action="store_true", help="only time the in-memory fit")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read when app.config is first imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'forecast.db')}"
+        os.environ.setdefault("SECRET_KEY", "bench-forecast")
+        os.environ["DB_CREATE_ALL"] = "false"
+        os.environ["METRIC_PARTITIONING"] = "false"
+        os.environ["ANOMALY_DETECTION"] = "false"
+        os.environ["FORECAST_HISTORY_DAYS"] = str(args.days)
+        os.environ["FORECAST_CACHE_SIZE"] = str(args.campaigns)
+
+        t0 = time.perf_counter()
+        spend, revenue, starts = generate(args.campaigns, args.days)
+        print(f"generated {args.campaigns} campaigns x {args.days} days in {time.perf_counter() - t0:.1f}s\n")
+        run_memory(spend, revenue, starts, args.horizon)
+        if not args.skip_db:
+            try:
+                run_db(spend, revenue, starts)
+            finally:
+                from app.database import dispose_engine
+                dispose_engine()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
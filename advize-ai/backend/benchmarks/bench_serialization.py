@@ -0,0 +1,180 @@
+# benchmarks/bench_serialization.py
+"""
+Share of response time spent on JSON serialization, before and after
+app.serialization.
+
+For the three list-heavy payloads (campaign performance series, dashboard
+campaign list, chat conversation), times two stages on synthetic rows:
+
+  build       turning query results into the response payload
+  serialize   turning the payload into response bytes
+
+"before" is the previous path: ORM-like objects copied into dicts or
+per-row Pydantic models, then FastAPI's response validation (the route's
+BaseModel response_model), jsonable output and the stdlib json module.
+"after" is the current path: row tuples into plain dicts, encoded in one
+pass by the cached TypeAdapter of the route's TypedDict schema.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_serialization --rows 1095 --repeat 50
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+def median_time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def stdlib_render(content) -> bytes:
+    # starlette.responses.JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="JSON serialization share of response time")
+    parser.add_argument("--rows", type=int, default=1095, help="rows per payload (3 years of daily metrics)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # app.config needs these at import time; nothing touches the database
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "bench-serialization")
+
+    from pydantic import BaseModel, TypeAdapter
+
+    from app.main import CampaignPerformanceResponse, ConversationResponse
+    from app.serialization import SchemaJSONResponse, orjson, rows_to_dicts
+
+    class OldPerformance(BaseModel):
+        campaign_id: int
+        campaign_name: str
+        status: str
+        metrics: List[Dict[str, Any]]
+        summary: Dict[str, Any]
+
+    class OldMessage(BaseModel):
+        id: int
+        sender: str
+        content: str
+        timestamp: datetime
+
+    class OldConversation(BaseModel):
+        conversation_id: int
+        started_at: datetime
+        ended_at: Optional[datetime] = None
+        messages: List[OldMessage]
+
+    def fastapi_render(schema, payload) -> bytes:
+        # validate against response_model, dump to JSON-able Python, stdlib json
+        adapter = TypeAdapter(schema)
+        return stdlib_render(adapter.dump_python(adapter.validate_python(payload), mode="json"))
+
+    rng = random.Random(3)
+    n = args.rows
+    start = date(2023, 1, 1)
+    metric_keys = ["metric_date", "spend", "impressions", "clicks", "ctr", "cpc", "roas", "cpp", "purchases", "revenue"]
+    metric_rows = [
+        (start + timedelta(days=i), rng.uniform(5, 500), rng.randint(500, 50000), rng.randint(0, 2000),
+         rng.random() / 10, rng.uniform(0.1, 3), rng.uniform(0.2, 6), rng.uniform(1, 50), float(rng.randint(0, 40)),
+         rng.uniform(0, 3000))
+        for i in range(n)
+    ]
+    metric_objects = [SimpleNamespace(**dict(zip(metric_keys, row))) for row in metric_rows]
+    campaign_keys = ["id", "name", "status", "start_date", "end_date", "account_id"]
+    campaign_rows = [(i, f"Campaign {i}", "active", start, None, 1 + i % 5) for i in range(n)]
+    campaign_objects = [SimpleNamespace(**dict(zip(campaign_keys, row))) for row in campaign_rows]
+    message_rows = [
+        (i, "user" if i % 2 else "ai", "What's my best performing campaign? " * 3, datetime(2025, 1, 1) + timedelta(minutes=i))
+        for i in range(n)
+    ]
+    message_objects = [SimpleNamespace(id=r[0], sender=r[1], content=r[2], timestamp=r[3]) for r in message_rows]
+    summary = {"total_spend": 1.0, "avg_ctr": 0.1, "date_range": {"start": "2023-01-01", "end": "2025-12-31"}}
+
+    def performance_before():
+        return {
+            "campaign_id": 1, "campaign_name": "Campaign 1", "status": "active",
+            "metrics": [
+                {"date": m.metric_date.isoformat(), "spend": m.spend, "impressions": m.impressions,
+                 "clicks": m.clicks, "ctr": m.ctr, "cpc": m.cpc, "roas": m.roas, "cpp": m.cpp,
+                 "purchases": m.purchases or 0, "revenue": m.revenue}
+                for m in metric_objects
+            ],
+            "summary": summary,
+        }
+
+    def performance_after():
+        return {
+            "campaign_id": 1, "campaign_name": "Campaign 1", "status": "active",
+            "metrics": [
+                {"date": d, "spend": s, "impressions": i, "clicks": c, "ctr": ctr, "cpc": cpc,
+                 "roas": roas, "cpp": cpp, "purchases": p or 0, "revenue": r}
+                for d, s, i, c, ctr, cpc, roas, cpp, p, r in metric_rows
+            ],
+            "summary": summary,
+        }
+
+    def dashboard_before():
+        return [
+            {"id": c.id, "name": c.name, "status": c.status, "start_date": c.start_date,
+             "end_date": c.end_date, "account_id": c.account_id, "metrics": {}}
+            for c in campaign_objects
+        ]
+
+    def dashboard_after():
+        result = rows_to_dicts(campaign_keys, campaign_rows)
+        for campaign in result:
+            campaign["metrics"] = {}
+        return result
+
+    def conversation_before():
+        return {
+            "conversation_id": 1, "started_at": datetime(2025, 1, 1), "ended_at": None,
+            "messages": [OldMessage(id=m.id, sender=m.sender, content=m.content, timestamp=m.timestamp)
+                         for m in message_objects],
+        }
+
+    def conversation_after():
+        return {
+            "conversation_id": 1, "started_at": datetime(2025, 1, 1), "ended_at": None,
+            "messages": [{"id": i, "sender": s, "content": c, "timestamp": t} for i, s, c, t in message_rows],
+        }
+
+    cases = [
+        ("performance", performance_before, lambda p: fastapi_render(OldPerformance, p),
+         performance_after, lambda p: SchemaJSONResponse(CampaignPerformanceResponse, p).body),
+        ("dashboard", dashboard_before, lambda p: fastapi_render(List[Dict[str, Any]], p),
+         dashboard_after, lambda p: SchemaJSONResponse(List[Dict[str, Any]], p).body),
+        ("conversation", conversation_before, lambda p: fastapi_render(OldConversation, p),
+         conversation_after, lambda p: SchemaJSONResponse(ConversationResponse, p).body),
+    ]
+
+    print(f"{n} rows per payload, median of {args.repeat}; orjson {'installed' if orjson else 'not installed'}")
+    print(f"{'payload':<13} {'path':<7} {'build ms':>9} {'serialize ms':>13} {'share':>7} {'KiB':>7}")
+    for name, build_before, render_before, build_after, render_after in cases:
+        for path, build, render in (("before", build_before, render_before), ("after", build_after, render_after)):
+            payload = build()
+            body = render(payload)
+            build_s = median_time(build, args.repeat)
+            render_s = median_time(lambda: render(payload), args.repeat)
+            share = render_s / (build_s + render_s)
+            print(f"{name:<13} {path:<7} {build_s * 1000:>9.2f} {render_s * 1000:>13.2f} {share:>7.0%} {len(body) / 1024:>7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# benchmarks/datagen.py
+"""
+Seeded synthetic data generator.
+
+Creates users, ad accounts, campaigns and years of daily CAMPAIGN_METRIC
+rows shaped like real ad traffic: every campaign gets its own baseline CTR,
+CPC, conversion rate and order value, and daily values follow a weekly
+cycle, a yearly cycle, a slow trend and noise. The same seed always
+produces the same data, so benchmark runs are comparable.
+
+Every generated user can log in as bench<N>@advize.test with PASSWORD, which
+is what benchmarks.load expects.
+
+Usage (from the backend directory):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.datagen --users 100 --years 3
+    python -m benchmarks.datagen --database-url sqlite:///bench.db --create --users 10
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator, List
+
+from sqlalchemy import create_engine, func, select
+
+PASSWORD = "bench-password"
+EMAIL_TEMPLATE = "bench{}@advize.test"
+BATCH_SIZE = 10000
+
+PLATFORMS = ["facebook", "facebook", "facebook", "tiktok", "snapchat"]
+NAME_PARTS = (
+    ["Spring", "Summer", "Autumn", "Winter", "Evergreen", "Launch", "Retargeting", "Brand"],
+    ["Sale", "Awareness", "Leads", "Traffic", "Catalog", "Video", "Search", "App Installs"],
+)
+
+
+@dataclass
+class Scale:
+    users: int = 10
+    accounts_per_user: int = 2
+    campaigns_per_account: int = 10
+    years: float = 2.0
+    seed: int = 42
+
+    @property
+    def days(self) -> int:
+        return int(self.years * 365)
+
+
+def email_for(index: int) -> str:
+    return EMAIL_TEMPLATE.format(index)
+
+
+def daily_metrics(rng: random.Random, campaign_id: int, start: date, end: date) -> Iterator[dict]:
+    """Yield one realistic metric row per day from start to end inclusive."""
+    base_impressions = rng.lognormvariate(8.5, 1.0)  # median ~5k/day
+    base_ctr = min(0.08, rng.lognormvariate(math.log(0.015), 0.4))
+    base_cpc = rng.lognormvariate(math.log(0.6), 0.35)
+    conversion_rate = min(0.2, rng.lognormvariate(math.log(0.03), 0.5))
+    order_value = rng.lognormvariate(math.log(45), 0.4)
+    trend = rng.uniform(-0.4, 0.6)  # relative change over a year
+    weekly_phase = rng.uniform(0, 2 * math.pi)
+
+    day = start
+    while day <= end:
+        offset = (day - start).days
+        seasonal = (
+            1
+            + 0.15 * math.sin(2 * math.pi * day.weekday() / 7 + weekly_phase)
+            + 0.25 * math.sin(2 * math.pi * day.timetuple().tm_yday / 365.25)
+        )
+        growth = max(0.1, 1 + trend * offset / 365.0)
+        impressions = max(0, int(base_impressions * seasonal * growth * rng.lognormvariate(0, 0.2)))
+        clicks = max(0, int(impressions * base_ctr * rng.lognormvariate(0, 0.15)))
+        cpc = base_cpc * rng.lognormvariate(0, 0.1)
+        spend = round(clicks * cpc, 2)
+        purchases = float(round(clicks * conversion_rate * rng.lognormvariate(0, 0.3)))
+        revenue = purchases * order_value * rng.lognormvariate(0, 0.1)
+        yield {
+            "campaign_id": campaign_id,
+            "metric_date": day,
+            "spend": spend,
+            "impressions": impressions,
+            "clicks": clicks,
+            "ctr": clicks / impressions if impressions else 0.0,
+            "cpc": spend / clicks if clicks else 0.0,
+            "roas": revenue / spend if spend else 0.0,
+            "cpp": spend / purchases if purchases else 0.0,
+            "purchases": purchases,
+            "revenue": revenue,
+        }
+        day += timedelta(days=1)
+
+
+def _batched(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(engine, scale: Scale, progress=print) -> dict:
+    """Insert the data set for `scale`; returns row counts per table."""
+    from app import models
+    from app.utils.password import hash_password
+
+    rng = random.Random(scale.seed)
+    today = date.today()
+    first_day = today - timedelta(days=scale.days)
+    password_hash = hash_password(PASSWORD)  # bcrypt is slow; every user shares one hash
+    counts = {"users": 0, "accounts": 0, "campaigns": 0, "metrics": 0}
+
+    with engine.begin() as conn:
+        # Re-running appends users after the existing bench<N> ones
+        offset = conn.execute(
+            select(func.count()).select_from(models.User.__table__)
+            .where(models.User.email.like(EMAIL_TEMPLATE.format("%")))
+        ).scalar() or 0
+
+    for u in range(scale.users):
+        with engine.begin() as conn:
+            user_id = conn.execute(models.User.__table__.insert().values(
+                email=email_for(offset + u), password_hash=password_hash,
+                firstname=rng.choice(["Amina", "Yacine", "Sara", "Karim", "Lina", "Omar"]),
+                lastname=f"Bench{offset + u}", created_at=datetime.utcnow(), is_active=True,
+            )).inserted_primary_key[0]
+            counts["users"] += 1
+
+            for _ in range(scale.accounts_per_user):
+                account_id = conn.execute(models.AdAccount.__table__.insert().values(
+                    user_id=user_id, platform=rng.choice(PLATFORMS),
+                    external_id=f"act_{rng.randrange(10**12, 10**13)}",
+                    status=models.AdAccountStatus.active, connected_at=datetime.utcnow(),
+                )).inserted_primary_key[0]
+                counts["accounts"] += 1
+
+                for c in range(scale.campaigns_per_account):
+                    # Campaigns start anywhere in the window; a third have already ended
+                    start = first_day + timedelta(days=rng.randrange(0, max(1, scale.days - 30)))
+                    end = None
+                    if rng.random() < 0.33:
+                        end = min(today, start + timedelta(days=rng.randrange(30, 365)))
+                    campaign_status = models.CampaignStatus.completed if end and end < today else (
+                        models.CampaignStatus.paused if rng.random() < 0.2 else models.CampaignStatus.active
+                    )
+                    campaign_id = conn.execute(models.Campaign.__table__.insert().values(
+                        account_id=account_id,
+                        name=f"{rng.choice(NAME_PARTS[0])} {rng.choice(NAME_PARTS[1])} {c + 1}",
+                        status=campaign_status, start_date=start, end_date=end, created_at=datetime.utcnow(),
+                    )).inserted_primary_key[0]
+                    counts["campaigns"] += 1
+
+                    for batch in _batched(daily_metrics(rng, campaign_id, start, end or today), BATCH_SIZE):
+                        conn.execute(models.CampaignMetric.__table__.insert(), batch)
+                        counts["metrics"] += len(batch)
+        progress(f"user {u + 1}/{scale.users}: {counts['metrics']} metric rows so far")
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark data set")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--create", action="store_true", help="create the tables first")
+    parser.add_argument("--users", type=int, default=Scale.users)
+    parser.add_argument("--accounts", type=int, default=Scale.accounts_per_user, help="ad accounts per user")
+    parser.add_argument("--campaigns", type=int, default=Scale.campaigns_per_account, help="campaigns per account")
+    parser.add_argument("--years", type=float, default=Scale.years, help="years of daily metrics")
+    parser.add_argument("--seed", type=int, default=Scale.seed)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("set DATABASE_URL or pass --database-url")
+
+    engine = create_engine(args.database_url)
+    if args.create:
+        from app.models import Base  # through app.models, so the tables are registered
+
+        Base.metadata.create_all(bind=engine)
+
+    scale = Scale(args.users, args.accounts, args.campaigns, args.years, args.seed)
+    t0 = time.perf_counter()
+    counts = generate(engine, scale)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"Generated {counts['users']} users, {counts['accounts']} accounts, {counts['campaigns']} campaigns "
+        f"and {counts['metrics']} metric rows in {elapsed:.1f}s (password: {PASSWORD})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# benchmarks/import_time.py
+"""
+Import-time budget for the application module.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter,
+prints the slowest modules by cumulative import time and exits non-zero
+when the total exceeds `--budget-ms`. Importing the app must stay free of
+I/O (no DB connection, no SMTP, no HTTP clients), so a regression here
+usually means something started doing work at import again.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.import_time --budget-ms 1500 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# "import time: self [us] | cumulative | imported package"
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module: str):
+    """Return (total_us, [(cumulative_us, self_us, depth, name), ...]) for one cold import."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(cumulative_us), int(self_us), (len(indent) - 1) // 2, name))
+    # Interpreter start-up imports come first. Children are printed before
+    # their parent, and parent packages are imported inside the target's own
+    # entry (`import app.main` prints `app` at depth 1), so the import
+    # statement ends at the last top-level entry named `module`. Top-level
+    # parent packages printed just before it belong to it too.
+    targets = [i for i, entry in enumerate(entries) if entry[2] == 0 and entry[3] == module]
+    if not targets:
+        raise RuntimeError(f"no import time entry for {module}")
+    last = targets[-1]
+    parts = module.split(".")
+    parents = {".".join(parts[:n]) for n in range(1, len(parts))}
+    first = 0
+    for i in range(last - 1, -1, -1):
+        if entries[i][2] == 0 and entries[i][3] not in parents:
+            first = i + 1
+            break
+    entries = entries[first:last + 1]
+    total = sum(e[0] for e in entries if e[2] == 0)
+    return total, entries
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    total_us, entries = measure(args.module)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, depth, name in sorted(entries, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+
+    total_ms = total_us / 1000
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+# benchmarks/load.py
+"""
+End-to-end HTTP load driver.
+
+Logs in as the users created by benchmarks.datagen, then replays a weighted
+mix of login, dashboard, campaign performance, insights, optimization and
+chat requests against a running server at each requested concurrency level.
+Reports p50/p95/p99 latency, throughput and errors per route, and can save
+the results as a baseline or compare against one: a route whose p95 grows
+or whose throughput drops by more than --tolerance fails the run.
+
+Usage (server running, data from benchmarks.datagen):
+
+    python -m benchmarks.load --base-url http://localhost:8000 --users 10 \\
+        --concurrency 1,8,32 --duration 30 --save-baseline baseline.json
+    python -m benchmarks.load --concurrency 1,8,32 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.datagen import PASSWORD, email_for
+
+CHAT_MESSAGES = [
+    "What's my best performing campaign?",
+    "How is my performance this week?",
+    "Any recommendation for my campaigns?",
+    "hello",
+]
+
+
+@dataclass
+class UserSession:
+    email: str
+    token: str
+    campaign_ids: List[int] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+
+
+async def open_session(client: httpx.AsyncClient, email: str) -> UserSession:
+    response = await login(client, email)
+    response.raise_for_status()
+    session = UserSession(email, response.json()["access_token"])
+    campaigns = await client.get("/api/campaigns", headers=session.headers)
+    campaigns.raise_for_status()
+    session.campaign_ids = [c["id"] for c in campaigns.json()]
+    return session
+
+
+async def _login(client, session, rng):
+    return await login(client, session.email)
+
+
+async def _dashboard_campaigns(client, session, rng):
+    return await client.get("/api/dashboard/campaigns", headers=session.headers)
+
+
+async def _dashboard_metrics(client, session, rng):
+    return await client.get("/dashboard/metrics", headers=session.headers)
+
+
+async def _performance(client, session, rng):
+    campaign_id = rng.choice(session.campaign_ids)
+    return await client.get(f"/api/campaigns/{campaign_id}/performance", headers=session.headers)
+
+
+async def _insights(client, session, rng):
+    campaign_id = rng.choice(session.campaign_ids)
+    return await client.get(f"/api/campaigns/{campaign_id}/insights", headers=session.headers)
+
+
+async def _optimization(client, session, rng):
+    return await client.post("/api/optimization/generate", json={}, headers=session.headers)
+
+
+async def _chat(client, session, rng):
+    return await client.post(
+        "/api/ai-chat/message", json={"message": rng.choice(CHAT_MESSAGES)}, headers=session.headers
+    )
+
+
+# route label -> (weight, request coroutine)
+MIX = {
+    "POST /auth/login": (5, _login),
+    "GET /api/dashboard/campaigns": (20, _dashboard_campaigns),
+    "GET /dashboard/metrics": (10, _dashboard_metrics),
+    "GET /api/campaigns/{id}/performance": (20, _performance),
+    "GET /api/campaigns/{id}/insights": (20, _insights),
+    "POST /api/optimization/generate": (10, _optimization),
+    "POST /api/ai-chat/message": (15, _chat),
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+async def run_level(client, sessions: List[UserSession], concurrency: int, duration: float, seed: int) -> dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    labels = list(MIX)
+    weights = [MIX[label][0] for label in labels]
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            label = rng.choices(labels, weights)[0]
+            session = rng.choice(sessions)
+            if "{id}" in label and not session.campaign_ids:
+                continue
+            start = time.perf_counter()
+            try:
+                response = await MIX[label][1](client, session, rng)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies[label].append(time.perf_counter() - start)
+            if not ok:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for label, values in latencies.items():
+        values.sort()
+        routes[label] = {
+            "requests": len(values),
+            "errors": errors[label],
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"concurrency": concurrency, "seconds": elapsed, "rps": total / elapsed, "routes": routes}
+
+
+def print_level(result: dict) -> None:
+    print(f"\n== concurrency {result['concurrency']}: {result['rps']:.1f} req/s over {result['seconds']:.1f}s")
+    print(f"{'route':<38} {'reqs':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, r in sorted(result["routes"].items()):
+        print(
+            f"{label:<38} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+
+
+def compare(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Describe every route whose p95 or throughput regressed beyond tolerance."""
+    regressions = []
+    previous = {b["concurrency"]: b for b in baseline}
+    for result in results:
+        base = previous.get(result["concurrency"])
+        if base is None:
+            continue
+        for label, r in result["routes"].items():
+            b = base["routes"].get(label)
+            if b is None:
+                continue
+            where = f"c={result['concurrency']} {label}"
+            if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{where}: p95 {b['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+            if b["rps"] and r["rps"] < b["rps"] * (1 - tolerance):
+                regressions.append(f"{where}: throughput {b['rps']:.1f} -> {r['rps']:.1f} req/s")
+            if r["errors"] > b["errors"]:
+                regressions.append(f"{where}: errors {b['errors']} -> {r['errors']}")
+    return regressions
+
+
+async def run(args) -> int:
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        sessions = await asyncio.gather(*(open_session(client, email_for(i)) for i in range(args.users)))
+        print(f"Logged in {len(sessions)} users, {sum(len(s.campaign_ids) for s in sessions)} campaigns")
+
+        results = []
+        for concurrency in args.concurrency:
+            result = await run_level(client, list(sessions), concurrency, args.duration, args.seed)
+            print_level(result)
+            results.append(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nFAIL: regressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nOK: within {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP load driver for the API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="bench users to log in as (from datagen)")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="compare against this saved result file")
+    parser.add_argument("--save-baseline", help="write the results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# benchmarks/mock_platforms.py
+"""
+Local mock servers of the Meta, TikTok and Snapchat ad APIs.
+
+Each mock serves a deterministic dataset (accounts, campaigns and daily
+insights generated from a seed) through the endpoints the connectors in
+app/connectors call, in that platform's own response format. Pages are
+kept small so every pagination path is used, and every `fault_every`-th
+request fails the way the platform fails: alternately with its throttling
+response (Meta error code 17, TikTok code 40100 in an HTTP 200 body,
+Snapchat HTTP 429) and with a 5xx. Requests with a wrong token get the
+platform's non-retryable auth error.
+
+benchmarks/sync_check.py runs the whole sync against these in-process;
+they can also be served for a locally running backend.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.mock_platforms --port 9100
+
+    META_API_URL=http://127.0.0.1:9100/meta/v23.0 \\
+    TIKTOK_API_URL=http://127.0.0.1:9100/tiktok/open_api/v1.3 \\
+    SNAPCHAT_API_URL=http://127.0.0.1:9100/snapchat/v1 \\
+    uvicorn app.main:app
+
+and connect each platform with the token `mock-<platform>-token`.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+PLATFORMS = ("meta", "tiktok", "snapchat")
+PAGE_SIZE = 2  # campaigns per page
+INSIGHTS_PAGE_SIZE = 5  # campaign-days per page (campaigns per page on Snapchat)
+MICRO = 1_000_000
+
+
+class MockDataset:
+    """Accounts, campaigns and daily stats of one platform, reproducible from the seed."""
+
+    def __init__(self, platform: str, accounts: int = 2, campaigns: int = 3, days: int = 14,
+                 end: Optional[date] = None, seed: int = 0):
+        rng = random.Random(f"{platform}-{seed}")
+        self.platform = platform
+        self.token = f"mock-{platform}-token"
+        self.end = end or date.today()
+        self.days = [self.end - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+        self.accounts: List[str] = [f"{platform[:2]}-acct-{i}" for i in range(1, accounts + 1)]
+        # account -> [(campaign id, name, active)]
+        self.campaigns: Dict[str, List[Tuple[str, str, bool]]] = {
+            account: [
+                (f"{account}-cmp-{j}", f"{platform.title()} campaign {i}.{j}", j % 3 != 0)
+                for j in range(1, campaigns + 1)
+            ]
+            for i, account in enumerate(self.accounts, 1)
+        }
+        self.stats: Dict[Tuple[str, date], dict] = {}
+        for account in self.accounts:
+            for campaign_id, _, _ in self.campaigns[account]:
+                for day in self.days:
+                    impressions = rng.randint(500, 20000)
+                    clicks = rng.randint(0, impressions // 25)
+                    purchases = rng.randint(0, max(clicks // 15, 1))
+                    self.stats[(campaign_id, day)] = {
+                        # Whole micro-units, so every platform's format is exact
+                        "spend": rng.randint(1_000, 400_000) * 10_000 / MICRO,
+                        "impressions": impressions,
+                        "clicks": clicks,
+                        "purchases": purchases,
+                        "revenue": purchases * rng.randint(20_000, 120_000) * 1_000 / MICRO,
+                    }
+
+    def rows(self, account: str, since: date, until: date) -> List[Tuple[str, date, dict]]:
+        return [
+            (campaign_id, day, self.stats[(campaign_id, day)])
+            for campaign_id, _, _ in self.campaigns[account]
+            for day in self.days
+            if since <= day <= until
+        ]
+
+    def totals(self, since: date, until: date) -> dict:
+        rows = [row for account in self.accounts for row in self.rows(account, since, until)]
+        return {
+            "accounts": len(self.accounts),
+            "campaigns": sum(len(c) for c in self.campaigns.values()),
+            "metric_rows": len(rows),
+            "spend": sum(stats["spend"] for _, _, stats in rows),
+            "revenue": sum(stats["revenue"] for _, _, stats in rows),
+        }
+
+
+class MockPlatform:
+    """Request counting and fault injection shared by the three mocks."""
+
+    def __init__(self, dataset: MockDataset, fault_every: int = 5, latency_ms: float = 0.0):
+        self.dataset = dataset
+        self.fault_every = fault_every
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.faults = 0
+
+    async def next_fault(self) -> Optional[str]:
+        """None for a normal response, else "throttle" or "error"."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.requests += 1
+        if self.fault_every and self.requests % self.fault_every == 0:
+            self.faults += 1
+            return "throttle" if self.faults % 2 else "error"
+        return None
+
+
+def _page(items: list, offset: int, size: int) -> Tuple[list, Optional[int]]:
+    end = offset + size
+    return items[offset:end], (end if end < len(items) else None)
+
+
+def _date(value: str) -> date:
+    return datetime.fromisoformat(value[:10]).date()
+
+
+# Meta Graph API
+
+def meta_app(mock: MockPlatform) -> Starlette:
+    data = mock.dataset
+
+    def paged(request: Request, items: list, size: int) -> JSONResponse:
+        offset = int(request.query_params.get("after", 0))
+        limit = min(int(request.query_params.get("limit", size)), size)
+        page, next_offset = _page(items, offset, limit)
+        paging = {"cursors": {"before": str(offset), "after": str(next_offset or len(items))}}
+        if next_offset is not None:
+            paging["next"] = str(request.url.include_query_params(after=next_offset))
+        return JSONResponse({"data": page, "paging": paging})
+
+    async def guard(request: Request) -> Optional[JSONResponse]:
+        fault = await mock.next_fault()
+        if fault == "throttle":
+            usage = {"1": [{"type": "ads_insights", "call_count": 100, "estimated_time_to_regain_access": 0}]}
+            return JSONResponse(
+                {"error": {"message": "User request limit reached", "type": "OAuthException", "code": 17}},
+                status_code=400, headers={"X-Business-Use-Case-Usage": json.dumps(usage)},
+            )
+        if fault == "error":
+            return JSONResponse({"error": {"message": "Service temporarily unavailable", "code": 2}}, status_code=503)
+        if request.query_params.get("access_token") != data.token:
+            return JSONResponse(
+                {"error": {"message": "Invalid OAuth access token", "type": "OAuthException", "code": 190}},
+                status_code=400,
+            )
+        return None
+
+    async def accounts(request: Request):
+        return await guard(request) or paged(request, [
+            {"id": account, "name": f"Meta account {account}", "account_status": 1, "currency": "USD"}
+            for account in data.accounts
+        ], PAGE_SIZE)
+
+    async def campaigns(request: Request):
+        return await guard(request) or paged(request, [
+            {"id": campaign_id, "name": name, "status": "ACTIVE" if active else "PAUSED",
+             "start_time": f"{data.days[0].isoformat()}T00:00:00+0000"}
+            for campaign_id, name, active in data.campaigns[request.path_params["account"]]
+        ], PAGE_SIZE)
+
+    async def insights(request: Request):
+        time_range = json.loads(request.query_params["time_range"])
+        rows = data.rows(request.path_params["account"], _date(time_range["since"]), _date(time_range["until"]))
+        return await guard(request) or paged(request, [
+            {
+                "campaign_id": campaign_id, "date_start": day.isoformat(), "date_stop": day.isoformat(),
+                "spend": f"{stats['spend']:.2f}", "impressions": str(stats["impressions"]),
+                "clicks": str(stats["clicks"]),
+                "actions": [{"action_type": "purchase", "value": str(stats["purchases"])}],
+                "action_values": [{"action_type": "purchase", "value": f"{stats['revenue']:.3f}"}],
+            }
+            for campaign_id, day, stats in rows
+        ], INSIGHTS_PAGE_SIZE)
+
+    return Starlette(routes=[
+        Route("/v23.0/me/adaccounts", accounts),
+        Route("/v23.0/{account}/campaigns", campaigns),
+        Route("/v23.0/{account}/insights", insights),
+    ])
+
+
+# TikTok Marketing API
+
+def tiktok_app(mock: MockPlatform) -> Starlette:
+    data = mock.dataset
+
+    def ok(payload: dict) -> JSONResponse:
+        return JSONResponse({"code": 0, "message": "OK", "request_id": "mock", "data": payload})
+
+    def paged(request: Request, items: list, size: int) -> JSONResponse:
+        page = int(request.query_params.get("page", 1))
+        size = min(int(request.query_params.get("page_size", size)), size)
+        total_page = max(1, -(-len(items) // size))
+        return ok({
+            "list": items[(page - 1) * size:page * size],
+            "page_info": {"page": page, "page_size": size, "total_number": len(items), "total_page": total_page},
+        })
+
+    async def guard(request: Request) -> Optional[JSONResponse]:
+        fault = await mock.next_fault()
+        if fault == "throttle":
+            return JSONResponse({"code": 40100, "message": "Too many requests", "data": {}})
+        if fault == "error":
+            return JSONResponse({"code": 50000, "message": "System error", "data": {}})
+        if request.headers.get("Access-Token") != data.token:
+            return JSONResponse({"code": 40105, "message": "Access token is incorrect or has been revoked", "data": {}})
+        return None
+
+    async def advertisers(request: Request):
+        return await guard(request) or ok({"list": [
+            {"advertiser_id": account, "advertiser_name": f"TikTok advertiser {account}"}
+            for account in data.accounts
+        ]})
+
+    async def campaigns(request: Request):
+        return await guard(request) or paged(request, [
+            {"campaign_id": campaign_id, "campaign_name": name,
+             "operation_status": "ENABLE" if active else "DISABLE",
+             "create_time": f"{data.days[0].isoformat()} 00:00:00"}
+            for campaign_id, name, active in data.campaigns[request.query_params["advertiser_id"]]
+        ], PAGE_SIZE)
+
+    async def report(request: Request):
+        params = request.query_params
+        rows = data.rows(params["advertiser_id"], _date(params["start_date"]), _date(params["end_date"]))
+        return await guard(request) or paged(request, [
+            {
+                "dimensions": {"campaign_id": campaign_id, "stat_time_day": f"{day.isoformat()} 00:00:00"},
+                "metrics": {
+                    "spend": f"{stats['spend']:.2f}", "impressions": str(stats["impressions"]),
+                    "clicks": str(stats["clicks"]), "complete_payment": str(stats["purchases"]),
+                    "complete_payment_roas": repr(stats["revenue"] / stats["spend"]),
+                },
+            }
+            for campaign_id, day, stats in rows
+        ], INSIGHTS_PAGE_SIZE)
+
+    return Starlette(routes=[
+        Route("/open_api/v1.3/oauth2/advertiser/get/", advertisers),
+        Route("/open_api/v1.3/campaign/get/", campaigns),
+        Route("/open_api/v1.3/report/integrated/get/", report),
+    ])
+
+
+# Snapchat Marketing API
+
+def snapchat_app(mock: MockPlatform) -> Starlette:
+    data = mock.dataset
+
+    def paged(request: Request, key: str, items: list, size: int, **extra) -> JSONResponse:
+        page, next_offset = _page(items, int(request.query_params.get("cursor", 0)), size)
+        body = {"request_status": "SUCCESS", key: page, **extra}
+        if next_offset is not None:
+            body["paging"] = {"next_link": str(request.url.include_query_params(cursor=next_offset))}
+        return JSONResponse(body)
+
+    async def guard(request: Request) -> Optional[JSONResponse]:
+        fault = await mock.next_fault()
+        if fault == "throttle":
+            return JSONResponse({"request_status": "ERROR", "debug_message": "Rate limited"},
+                                status_code=429, headers={"Retry-After": "0"})
+        if fault == "error":
+            return JSONResponse({"request_status": "ERROR", "debug_message": "Internal error"}, status_code=500)
+        if request.headers.get("Authorization") != f"Bearer {data.token}":
+            return JSONResponse({"request_status": "ERROR", "debug_message": "Unauthorized"}, status_code=401)
+        return None
+
+    async def organizations(request: Request):
+        return await guard(request) or JSONResponse({"request_status": "SUCCESS", "organizations": [{
+            "sub_request_status": "SUCCESS",
+            "organization": {"id": "org-1", "ad_accounts": [
+                {"id": account, "name": f"Snap account {account}", "status": "ACTIVE", "currency": "USD"}
+                for account in data.accounts
+            ]},
+        }]})
+
+    async def campaigns(request: Request):
+        return await guard(request) or paged(request, "campaigns", [
+            {"sub_request_status": "SUCCESS", "campaign": {
+                "id": campaign_id, "name": name, "status": "ACTIVE" if active else "PAUSED",
+                "start_time": f"{data.days[0].isoformat()}T00:00:00.000Z",
+            }}
+            for campaign_id, name, active in data.campaigns[request.path_params["account"]]
+        ], PAGE_SIZE)
+
+    async def stats(request: Request):
+        account = request.path_params["account"]
+        since = _date(request.query_params["start_time"])
+        until = _date(request.query_params["end_time"]) - timedelta(days=1)
+        by_campaign: Dict[str, list] = {}
+        for campaign_id, day, values in data.rows(account, since, until):
+            by_campaign.setdefault(campaign_id, []).append({
+                "start_time": f"{day.isoformat()}T00:00:00.000-08:00",
+                "end_time": f"{(day + timedelta(days=1)).isoformat()}T00:00:00.000-08:00",
+                "stats": {
+                    "impressions": values["impressions"], "swipes": values["clicks"],
+                    "spend": round(values["spend"] * MICRO),
+                    "conversion_purchases": values["purchases"],
+                    "conversion_purchases_value": round(values["revenue"] * MICRO),
+                },
+            })
+        campaigns = [{"id": campaign_id, "timeseries": series} for campaign_id, series in by_campaign.items()]
+        response = await guard(request)
+        if response is not None:
+            return response
+        # Paged by campaign; the stats envelope is repeated on every page
+        page, next_offset = _page(campaigns, int(request.query_params.get("cursor", 0)), INSIGHTS_PAGE_SIZE // 2)
+        body = {"request_status": "SUCCESS", "timeseries_stats": [{"sub_request_status": "SUCCESS", "timeseries_stat": {
+            "id": account, "type": "AD_ACCOUNT", "granularity": "DAY", "breakdown_stats": {"campaign": page},
+        }}]}
+        if next_offset is not None:
+            body["paging"] = {"next_link": str(request.url.include_query_params(cursor=next_offset))}
+        return JSONResponse(body)
+
+    return Starlette(routes=[
+        Route("/v1/me/organizations", organizations),
+        Route("/v1/adaccounts/{account}/campaigns", campaigns),
+        Route("/v1/adaccounts/{account}/stats", stats),
+    ])
+
+
+APPS = {"meta": meta_app, "tiktok": tiktok_app, "snapchat": snapchat_app}
+API_PATHS = {"meta": "/meta/v23.0", "tiktok": "/tiktok/open_api/v1.3", "snapchat": "/snapchat/v1"}
+
+
+def build_app(mocks: Dict[str, MockPlatform]) -> Starlette:
+    """All mocks in one ASGI app, mounted under /meta, /tiktok and /snapchat."""
+    return Starlette(routes=[Mount(f"/{platform}", APPS[platform](mock)) for platform, mock in mocks.items()])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve mock Meta, TikTok and Snapchat ad APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--accounts", type=int, default=2)
+    parser.add_argument("--campaigns", type=int, default=3)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--fault-every", type=int, default=5, help="fail every n-th request (0: never)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    mocks = {
+        platform: MockPlatform(
+            MockDataset(platform, args.accounts, args.campaigns, args.days), args.fault_every, args.latency_ms
+        )
+        for platform in PLATFORMS
+    }
+    for platform, path in API_PATHS.items():
+        print(f"{platform.upper()}_API_URL=http://{args.host}:{args.port}{path}  token: {mocks[platform].dataset.token}")
+    uvicorn.run(build_app(mocks), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
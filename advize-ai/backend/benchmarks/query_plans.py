@@ -0,0 +1,115 @@
+# benchmarks/query_plans.py
+"""
+Query-plan regression check for the hot lookup paths.
+
+Runs EXPLAIN for every query the endpoints issue on a hot path and fails if
+any of them is planned as a full table scan. On PostgreSQL sequential scans
+are disabled for the session first, so a plan only contains a Seq Scan when
+no usable index exists. SQLite is supported for quick local runs.
+
+Usage (from the backend directory):
+
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans
+    DATABASE_URL=sqlite:///plans.db python -m benchmarks.query_plans --create
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+HOT_QUERIES = {
+    "ad_accounts_by_user": (
+        'SELECT * FROM "AD_ACCOUNT" WHERE user_id = :user_id',
+        {"user_id": 1},
+    ),
+    "campaigns_by_account": (
+        'SELECT * FROM "CAMPAIGN" WHERE account_id = :account_id',
+        {"account_id": 1},
+    ),
+    "chat_sessions_by_user": (
+        'SELECT * FROM "CHAT_SESSION" WHERE user_id = :user_id',
+        {"user_id": 1},
+    ),
+    "chat_messages_by_session": (
+        'SELECT * FROM "CHAT_MESSAGE" WHERE session_id = :session_id ORDER BY timestamp',
+        {"session_id": 1},
+    ),
+    "open_suggestions_by_campaign": (
+        'SELECT * FROM "OPTIMIZATION_SUGGESTION" WHERE campaign_id = :campaign_id AND applied = false',
+        {"campaign_id": 1},
+    ),
+    "oauth_by_verification_code": (
+        'SELECT * FROM "OAUTH_CREDENTIAL" WHERE email = :email AND verification_code = :code',
+        {"email": "user@example.com", "code": "123456"},
+    ),
+    "metrics_by_campaign_and_date": (
+        'SELECT * FROM "CAMPAIGN_METRIC" WHERE campaign_id = :campaign_id AND metric_date >= :since',
+        {"campaign_id": 1, "since": date(2025, 1, 1)},
+    ),
+    "metrics_by_date": (
+        'SELECT * FROM "CAMPAIGN_METRIC" WHERE metric_date >= :since',
+        {"since": date(2025, 1, 1)},
+    ),
+}
+
+_SQLITE_TABLE_SCAN = re.compile(r"^SCAN (\S+)$")
+
+
+def _postgres_seq_scans(plan):
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from _postgres_seq_scans(child)
+
+
+def find_table_scans(conn, sql, params):
+    """Return the tables a query would read with a full scan."""
+    if conn.dialect.name == "postgresql":
+        raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        return list(_postgres_seq_scans(plan[0]["Plan"]))
+
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+        return [m.group(1) for m in (_SQLITE_TABLE_SCAN.match(r[-1]) for r in rows) if m]
+
+    raise RuntimeError(f"Unsupported dialect for plan checks: {conn.dialect.name}")
+
+
+def check_plans(engine):
+    """Return {query name: [scanned tables]} for every hot query that regressed."""
+    failures = {}
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+        for name, (sql, params) in HOT_QUERIES.items():
+            scans = find_table_scans(conn, sql, params)
+            if scans:
+                failures[name] = scans
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--create", action="store_true", help="create the schema from app.models first")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    if args.create:
+        from app.models import Base
+        Base.metadata.create_all(bind=engine)
+
+    failures = check_plans(engine)
+    for name in HOT_QUERIES:
+        status = "SEQ SCAN on " + ", ".join(failures[name]) if name in failures else "ok"
+        print(f"{name:32} {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
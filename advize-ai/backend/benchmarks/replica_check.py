@@ -0,0 +1,131 @@
+# benchmarks/replica_check.py
+"""
+Read-replica routing check against two local databases.
+
+Creates two SQLite files, a primary and a "replica", with the same user
+but a differently named ad account in each, so every GET /api/accounts
+response shows which database served it. Then checks that:
+
+  1. a plain read goes to the replica
+  2. right after the user's own write, reads go to the primary
+  3. once the read-your-writes window has passed, reads go back to the replica
+  4. while the replica lags beyond REPLICA_MAX_LAG_SECONDS, reads use the primary
+  5. when the replica cannot be reached, reads use the primary
+
+Any two PostgreSQL instances work the same way: pass --primary-url and
+--replica-url (both must already have the schema; the check inserts its
+own rows).
+
+Usage (from the backend directory):
+
+    python -m benchmarks.replica_check
+    python -m benchmarks.replica_check --primary-url postgresql://localhost:5432/advize \\
+        --replica-url postgresql://localhost:5433/advize
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+WINDOW_SECONDS = 1.0
+
+
+def seed(engine, platform: str) -> int:
+    from app import models
+
+    with engine.begin() as conn:
+        user_id = conn.execute(models.User.__table__.insert().values(
+            email=f"replica-check-{os.getpid()}@advize.test", password_hash="x", firstname="Replica",
+            lastname="Check", created_at=datetime.utcnow(), is_active=True,
+        )).inserted_primary_key[0]
+        conn.execute(models.AdAccount.__table__.insert().values(
+            user_id=user_id, platform=platform, external_id=f"act_{platform}", status=models.AdAccountStatus.active,
+        ))
+    return user_id
+
+
+def run(primary_url: str, replica_url: str) -> int:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+
+    from app import main
+    from app.Auth import create_access_token
+    from app.database import Base, get_engine, replica_monitor
+
+    failures = []
+
+    def check(label: str, expected: str):
+        response = client.get("/api/accounts", params={"fields": "platform"}, headers=headers)
+        response.raise_for_status()
+        served_by = {row["platform"] for row in response.json()}
+        ok = expected in served_by and len(served_by) == 1
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: served by {', '.join(sorted(served_by))}, expected {expected}")
+        if not ok:
+            failures.append(label)
+
+    replica_engine = create_engine(replica_url)
+    Base.metadata.create_all(bind=get_engine())
+    Base.metadata.create_all(bind=replica_engine)
+    user_id = seed(get_engine(), "primary")
+    if seed(replica_engine, "replica") != user_id:
+        print("Primary and replica assigned different user ids; start from two empty databases")
+        return 1
+    replica_engine.dispose()
+
+    token = create_access_token({"sub": str(user_id)}, timedelta(minutes=30))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(main.app) as client:
+        check("plain read", "replica")
+
+        client.post("/api/accounts", headers=headers, json={
+            "platform": "primary", "external_id": "act_written", "status": "active", "connected_at": None,
+        }).raise_for_status()
+        check("read right after own write", "primary")
+
+        time.sleep(WINDOW_SECONDS + 0.1)
+        check("read after the read-your-writes window", "replica")
+
+        measured = replica_monitor.lag
+        replica_monitor.lag = 3600.0
+        check("read while the replica lags", "primary")
+
+        replica_monitor.lag = None
+        check("read while the replica is unreachable", "primary")
+        replica_monitor.lag = measured
+
+    if failures:
+        print(f"\nFAIL: {len(failures)} check(s) failed")
+        return 1
+    print("\nOK: reads are routed as expected")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check read-replica routing with two databases")
+    parser.add_argument("--primary-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--replica-url", help="defaults to a second temporary SQLite file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read when app.config is first imported, so configure
+        # both databases before importing anything from the app.
+        os.environ["DATABASE_URL"] = args.primary_url or f"sqlite:///{os.path.join(tmp, 'primary.db')}"
+        os.environ["READ_REPLICA_URL"] = args.replica_url or f"sqlite:///{os.path.join(tmp, 'replica.db')}"
+        os.environ["READ_YOUR_WRITES_SECONDS"] = str(WINDOW_SECONDS)
+        os.environ["REPLICA_LAG_CHECK_SECONDS"] = "3600"  # lag is set by hand below
+        os.environ.setdefault("SECRET_KEY", "replica-check")
+        os.environ["DB_CREATE_ALL"] = "false"
+        os.environ["METRIC_PARTITIONING"] = "false"
+        os.environ["METRIC_ARCHIVE_DIR"] = os.path.join(tmp, "archive")
+        try:
+            return run(os.environ["DATABASE_URL"], os.environ["READ_REPLICA_URL"])
+        finally:
+            from app.database import dispose_engine
+            dispose_engine()
+
+
+if __name__ == "__main__":
+    sys.exit(main())